@@ -0,0 +1,5 @@
+import sys
+
+from cloudflare_watchdog.cli import main
+
+sys.exit(main())
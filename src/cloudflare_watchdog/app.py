@@ -1,11 +1,21 @@
+import os
 import sys
-from cloudflare_watchdog.gui.main_window import MainWindow
-from PyQt6.QtWidgets import QApplication
+
+from cloudflare_watchdog.core.control import DAEMON_ENV
 
 
 def main():
+    if os.environ.pop(DAEMON_ENV, None):
+        # Started by spawn_daemon from a frozen GUI build: be the daemon.
+        from cloudflare_watchdog.cli import main as cli_main
+
+        sys.exit(cli_main(sys.argv[1:]))
+    from PyQt6.QtWidgets import QApplication
+
+    from cloudflare_watchdog.gui.main_window import WatchdogGUI
+
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = WatchdogGUI()
     window.show()
     sys.exit(app.exec())
 
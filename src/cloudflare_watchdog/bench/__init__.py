@@ -0,0 +1 @@
+# Benchmark and fault-injection tooling; never imported by the daemon
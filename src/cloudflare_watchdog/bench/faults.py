@@ -0,0 +1,242 @@
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FAULTS = ("ok", "latency", "5xx", "empty", "errorpage", "reset", "hang")
+ERROR_PAGE = b"<html><title>Error 1033</title><h1>Argo Tunnel error</h1></html>"
+CONTROL_PREFIX = "/_fault/"
+HANG_LIMIT = 300
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class FaultServer:
+    """Local HTTP origin standing in for the tunneled site.
+
+    Every path except ``/_fault/...`` is "the site" and answers according
+    to the current fault:
+
+    * ``ok``      200 with a short body
+    * ``latency`` the same, after ``delay`` seconds
+    * ``5xx``     503
+    * ``empty``   200 with an empty body
+    * ``errorpage`` 200 with an error page (``ERROR_PAGE``)
+    * ``reset``   the connection is reset without a response
+    * ``hang``    the request is held open until the fault is cleared
+
+    ``GET /_fault/<name>?delay=<s>`` switches faults, so a fake recovery
+    command can "restart the app" with nothing but an HTTP request.
+    """
+
+    faults = FAULTS
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.fault = self.faults[0]
+        self.delay = 0.0
+        self.requests = 0
+        self.changes = []  # (monotonic time, fault)
+        self._cleared = threading.Condition()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def control_url(self, fault, delay=None):
+        query = "" if delay is None else f"?delay={delay}"
+        return f"http://{self.host}:{self.port}{CONTROL_PREFIX}{fault}{query}"
+
+    def set_fault(self, fault, delay=None):
+        if fault not in self.faults:
+            raise ValueError(
+                f"unknown fault {fault!r}; expected one of {self.faults}"
+            )
+        with self._cleared:
+            self.fault = fault
+            if delay is not None:
+                self.delay = float(delay)
+            self.changes.append((time.monotonic(), fault))
+            self._cleared.notify_all()
+
+    def last_change(self, fault):
+        """Monotonic time ``fault`` was last switched on, or None."""
+        for when, name in reversed(self.changes):
+            if name == fault:
+                return when
+        return None
+
+    def _hang(self):
+        deadline = time.monotonic() + HANG_LIMIT
+        with self._cleared:
+            while self.fault == "hang" and time.monotonic() < deadline:
+                self._cleared.wait(1)
+
+    def respond(self, handler, parts):
+        """Answer one request to the site according to the current fault."""
+        fault = self.fault
+        if fault == "latency":
+            time.sleep(self.delay)
+        elif fault == "hang":
+            self._hang()
+        if fault == "reset":
+            handler.reset()
+        elif fault == "5xx":
+            handler.reply(503, b"Service Unavailable")
+        elif fault == "empty":
+            handler.reply(200)
+        elif fault == "errorpage":
+            handler.reply(200, ERROR_PAGE, "text/html")
+        else:
+            handler.reply(200, b"OK")
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Probes give up on hung or slow replies; that is the point.
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def reply(self, status, body=b"", content_type="text/plain"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def reset(self):
+                # SO_LINGER with a zero timeout turns close() into an RST.
+                self.connection.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+                )
+                self.close_connection = True
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path.startswith(CONTROL_PREFIX):
+                    fault = parts.path[len(CONTROL_PREFIX) :]
+                    delay = parse_qs(parts.query).get("delay", [None])[0]
+                    try:
+                        origin.set_fault(fault, delay)
+                    except ValueError as e:
+                        self.reply(400, str(e).encode())
+                        return
+                    self.reply(200, fault.encode())
+                    return
+
+                origin.requests += 1
+                origin.respond(self, parts)
+
+            do_HEAD = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self._server = Server((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fault-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self.set_fault(self.faults[0])  # release hung handlers
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class CloudflaredStandIn(FaultServer):
+    """cloudflared's local metrics server, replayed from recorded fixtures.
+
+    ``/ready`` and ``/metrics`` are served from ``fixtures/cloudflared`` for
+    the current state (``healthy``, ``degraded``: one edge connection left,
+    ``erroring``: most proxied requests fail, ``down``: no connections).
+    Request counters grow by the fixture's values on every scrape, as they
+    would on a live tunnel.
+    ``reset`` and ``hang`` behave as on ``FaultServer``.
+    """
+
+    faults = ("healthy", "degraded", "erroring", "down", "reset", "hang")
+    counters = (
+        "cloudflared_tunnel_total_requests",
+        "cloudflared_tunnel_request_errors",
+    )
+
+    def __init__(self, host="127.0.0.1", port=0, fixtures=None):
+        super().__init__(host, port)
+        self.totals = {}  # counters accumulate the fixture's per-scrape values
+        fixtures = Path(fixtures or FIXTURES / "cloudflared")
+        self.ready = json.loads((fixtures / "ready.json").read_text())
+        self.metrics = {
+            state: (fixtures / f"{state}.prom").read_text().splitlines()
+            for state in self.ready
+        }
+
+    def _metrics(self, state):
+        lines = []
+        for line in self.metrics[state]:
+            if line.startswith(self.counters):
+                name, value = line.rsplit(" ", 1)
+                self.totals[name] = self.totals.get(name, 0) + float(value)
+                line = f"{name} {self.totals[name]:g}"
+            lines.append(line)
+        return ("\n".join(lines) + "\n").encode()
+
+    def respond(self, handler, parts):
+        state = self.fault
+        if state in ("reset", "hang"):
+            super().respond(handler, parts)
+            return
+        if parts.path == "/ready":
+            code, body = self.ready[state]
+            handler.reply(code, json.dumps(body).encode(), "application/json")
+        elif parts.path == "/metrics":
+            handler.reply(200, self._metrics(state), "text/plain; version=0.0.4")
+        else:
+            handler.reply(404, b"404 page not found")
+
+
+def recovery_command(server, fault="ok", delay=0.0):
+    """Action step that plays the part of ``pm2 restart``/``cloudflared``.
+
+    It waits ``delay`` seconds (the app "restarting") and then switches the
+    fault server back to ``fault``. The script is a single expression because
+    plain command strings are split on ``;``, and the step opts out of
+    supervision since it mentions ``python``.
+    """
+    script = (
+        f"__import__('time').sleep({float(delay)!r}) or "
+        f"__import__('urllib.request').request.urlopen("
+        f"{server.control_url(fault)!r}, timeout=5)"
+    )
+    command = f'"{sys.executable}" -c "{script}"'
+    if os.name == "nt":
+        command = "& " + command
+    return {"name": "fake-restart", "run": command, "supervise": False}
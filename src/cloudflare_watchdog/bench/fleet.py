@@ -0,0 +1,174 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from cloudflare_watchdog.core.fleet import FleetAgent, FleetController, FleetState
+from cloudflare_watchdog.core.health import HealthState, Transition
+
+REPORT_PREFIX = "fleet-sim: "
+SIM_TARGETS = ("site", "tunnel", "origin")
+FLIP_CHANCE = 0.05  # per target and tick
+
+
+class SimulatedEdge:
+    """Stand-in for one edge box: a few targets that flap at random."""
+
+    def __init__(self, name, rng):
+        self.name = name
+        self.rng = rng
+        self.states = {t: HealthState.HEALTHY for t in SIM_TARGETS}
+        self.since = {t: time.time() for t in SIM_TARGETS}
+        self.agent = None
+
+    def snapshot(self):
+        return {
+            t: {"state": s.value, "since": self.since[t], "ok": s.value == "healthy"}
+            for t, s in self.states.items()
+        }
+
+    def tick(self):
+        """Flip some targets; returns how many transitions were recorded."""
+        flipped = 0
+        for target, state in self.states.items():
+            if self.rng.random() >= FLIP_CHANCE:
+                continue
+            healthy = state is HealthState.HEALTHY
+            current = HealthState.DOWN if healthy else HealthState.HEALTHY
+            self.states[target] = current
+            self.since[target] = time.time()
+            transition = Transition(
+                target, state, current, "down" if healthy else "recovery"
+            )
+            self.agent.record_transition(transition)
+            flipped += 1
+        return flipped
+
+
+def simulate(controller, agents, prefix, seconds, interval, buffer_dir, seed=None):
+    """Child side of ``bench-fleet``: run ``agents`` agents in this process."""
+    rng = random.Random(seed)
+    edges = []
+    for i in range(agents):
+        edge = SimulatedEdge(f"{prefix}{i:04d}", rng)
+        edge.agent = FleetAgent(
+            controller,
+            edge.snapshot,
+            agent_id=edge.name,
+            interval=interval,
+            buffer_path=Path(buffer_dir) / f"{edge.name}.jsonl",
+        )
+        edges.append(edge)
+    # Spread the first heartbeats instead of sending them all at once.
+    for edge in edges:
+        edge.agent.start()
+        time.sleep(interval / agents)
+    sent = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for edge in edges:
+            sent += edge.tick()
+        time.sleep(interval)
+    for edge in edges:
+        edge.agent.stop()
+    unsent = sum(len(edge.agent.buffer.read()) for edge in edges)
+    return {"agents": agents, "sent": sent, "unsent": unsent}
+
+
+def run_fleet_benchmark(
+    agents=300, processes=4, seconds=20.0, interval=1.0, outage=5.0, log=print
+):
+    """Drive one in-process controller with ``agents`` agents in subprocesses.
+
+    Midway the controller goes away for ``outage`` seconds and comes back
+    on the same port with the same state, so the agents' disk buffers are
+    exercised; every transition sent must reach the controller exactly once.
+    """
+    state = FleetState(event_limit=10**7)
+    controller = FleetController("127.0.0.1", 0, state=state).start()
+    port = controller.port
+    buffer_dir = tempfile.mkdtemp(prefix="fleet-bench-")
+    per_process = -(-agents // processes)
+    children = []
+    for index in range(processes):
+        count = min(per_process, agents - index * per_process)
+        if count <= 0:
+            break
+        argv = [sys.executable, "-m", "cloudflare_watchdog", "fleet-sim"]
+        argv += ["--controller", controller.url, "--agents", str(count)]
+        argv += ["--prefix", f"edge{index}-", "--seconds", str(seconds)]
+        argv += ["--interval", str(interval), "--buffer-dir", buffer_dir]
+        children.append(
+            subprocess.Popen(argv, stdout=subprocess.PIPE, text=True, env=_env())
+        )
+    log(f"📡 {agents} agents in {len(children)} processes for {seconds:g}s")
+    cpu_before = _cpu()
+    started = time.monotonic()
+    time.sleep(seconds / 3)
+    if outage:
+        log(f"💥 Controller down for {outage:g}s")
+        controller.stop()
+        time.sleep(outage)
+        controller = FleetController("127.0.0.1", port, state=state).start()
+        log("✅ Controller back")
+    results = []
+    for child in children:
+        stdout, _ = child.communicate(timeout=seconds + 60)
+        line = next(
+            ln for ln in stdout.splitlines() if ln.startswith(REPORT_PREFIX)
+        )
+        results.append(json.loads(line[len(REPORT_PREFIX) :]))
+    elapsed = time.monotonic() - started
+    cpu = _cpu() - cpu_before
+    view_started = time.perf_counter()
+    view = state.view()
+    view_seconds = time.perf_counter() - view_started
+    controller.stop()
+    sent = sum(r["sent"] for r in results)
+    return {
+        "agents": view["summary"]["agents"],
+        "expected_agents": agents,
+        "sent": sent,
+        "received": state.received,
+        "unsent": sum(r["unsent"] for r in results),
+        "duplicates": state.duplicates,
+        "batches_per_second": state.batches / elapsed,
+        "controller_cpu_percent": cpu / elapsed * 100,
+        "view_ms": view_seconds * 1000,
+    }
+
+
+def format_fleet_report(report):
+    lost = report["sent"] - report["received"]
+    return "\n".join(
+        [
+            f"agents seen : {report['agents']}/{report['expected_agents']}",
+            f"transitions : {report['received']}/{report['sent']} delivered, "
+            f"{lost} lost, {report['duplicates']} replays dropped",
+            f"ingest      : {report['batches_per_second']:.0f} batches/s at "
+            f"{report['controller_cpu_percent']:.1f}% CPU",
+            f"fleet view  : {report['view_ms']:.1f} ms",
+        ]
+    )
+
+
+def _cpu():
+    """CPU seconds used by this process; ``resource`` is POSIX-only."""
+    try:
+        import resource
+    except ImportError:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _env():
+    import cloudflare_watchdog
+
+    source = str(Path(cloudflare_watchdog.__file__).resolve().parents[1])
+    path = os.pathsep.join(p for p in (source, os.environ.get("PYTHONPATH")) if p)
+    return dict(os.environ, PYTHONPATH=path)
@@ -0,0 +1,321 @@
+"""End-to-end benchmarks: run the real daemon against a ``FaultServer``.
+
+The daemon is started exactly as in production (``python -m
+cloudflare_watchdog run``) in a throwaway home directory, with a config
+whose only target is the local fault server and whose ``on_site_fail``
+action is a fake restart that heals it. Timings are taken from the
+daemon's own log lines, so they include probing, the health state
+machine, the executor and the log pipeline.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from cloudflare_watchdog.bench.faults import FaultServer, recovery_command
+
+SCENARIOS = ("5xx", "empty", "errorpage", "reset", "hang", "latency")
+TARGET = "origin"
+
+# Lower is better for everything except throughput.
+TOLERANCE = 1.5
+SLACK = {
+    "detect": 0.25,
+    "recover": 0.25,
+    "cpu_seconds_per_hour": 1.0,
+    "rss_mb": 5.0,
+}
+
+
+class DaemonProcess:
+    """``cloudflare_watchdog run`` in a subprocess, with timestamped output."""
+
+    def __init__(self, config, home):
+        self.config = config
+        self.home = Path(home)
+        self.lines = []  # (monotonic time, text)
+        self._changed = threading.Condition()
+        self.proc = None
+
+    def start(self):
+        import cloudflare_watchdog
+
+        source = str(Path(cloudflare_watchdog.__file__).resolve().parents[1])
+        env = dict(
+            os.environ,
+            HOME=str(self.home),
+            APPDATA=str(self.home),
+            PYTHONUNBUFFERED="1",
+            PYTHONIOENCODING="utf-8",
+            PYTHONPATH=os.pathsep.join(
+                p for p in (source, os.environ.get("PYTHONPATH")) if p
+            ),
+        )
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "cloudflare_watchdog"]
+            + ["--config", str(self.config), "run"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env,
+            encoding="utf-8",
+            errors="replace",
+        )
+        threading.Thread(target=self._read, name="bench-reader", daemon=True).start()
+        return self
+
+    def _read(self):
+        for line in self.proc.stdout:
+            with self._changed:
+                self.lines.append((time.monotonic(), line.rstrip("\n")))
+                self._changed.notify_all()
+
+    def wait_for(self, *fragments, since=0.0, timeout=30.0):
+        """Monotonic time of the first line after ``since`` containing all
+        ``fragments``, or None on timeout."""
+        deadline = time.monotonic() + timeout
+        seen = 0
+        with self._changed:
+            while True:
+                for when, text in self.lines[seen:]:
+                    if when >= since and all(f in text for f in fragments):
+                        return when
+                seen = len(self.lines)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.proc.poll() is not None:
+                    return None
+                self._changed.wait(remaining)
+
+    def usage(self):
+        """(cpu seconds, rss bytes) from /proc, or None off Linux."""
+        try:
+            stat = Path(f"/proc/{self.proc.pid}/stat").read_text()
+            status = Path(f"/proc/{self.proc.pid}/status").read_text()
+        except OSError:
+            return None
+        fields = stat.rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        rss = next(
+            int(line.split()[1]) * 1024
+            for line in status.splitlines()
+            if line.startswith("VmRSS:")
+        )
+        return cpu, rss
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+
+def bench_config(server, interval, timeout, restart_delay):
+    return {
+        "targets": [
+            {
+                "name": TARGET,
+                "url": server.url,
+                "interval": interval,
+                "timeout": timeout,
+                "expect": {"absent": ["Error 1033"]},
+            }
+        ],
+        "check_interval": interval,
+        # The fault server doubles as the internet anchor and the origin, so
+        # every injected fault is diagnosed as a tunnel/site failure.
+        "diagnosis": {"anchors": [f"{server.host}:{server.port}"]},
+        "failure_threshold": 3,
+        "recovery_threshold": 2,
+        "restart_budget": 1000,
+        "restart_window": 600,
+        "restart_cooldown": 0,
+        "command_timeout": 15,
+        "on_site_fail": [recovery_command(server, "ok", restart_delay)],
+        "on_wifi_fail": [],
+        "on_recovery": [],
+    }
+
+
+def run_scenario(daemon, server, fault, timeout, limit):
+    """Inject ``fault`` and time detection, remediation and recovery."""
+    started = time.monotonic()
+    server.set_fault(fault, delay=timeout * 2 if fault == "latency" else None)
+    down = daemon.wait_for(f"🔀 {TARGET}:", "→ down", since=started, timeout=limit)
+    healthy = None
+    if down is not None:
+        healthy = daemon.wait_for(
+            f"🔀 {TARGET}:", "→ healthy", since=down, timeout=limit
+        )
+    healed = server.last_change("ok")
+    if healthy is None:
+        server.set_fault("ok")  # don't let one scenario poison the next
+        daemon.wait_for(f"🔀 {TARGET}:", "→ healthy", since=started, timeout=limit)
+    return {
+        "detect": None if down is None else down - started,
+        "remediate": None if not healed or healed < started else healed - started,
+        "recover": None if healthy is None else healthy - started,
+    }
+
+
+def measure_idle(daemon, seconds):
+    """CPU time and memory of the daemon while the origin stays healthy."""
+    first = daemon.usage()
+    time.sleep(seconds)
+    last = daemon.usage()
+    if first is None or last is None:
+        return {"seconds": seconds, "supported": False}
+    cpu = last[0] - first[0]
+    return {
+        "seconds": seconds,
+        "cpu_seconds_per_hour": cpu / seconds * 3600,
+        "cpu_percent": cpu / seconds * 100,
+        "rss_mb": last[1] / 2**20,
+        "rss_growth_mb_per_hour": (last[1] - first[1]) / 2**20 / seconds * 3600,
+    }
+
+
+def measure_throughput(server, targets, seconds, timeout):
+    """Probes per second for ``targets`` endpoints swept back to back."""
+    from cloudflare_watchdog.core.probe import ProbeEngine, ProbeTarget
+
+    engine = ProbeEngine(
+        [ProbeTarget(f"t{i}", f"{server.url}t{i}", 1, timeout) for i in range(targets)]
+    )
+    try:
+        engine.sweep()  # warm the connection pools
+        probes, failures = 0, 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            results = engine.sweep()
+            probes += len(results)
+            failures += sum(not r.success for r in results)
+        elapsed = time.perf_counter() - started
+    finally:
+        engine.close()
+    return {
+        "targets": targets,
+        "probes_per_second": probes / elapsed,
+        "failures": failures,
+    }
+
+
+def run_benchmarks(
+    scenarios=SCENARIOS,
+    interval=0.5,
+    timeout=1.0,
+    restart_delay=0.5,
+    idle=30.0,
+    targets=50,
+    throughput_seconds=5.0,
+    progress=print,
+):
+    report = {
+        "version": 1,
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "settings": {
+            "interval": interval,
+            "timeout": timeout,
+            "restart_delay": restart_delay,
+        },
+        "scenarios": {},
+    }
+    limit = 20 * interval + 5 * timeout + restart_delay + 10
+    with FaultServer() as server, tempfile.TemporaryDirectory() as home:
+        progress(
+            f"⏱️ Probe throughput: {targets} targets for {throughput_seconds:g}s"
+        )
+        report["throughput"] = measure_throughput(
+            server, targets, throughput_seconds, timeout
+        )
+
+        config = Path(home) / "bench.json"
+        config.write_text(
+            json.dumps(bench_config(server, interval, timeout, restart_delay))
+        )
+        daemon = DaemonProcess(config, home).start()
+        try:
+            if daemon.wait_for("✅", server.url, timeout=30) is None:
+                raise RuntimeError("daemon never probed the origin")
+            progress(f"⏱️ Idle CPU and memory over {idle:g}s")
+            report["idle"] = measure_idle(daemon, idle)
+            for fault in scenarios:
+                progress(f"💥 Injecting {fault}")
+                report["scenarios"][fault] = run_scenario(
+                    daemon, server, fault, timeout, limit
+                )
+        finally:
+            daemon.stop()
+    return report
+
+
+def _flatten(report):
+    values = {}
+    for fault, timings in report.get("scenarios", {}).items():
+        for key in ("detect", "recover"):
+            values[f"{fault}.{key}"] = (key, timings.get(key))
+    idle = report.get("idle", {})
+    for key in ("cpu_seconds_per_hour", "rss_mb"):
+        if key in idle:
+            values[f"idle.{key}"] = (key, idle[key])
+    throughput = report.get("throughput", {})
+    if "probes_per_second" in throughput:
+        name = f"throughput[{throughput['targets']} targets]"
+        values[name] = ("probes_per_second", throughput["probes_per_second"])
+    return values
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """Regressions of ``report`` against ``baseline`` as readable strings."""
+    problems = []
+    current, previous = _flatten(report), _flatten(baseline)
+    for name, (kind, value) in current.items():
+        if value is None:
+            problems.append(f"{name}: did not happen")
+            continue
+        old = previous.get(name, (kind, None))[1]
+        if old is None:
+            continue
+        if kind == "probes_per_second":
+            if value < old / tolerance:
+                problems.append(f"{name}: {value:.1f}/s vs {old:.1f}/s")
+        elif value > old * tolerance + SLACK.get(kind, 0):
+            problems.append(f"{name}: {value:.3f} vs {old:.3f}")
+    return problems
+
+
+def format_report(report):
+    lines = [f"{'scenario':<10} {'detect':>8} {'remediate':>10} {'recover':>8}"]
+
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f}s"
+
+    for fault, t in report["scenarios"].items():
+        lines.append(
+            f"{fault:<10} {seconds(t['detect']):>8} "
+            f"{seconds(t['remediate']):>10} {seconds(t['recover']):>8}"
+        )
+    throughput = report["throughput"]
+    lines.append(
+        f"throughput: {throughput['probes_per_second']:.0f} probes/s "
+        f"over {throughput['targets']} targets"
+    )
+    idle = report.get("idle", {})
+    if idle.get("supported", True) and "cpu_percent" in idle:
+        lines.append(
+            f"idle: {idle['cpu_percent']:.2f}% CPU "
+            f"({idle['cpu_seconds_per_hour']:.1f} CPU-s/h), "
+            f"{idle['rss_mb']:.1f} MB RSS, "
+            f"{idle['rss_growth_mb_per_hour']:+.1f} MB/h"
+        )
+    else:
+        lines.append("idle: CPU/memory sampling needs /proc (Linux)")
+    return "\n".join(lines)
@@ -0,0 +1,645 @@
+"""Command-line entry point: ``python -m cloudflare_watchdog``.
+
+Only the standard library is imported at module level. The core (which
+pulls in ``requests`` and ``yaml``) is imported when a command needs it,
+and PyQt6/matplotlib only for ``gui``, so the headless daemon comes up
+quickly on small boards right after boot.
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("PyQt6", "matplotlib", "numpy", "winotify")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+STARTUP_BUDGET = 1.0
+REPORT_PREFIX = "startup-report: "
+LAUNCH_ENV = "CLOUDFLARE_WATCHDOG_LAUNCHED"
+TOKEN_ENV = "CLOUDFLARE_WATCHDOG_FLEET_TOKEN"
+
+
+def _core(args):
+    from cloudflare_watchdog.core.watchdog import WatchdogCore
+
+    return WatchdogCore(args.config)
+
+
+def cmd_run(args):
+    """Run the monitor loop in the foreground until SIGINT/SIGTERM.
+
+    Unless ``--no-control`` is given, the control API is served on a local
+    socket so GUIs and ``ctl`` can attach; their start/stop only pause the
+    loop and the daemon keeps running until it is signalled.
+    """
+    server = None
+    if args.control:
+        from cloudflare_watchdog.core.control import (
+            ControlClient,
+            ControlError,
+            ControlServer,
+        )
+
+        if ControlClient(args.control_address).available():
+            print("❌ A watchdog daemon is already running.", file=sys.stderr)
+            return 1
+    core = _core(args)
+    if args.control:
+        try:
+            server = ControlServer(core, args.control_address).start()
+        except (ControlError, OSError) as e:
+            core.log(f"❌ Control API unavailable: {e}", notify=False)
+    stop = server.quit if server else core.stop
+
+    signal.signal(signal.SIGINT, lambda *_: stop())
+    signal.signal(signal.SIGTERM, lambda *_: stop())
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: core.reload_settings())
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(
+            signal.SIGUSR1,
+            lambda *_: core.request_profile(args.profile_seconds, args.profile_mode),
+        )
+    if args.profile:
+        core.request_profile(args.profile_seconds, args.profile_mode)
+    try:
+        if server:
+            server.run()
+        else:
+            core.start()
+    finally:
+        if server:
+            server.stop()
+        # Leave supervised tunnels running; the next start adopts them.
+        core.shutdown(stop_processes=False)
+        core.pipeline.close()
+    return 0
+
+
+def cmd_check(args):
+    """Probe every target once, print the results and exit 0 if all passed.
+
+    Only a probe engine is built, so this does not bind the metrics port or
+    open the journal, pidfiles and history a running daemon is using.
+    """
+    from cloudflare_watchdog.config.settings_loader import (
+        SettingsError,
+        load_settings,
+    )
+    from cloudflare_watchdog.core.probe import ProbeEngine
+
+    try:
+        settings = load_settings(args.config)
+    except SettingsError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    engine = ProbeEngine(settings.targets)
+    try:
+        results = engine.sweep()
+    finally:
+        engine.close()
+    for result in results:
+        latency = f"{result.latency * 1000:.0f} ms" if result.latency else "-"
+        print(f"{result.target.name:<20} {latency:>8}  {result.message}")
+    return 0 if all(r.success for r in results) else 1
+
+
+def parse_when(text, now=None):
+    """``30d``/``12h`` ago, or an ISO date/time, to epoch seconds."""
+    now = time.time() if now is None else now
+    text = text.strip()
+    if text[-1:] in UNITS:
+        try:
+            return now - float(text[:-1]) * UNITS[text[-1]]
+        except ValueError:
+            pass
+    from datetime import datetime
+
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected e.g. 30d, 12h or 2025-01-31, got {text!r}"
+        ) from None
+
+
+def _percent(value):
+    return "-" if value is None else f"{value:.3%}"
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds:.1f}s"
+
+
+def cmd_report(args):
+    """Uptime, MTTR and remediation effectiveness from the incident journal."""
+    from cloudflare_watchdog.core.journal import JOURNAL_NAME, report
+    from cloudflare_watchdog.utils.paths import get_user_config_dir
+
+    path = args.journal or get_user_config_dir() / JOURNAL_NAME
+    if not os.path.exists(path):
+        print(f"No incident journal at {path}", file=sys.stderr)
+        return 1
+    targets, remediations = report(path, args.since, args.until, args.target)
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "since": args.since,
+                    "until": args.until or time.time(),
+                    "targets": [
+                        dict(vars(t), uptime=t.uptime) for t in targets
+                    ],
+                    "remediations": [
+                        dict(vars(r), effectiveness=r.effectiveness)
+                        for r in remediations
+                    ],
+                },
+                indent=2,
+            )
+        )
+        return 0
+    print(f"{'target':<20} {'uptime':>9} {'down':>8} {'incidents':>9} {'MTTR':>7}")
+    for t in targets:
+        incidents = f"{t.incidents}{'*' if t.open else ''}"
+        print(
+            f"{t.target:<20} {_percent(t.uptime):>9} {_duration(t.downtime):>8} "
+            f"{incidents:>9} {_duration(t.mttr):>7}"
+        )
+    if any(t.open for t in targets):
+        print("* still open")
+    if remediations:
+        print()
+        print(f"{'action list':<20} {'runs':>5} {'clean':>6} {'fixed':>9} {'then':>7}")
+        for r in remediations:
+            fixed = f"{r.resolved}/{r.attached}"
+            print(
+                f"{r.label:<20} {r.runs:>5} {r.succeeded:>6} {fixed:>9} "
+                f"{_duration(r.time_to_recover):>7}"
+            )
+    return 0
+
+
+def _override(text):
+    key, sep, value = text.partition("=")
+    if not sep or not key.strip():
+        raise argparse.ArgumentTypeError(f"expected key=value, got {text!r}")
+    import yaml
+
+    return key.strip(), yaml.safe_load(value)
+
+
+def cmd_replay(args):
+    """Score the current config, and a candidate, against recorded history."""
+    from cloudflare_watchdog.config.settings_loader import (
+        SettingsError,
+        compile_settings,
+        get_settings_path,
+        read_config,
+    )
+    from cloudflare_watchdog.core.replay import Recording, replay
+    from cloudflare_watchdog.utils.paths import get_user_config_dir
+
+    try:
+        path = args.config or get_settings_path()
+        current = read_config(path) if os.path.exists(path) else {}
+        configs = [("current", compile_settings(current or {}))]
+        if args.candidate or args.set:
+            data = dict(read_config(args.candidate) if args.candidate else current)
+            data.update(args.set)
+            configs.append(("candidate", compile_settings(data)))
+    except SettingsError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if args.input:
+        recording = Recording.from_jsonl(args.input, args.since, args.until)
+    else:
+        history = args.history or get_user_config_dir() / "history"
+        recording = Recording.from_store(history, args.since, args.until)
+    if not recording.series:
+        print("No recorded probes in that range", file=sys.stderr)
+        return 1
+    results = [
+        (
+            name,
+            replay(
+                recording,
+                settings,
+                args.since,
+                args.until,
+                args.min_outage,
+                args.remediation_seconds,
+            ),
+        )
+        for name, settings in configs
+    ]
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    name: {
+                        "start": r.start,
+                        "end": r.end,
+                        "samples": r.samples,
+                        "targets": [
+                            dict(
+                                {k: v for k, v in vars(t).items() if k != "downs"},
+                                missed=t.missed,
+                                mean_detection=t.mean_detection,
+                                max_detection=t.max_detection,
+                            )
+                            for t in r.targets.values()
+                        ],
+                    }
+                    for name, r in results
+                },
+                indent=2,
+            )
+        )
+        return 0
+    first = results[0][1]
+    print(
+        f"{first.samples} probes over {_duration(first.end - first.start)}, "
+        f"outages >= {_duration(args.min_outage)} count as real"
+    )
+    header = (
+        f"{'':<10} {'target':<20} {'outages':>7} {'missed':>6} {'detect':>7} "
+        f"{'worst':>7} {'false+':>6} {'fixes':>5} {'skipped':>7}"
+    )
+    print(header)
+    for name, r in results:
+        for t in r.targets.values():
+            print(
+                f"{name:<10} {t.target:<20} {t.outages:>7} {t.missed:>6} "
+                f"{_duration(t.mean_detection):>7} {_duration(t.max_detection):>7} "
+                f"{t.false_positives:>6} {t.remediations:>5} {t.skipped:>7}"
+            )
+    print(f"replayed in {sum(r.wall for _, r in results):.2f}s")
+    return 0
+
+
+def cmd_controller(args):
+    """Run a fleet controller in the foreground until SIGINT/SIGTERM."""
+    import threading
+
+    from cloudflare_watchdog.core.fleet import FleetController
+
+    token = args.token or os.environ.get(TOKEN_ENV)
+    try:
+        controller = FleetController(args.host, args.port, token).start()
+    except ValueError as e:
+        print(f"❌ {e}; pass --token or set ${TOKEN_ENV}.", file=sys.stderr)
+        return 1
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    print(f"📡 Fleet controller listening on {controller.url}", flush=True)
+    while not stopped.wait(1):
+        pass
+    controller.stop()
+    return 0
+
+
+def cmd_fleet(args):
+    """Print a controller's fleet view."""
+    from cloudflare_watchdog.core.fleet import fetch_view
+
+    view = fetch_view(args.controller, args.token or os.environ.get(TOKEN_ENV))
+    if args.json:
+        print(json.dumps(view, indent=2))
+        return 0
+    summary = view["summary"]
+    print(
+        f"{summary['agents']} agents ({summary['stale']} stale), "
+        f"{summary['targets']} targets, {summary['down']} down"
+    )
+    for agent in view["agents"]:
+        mark = "⚪" if agent["stale"] else "🔴" if agent["down"] else "🟢"
+        down = f"  down: {', '.join(agent['down'])}" if agent["down"] else ""
+        print(
+            f"{mark} {agent['id']:<24} {_duration(agent['age']):>7} ago  "
+            f"{len(agent['targets'])} targets{down}"
+        )
+    return 0
+
+
+def cmd_ctl(args):
+    """Talk to a running daemon: status, start/stop, reload, profile, events."""
+    from cloudflare_watchdog.core.control import ControlClient, ControlError
+
+    client = ControlClient(args.control_address)
+    try:
+        if args.action == "events":
+            return _follow_events(args)
+        if args.action == "profile":
+            status = client.request(
+                "profile", seconds=args.seconds, mode=args.profile_mode
+            )
+        else:
+            status = client.request(args.action)
+    except ControlError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+    state = "paused" if status["paused"] else "running"
+    print(
+        f"daemon pid {status['pid']}, {state}, up "
+        f"{_duration(time.time() - status['started'])}, "
+        f"{status['clients']} clients"
+    )
+    for name, target in sorted(status["targets"].items()):
+        print(f"  {name:<20} {target['state']:<10} {target.get('message') or ''}")
+    return 0
+
+
+def _follow_events(args):
+    from cloudflare_watchdog.core.control import EventStream
+
+    stream = EventStream(args.control_address, backlog=args.backlog)
+    stream.subscribe(lambda event: print(event.format(), flush=True))
+    stream.start()
+    try:
+        while args.follow or stream.connected is None:
+            time.sleep(0.5)
+        time.sleep(0.5)  # let the backlog arrive
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.close()
+    return 0 if stream.connected else 1
+
+
+def cmd_gui(_args):
+    from cloudflare_watchdog.app import main
+
+    return main()
+
+
+def cmd_startup_report(args):
+    """Child side of ``bench-startup``: build the core and report what loaded."""
+    started = time.perf_counter()
+    core = _core(args)
+    elapsed = time.perf_counter() - started
+    ready = time.time() - float(os.environ.get(LAUNCH_ENV, time.time()))
+    core.shutdown(stop_processes=False)
+    core.pipeline.close()
+    print(
+        REPORT_PREFIX
+        + json.dumps(
+            {
+                "core_init": elapsed,
+                "ready": ready,
+                "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+                "modules": len(sys.modules),
+            }
+        )
+    )
+    return 0
+
+
+def cmd_bench_startup(args):
+    """Time cold starts of the headless core in fresh interpreters."""
+    argv = [sys.executable, "-m", "cloudflare_watchdog"]
+    if args.config:
+        argv += ["--config", args.config]
+    argv.append("startup-report")
+
+    def timed(cmd):
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+        env[LAUNCH_ENV] = repr(time.time())
+        started = time.perf_counter()
+        out = subprocess.run(cmd, capture_output=True, text=True, env=env, check=True)
+        return time.perf_counter() - started, out.stdout
+
+    baseline = statistics.median(
+        timed([sys.executable, "-c", "pass"])[0] for _ in range(args.runs)
+    )
+    walls, reports = [], []
+    for _ in range(args.runs):
+        wall, stdout = timed(argv)
+        walls.append(wall)
+        line = next(ln for ln in stdout.splitlines() if ln.startswith(REPORT_PREFIX))
+        reports.append(json.loads(line[len(REPORT_PREFIX) :]))
+
+    wall = statistics.median(walls)
+    ready = statistics.median(r["ready"] for r in reports)
+    core_init = statistics.median(r["core_init"] for r in reports)
+    heavy = sorted({m for r in reports for m in r["heavy_modules"]})
+    print(f"interpreter baseline : {baseline * 1000:7.1f} ms")
+    print(f"launch to ready      : {ready * 1000:7.1f} ms  (median of {args.runs})")
+    print(f"  of which core      : {core_init * 1000:7.1f} ms")
+    print(f"full run with exit   : {wall * 1000:7.1f} ms")
+    print(f"modules loaded       : {reports[-1]['modules']}")
+    print(f"heavy modules        : {', '.join(heavy) or 'none'}")
+    ok = not heavy and ready <= args.budget
+    print(f"{'✅' if ok else '❌'} budget {args.budget:g}s")
+    return 0 if ok else 1
+
+
+def cmd_bench(args):
+    """Fault-injection benchmark; optionally fail on regressions."""
+    from cloudflare_watchdog.bench.harness import (
+        SCENARIOS,
+        compare,
+        format_report,
+        run_benchmarks,
+    )
+
+    scenarios = args.faults.split(",") if args.faults else SCENARIOS
+    report = run_benchmarks(
+        scenarios,
+        interval=args.interval,
+        timeout=args.timeout,
+        restart_delay=args.restart_delay,
+        idle=args.idle,
+        targets=args.targets,
+    )
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if not args.baseline:
+        return 0 if not compare(report, {}) else 1
+    with open(args.baseline, encoding="utf-8") as f:
+        problems = compare(report, json.load(f), args.tolerance)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print(f"✅ within {args.tolerance:g}x of {args.baseline}")
+    return 1 if problems else 0
+
+
+def cmd_bench_fleet(args):
+    """Load-test a controller with simulated agents in local processes."""
+    from cloudflare_watchdog.bench.fleet import (
+        format_fleet_report,
+        run_fleet_benchmark,
+    )
+
+    report = run_fleet_benchmark(
+        args.agents, args.processes, args.seconds, args.interval, args.outage
+    )
+    print(format_fleet_report(report))
+    ok = (
+        report["agents"] == report["expected_agents"]
+        and report["received"] == report["sent"]
+    )
+    print("✅ no transitions lost" if ok else "❌ transitions or agents missing")
+    return 0 if ok else 1
+
+
+def cmd_fleet_sim(args):
+    """Child side of ``bench-fleet``."""
+    from cloudflare_watchdog.bench.fleet import REPORT_PREFIX, simulate
+
+    result = simulate(
+        args.controller,
+        args.agents,
+        args.prefix,
+        args.seconds,
+        args.interval,
+        args.buffer_dir,
+    )
+    print(REPORT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cloudflare_watchdog",
+        description="Self-healing watchdog for Cloudflare tunnels and PM2 apps.",
+    )
+    parser.add_argument("--config", help="YAML or JSON config file")
+    parser.add_argument(
+        "--control-address", help="daemon control socket or pipe (default: per user)"
+    )
+    sub = parser.add_subparsers(dest="command", metavar="command")
+    run = sub.add_parser("run", help="run the headless monitor (default)")
+    run.add_argument(
+        "--profile", action="store_true", help="profile the first window on start"
+    )
+    run.add_argument(
+        "--profile-seconds", type=float, default=30.0, help="window for SIGUSR1 too"
+    )
+    run.add_argument(
+        "--profile-mode", choices=("cprofile", "sample"), default="cprofile"
+    )
+    run.add_argument(
+        "--no-control",
+        dest="control",
+        action="store_false",
+        help="do not serve the local control API",
+    )
+    # Bare ``cloudflare_watchdog`` runs too, without the subcommand's options.
+    parser.set_defaults(
+        profile=False, profile_seconds=30.0, profile_mode="cprofile", control=True
+    )
+    sub.add_parser("check", help="probe all targets once and exit")
+    sub.add_parser("gui", help="open the desktop GUI")
+    ctl = sub.add_parser("ctl", help="control a running daemon")
+    ctl.add_argument(
+        "action", choices=("status", "start", "stop", "reload", "profile", "events")
+    )
+    ctl.add_argument("--seconds", type=float, default=30.0, help="profile window")
+    ctl.add_argument(
+        "--profile-mode", choices=("cprofile", "sample"), default="cprofile"
+    )
+    ctl.add_argument("--backlog", type=int, default=50, help="events to replay")
+    ctl.add_argument("--follow", "-f", action="store_true", help="keep streaming")
+    ctl.add_argument("--json", action="store_true")
+    report = sub.add_parser("report", help="uptime/MTTR from the incident journal")
+    report.add_argument("--since", type=parse_when, default="30d")
+    report.add_argument("--until", type=parse_when)
+    report.add_argument("--target")
+    report.add_argument("--journal", help="path to journal.sqlite3")
+    report.add_argument("--json", action="store_true")
+    replay = sub.add_parser("replay", help="score a config against recorded history")
+    replay.add_argument("--candidate", help="config file to compare with --config")
+    replay.add_argument(
+        "--set",
+        type=_override,
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="candidate override, e.g. failure_threshold=5 (repeatable)",
+    )
+    replay.add_argument("--history", help="history directory to read")
+    replay.add_argument("--input", help="JSON lines of {ts, target, ok} instead")
+    replay.add_argument("--since", type=parse_when, default="30d")
+    replay.add_argument("--until", type=parse_when)
+    replay.add_argument("--min-outage", type=float, default=60.0)
+    replay.add_argument("--remediation-seconds", type=float, default=10.0)
+    replay.add_argument("--json", action="store_true")
+    controller = sub.add_parser("controller", help="run a fleet controller")
+    controller.add_argument(
+        "--host", default="127.0.0.1", help="other than loopback needs --token"
+    )
+    controller.add_argument("--port", type=int, default=9300)
+    controller.add_argument("--token", help=f"shared secret (or ${TOKEN_ENV})")
+    fleet = sub.add_parser("fleet", help="show a fleet controller's view")
+    fleet.add_argument("--controller", default="http://127.0.0.1:9300")
+    fleet.add_argument("--token", help=f"shared secret (or ${TOKEN_ENV})")
+    fleet.add_argument("--json", action="store_true")
+    bench = sub.add_parser("bench-startup", help="measure cold-start time")
+    bench.add_argument("--runs", type=int, default=5)
+    bench.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    bench = sub.add_parser("bench", help="fault-injection benchmark")
+    bench.add_argument("--faults", help="comma-separated subset of scenarios")
+    bench.add_argument("--interval", type=float, default=0.5)
+    bench.add_argument("--timeout", type=float, default=1.0)
+    bench.add_argument("--restart-delay", type=float, default=0.5)
+    bench.add_argument("--idle", type=float, default=30.0, help="idle seconds")
+    bench.add_argument("--targets", type=int, default=50)
+    bench.add_argument("--output", help="write the JSON report here")
+    bench.add_argument("--baseline", help="JSON report to compare against")
+    bench.add_argument("--tolerance", type=float, default=1.5)
+    bench = sub.add_parser("bench-fleet", help="load-test a fleet controller")
+    bench.add_argument("--agents", type=int, default=300)
+    bench.add_argument("--processes", type=int, default=4)
+    bench.add_argument("--seconds", type=float, default=20.0)
+    bench.add_argument("--interval", type=float, default=1.0)
+    bench.add_argument("--outage", type=float, default=5.0)
+    sub.add_parser("startup-report")  # child side of bench-startup
+    sim = sub.add_parser("fleet-sim")  # child side of bench-fleet
+    sim.add_argument("--controller", required=True)
+    sim.add_argument("--agents", type=int, required=True)
+    sim.add_argument("--prefix", default="edge-")
+    sim.add_argument("--seconds", type=float, default=20.0)
+    sim.add_argument("--interval", type=float, default=1.0)
+    sim.add_argument("--buffer-dir", required=True)
+    return parser
+
+
+COMMANDS = {
+    None: cmd_run,
+    "run": cmd_run,
+    "check": cmd_check,
+    "gui": cmd_gui,
+    "ctl": cmd_ctl,
+    "report": cmd_report,
+    "replay": cmd_replay,
+    "controller": cmd_controller,
+    "fleet": cmd_fleet,
+    "bench": cmd_bench,
+    "bench-startup": cmd_bench_startup,
+    "startup-report": cmd_startup_report,
+    "bench-fleet": cmd_bench_fleet,
+    "fleet-sim": cmd_fleet_sim,
+}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args)
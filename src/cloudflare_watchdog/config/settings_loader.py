@@ -1,14 +1,492 @@
-import yaml
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
+from types import MappingProxyType
+from urllib.parse import urlsplit
+
+import yaml
+
+from cloudflare_watchdog.core.cloudflared import (
+    DEFAULT_MAX_ERROR_RATE,
+    DEFAULT_MIN_CONNECTIONS,
+)
+from cloudflare_watchdog.core.diagnosis import (
+    DEFAULT_ANCHORS,
+    DEFAULT_TIMEOUT as DIAGNOSIS_TIMEOUT,
+    parse_address,
+)
+from cloudflare_watchdog.core.executor import DEFAULT_COMMAND_TIMEOUT, ActionStep
+from cloudflare_watchdog.core.fleet import DEFAULT_HEARTBEAT
+from cloudflare_watchdog.core.network import (
+    DEFAULT_POLL_INTERVAL as NETWORK_POLL_INTERVAL,
+    NETWORK_TARGET,
+    SOURCES as NETWORK_SOURCES,
+)
+from cloudflare_watchdog.core.probe import DEFAULT_TIMEOUT, ProbeTarget
+from cloudflare_watchdog.core.scheduler import (
+    DEFAULT_CONFIRM_INTERVAL,
+    DEFAULT_JITTER,
+    DEFAULT_MAX_BACKOFF,
+)
+from cloudflare_watchdog.core.validation import Expectation
+from cloudflare_watchdog.utils.paths import get_user_config_dir
+
+CONFIG_PATH = Path(__file__).resolve().parents[3] / "config" / "config.yaml"
+CONFIG_ENV = "CLOUDFLARE_WATCHDOG_CONFIG"
+
+DEFAULTS = {
+    "target_url": "https://example.com",
+    "check_interval": 30,
+    "failure_threshold": 3,
+    "recovery_threshold": 2,
+    "restart_budget": 3,
+    "restart_window": 600,
+    "restart_cooldown": 60,
+    "command_timeout": DEFAULT_COMMAND_TIMEOUT,
+    "metrics_host": "127.0.0.1",
+    "metrics_port": 0,
+    "confirm_interval": DEFAULT_CONFIRM_INTERVAL,
+    "max_backoff": DEFAULT_MAX_BACKOFF,
+    "probe_jitter": DEFAULT_JITTER,
+}
+
+TARGET_TYPES = ("http", "cloudflared")
+PROBE_METHODS = ("GET", "HEAD")
+ACTION_LISTS = ("on_site_fail", "on_tunnel_fail", "on_wifi_fail", "on_recovery")
+
+# config.yaml groups actions under "actions:" with older names.
+ACTION_ALIASES = {
+    "on_internet_down": "on_wifi_fail",
+    "on_site_down": "on_site_fail",
+    "on_tunnel_down": "on_tunnel_fail",
+    "on_recovery": "on_recovery",
+}
+
+
+class SettingsError(ValueError):
+    """Raised when a config file cannot be parsed or fails validation."""
+
+
+def get_settings_path():
+    """Pick the config file: $CLOUDFLARE_WATCHDOG_CONFIG, user dir, then bundled."""
+    if os.getenv(CONFIG_ENV):
+        return Path(os.environ[CONFIG_ENV])
+    user_dir = get_user_config_dir()
+    candidates = [user_dir / "settings.json", user_dir / "config.yaml", CONFIG_PATH]
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    return candidates[0]
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Validated, read-only view of the watchdog configuration."""
+
+    target_url: str = DEFAULTS["target_url"]
+    check_interval: float = DEFAULTS["check_interval"]
+    failure_threshold: int = DEFAULTS["failure_threshold"]
+    recovery_threshold: int = DEFAULTS["recovery_threshold"]
+    restart_budget: int = DEFAULTS["restart_budget"]
+    restart_window: float = DEFAULTS["restart_window"]
+    restart_cooldown: float = DEFAULTS["restart_cooldown"]
+    command_timeout: float = DEFAULTS["command_timeout"]
+    confirm_interval: float = DEFAULTS["confirm_interval"]
+    max_backoff: float = DEFAULTS["max_backoff"]
+    probe_jitter: float = DEFAULTS["probe_jitter"]
+    metrics_host: str = DEFAULTS["metrics_host"]
+    metrics_port: int = DEFAULTS["metrics_port"]  # 0 disables the exporter
+    wifi_network: str = None
+    targets: tuple = ()
+    anchors: tuple = DEFAULT_ANCHORS
+    diagnosis_timeout: float = DIAGNOSIS_TIMEOUT
+    fast_path: bool = True
+    fleet_controller: str = None  # None: not part of a fleet
+    fleet_agent_id: str = None  # None: the hostname
+    fleet_interval: float = DEFAULT_HEARTBEAT
+    fleet_token: str = None
+    network_source: str = "auto"  # "off": rely on probes alone
+    network_poll_interval: float = NETWORK_POLL_INTERVAL
+    on_site_fail: tuple = ()
+    on_tunnel_fail: tuple = ()
+    on_wifi_fail: tuple = ()
+    on_recovery: tuple = ()
+    raw: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    def get(self, key, default=None):
+        """Dict-style access to the raw config, for editors and extensions."""
+        return self.raw.get(key, default)
+
+    def actions(self, name):
+        return getattr(self, name, ())
+
+
+def compile_steps(entries, name, timeout=DEFAULT_COMMAND_TIMEOUT):
+    """Turn an action list into ``ActionStep``s with dependencies resolved.
+
+    Plain strings keep the old behaviour: ';' and newlines split them into
+    steps, and each step waits for the one before it. Mapping entries
+    (``{name, run, after, timeout, supervise, restart}``) only wait for the steps
+    named in ``after``, so independent commands can run side by side.
+    """
+    if entries is None:
+        return ()
+    if isinstance(entries, str):
+        entries = [entries]
+    if not isinstance(entries, (list, tuple)):
+        raise SettingsError(f"{name} must be a list of commands")
+    steps = []
+    for raw in entries:
+        previous = (steps[-1].name,) if steps else ()
+        if isinstance(raw, str):
+            for command in (
+                c.strip() for c in raw.replace(";", "\n").splitlines() if c.strip()
+            ):
+                steps.append(
+                    ActionStep(f"{name}[{len(steps)}]", command, previous, timeout)
+                )
+                previous = (steps[-1].name,)
+        elif isinstance(raw, dict) and isinstance(raw.get("run"), str):
+            after = raw.get("after") or ()
+            after = (after,) if isinstance(after, str) else tuple(after)
+            try:
+                step_timeout = float(raw.get("timeout", timeout))
+            except (TypeError, ValueError):
+                raise SettingsError(f"{name}: timeout must be a number") from None
+            supervise = raw.get("supervise")
+            steps.append(
+                ActionStep(
+                    str(raw.get("name") or f"{name}[{len(steps)}]"),
+                    raw["run"].strip(),
+                    after,
+                    step_timeout,
+                    None if supervise is None else bool(supervise),
+                    bool(raw.get("restart", False)),
+                )
+            )
+        else:
+            raise SettingsError(
+                f"{name} entries must be strings or {{name, run, after}}, got {raw!r}"
+            )
+    _check_dependencies(steps, name)
+    return tuple(steps)
+
+
+def _check_dependencies(steps, name):
+    known = [step.name for step in steps]
+    if len(set(known)) != len(known):
+        raise SettingsError(f"{name}: step names must be unique")
+    for step in steps:
+        for dep in step.after:
+            if dep not in known:
+                raise SettingsError(f"{name}: {step.name} waits for unknown {dep!r}")
+    remaining = {step.name: set(step.after) for step in steps}
+    while remaining:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            raise SettingsError(f"{name}: dependency cycle among {sorted(remaining)}")
+        for n in ready:
+            del remaining[n]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def _number(data, key, cast, minimum):
+    value = data.get(key, DEFAULTS[key])
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise SettingsError(f"{key} must be a number, got {value!r}") from None
+    if value < minimum:
+        raise SettingsError(f"{key} must be at least {minimum}, got {value}")
+    return value
+
+
+def _url(value, name):
+    if not isinstance(value, str) or urlsplit(value).scheme not in ("http", "https"):
+        raise SettingsError(f"{name} must be an http(s) URL, got {value!r}")
+    return value
+
+
+def compile_targets(data, check_interval):
+    entries = data.get("targets") or [
+        {"name": "site", "url": data.get("target_url", DEFAULTS["target_url"])}
+    ]
+    if not isinstance(entries, list):
+        raise SettingsError("targets must be a list")
+    targets = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        if not isinstance(entry, dict) or "url" not in entry:
+            raise SettingsError(f"targets[{index}] needs a url")
+        url = _url(entry["url"], f"targets[{index}].url")
+        name = entry.get("name") or urlsplit(url).netloc or f"target-{index}"
+        try:
+            interval = float(entry.get("interval", check_interval))
+            timeout = float(entry.get("timeout", DEFAULT_TIMEOUT))
+        except (TypeError, ValueError):
+            raise SettingsError(
+                f"targets[{index}] interval/timeout must be numbers"
+            ) from None
+        if interval <= 0 or timeout <= 0:
+            raise SettingsError(
+                f"targets[{index}] interval/timeout must be positive"
+            )
+        kind = entry.get("type", "http")
+        if kind not in TARGET_TYPES:
+            raise SettingsError(
+                f"targets[{index}].type must be one of {TARGET_TYPES}, got {kind!r}"
+            )
+        origin = entry.get("origin", data.get("origin"))
+        if origin is not None and kind == "http":
+            try:
+                origin = parse_address(origin)
+            except ValueError as e:
+                raise SettingsError(f"targets[{index}].origin: {e}") from None
+        else:
+            origin = None
+        try:
+            min_connections = int(
+                entry.get("min_connections", DEFAULT_MIN_CONNECTIONS)
+            )
+            max_error_rate = float(entry.get("max_error_rate", DEFAULT_MAX_ERROR_RATE))
+        except (TypeError, ValueError):
+            raise SettingsError(
+                f"targets[{index}] min_connections/max_error_rate must be numbers"
+            ) from None
+        method = str(entry.get("method", data.get("method", "GET"))).upper()
+        if method not in PROBE_METHODS:
+            raise SettingsError(
+                f"targets[{index}].method must be one of {PROBE_METHODS}"
+            )
+        try:
+            expect = Expectation.from_config(
+                entry.get("expect", data.get("expect")), method
+            )
+        except (TypeError, ValueError, re.error) as e:
+            raise SettingsError(f"targets[{index}].expect: {e}") from None
+        targets.append(
+            ProbeTarget(
+                name,
+                url,
+                interval,
+                timeout,
+                origin,
+                kind,
+                min_connections,
+                max_error_rate,
+                method,
+                expect,
+            )
+        )
+    names = [t.name for t in targets]
+    if len(set(names)) != len(names):
+        raise SettingsError(f"target names must be unique: {names}")
+    return tuple(targets)
+
+
+def compile_diagnosis(data):
+    """``diagnosis: {anchors, timeout, fast_path}`` to Settings fields."""
+    section = data.get("diagnosis") or {}
+    if not isinstance(section, dict):
+        raise SettingsError("diagnosis must be a mapping")
+    anchors = []
+    for value in section.get("anchors", DEFAULT_ANCHORS):
+        try:
+            host, port = parse_address(value)
+        except ValueError as e:
+            raise SettingsError(f"diagnosis.anchors: {e}") from None
+        anchors.append((host, port))
+    try:
+        timeout = float(section.get("timeout", DIAGNOSIS_TIMEOUT))
+    except (TypeError, ValueError):
+        raise SettingsError("diagnosis.timeout must be a number") from None
+    if timeout <= 0:
+        raise SettingsError("diagnosis.timeout must be positive")
+    return {
+        "anchors": tuple(anchors),
+        "diagnosis_timeout": timeout,
+        "fast_path": bool(section.get("fast_path", True)),
+    }
+
+
+def compile_fleet(data):
+    """``fleet: {controller, agent_id, interval, token}`` to Settings fields."""
+    section = data.get("fleet") or {}
+    if not isinstance(section, dict):
+        raise SettingsError("fleet must be a mapping")
+    controller = section.get("controller")
+    if controller is not None:
+        controller = _url(controller, "fleet.controller")
+    try:
+        interval = float(section.get("interval", DEFAULT_HEARTBEAT))
+    except (TypeError, ValueError):
+        raise SettingsError("fleet.interval must be a number") from None
+    if interval < 1:
+        raise SettingsError("fleet.interval must be at least 1")
+    agent_id = section.get("agent_id")
+    token = section.get("token")
+    return {
+        "fleet_controller": controller,
+        "fleet_agent_id": None if agent_id is None else str(agent_id),
+        "fleet_interval": interval,
+        "fleet_token": None if token is None else str(token),
+    }
+
+
+def compile_network(data):
+    """``network: {source, poll_interval}`` to Settings fields."""
+    section = data.get("network") or {}
+    if not isinstance(section, dict):
+        raise SettingsError("network must be a mapping")
+    source = str(section.get("source", "auto")).lower()
+    if source not in NETWORK_SOURCES:
+        raise SettingsError(
+            f"network.source must be one of {NETWORK_SOURCES}, got {source!r}"
+        )
+    try:
+        interval = float(section.get("poll_interval", NETWORK_POLL_INTERVAL))
+    except (TypeError, ValueError):
+        raise SettingsError("network.poll_interval must be a number") from None
+    if interval < 0.1:
+        raise SettingsError("network.poll_interval must be at least 0.1")
+    return {"network_source": source, "network_poll_interval": interval}
+
+
+def compile_settings(data):
+    """Validate a raw mapping and build an immutable ``Settings``."""
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise SettingsError("config root must be a mapping")
+    raw = dict(data)
+    data = dict(data)
+    for alias, name in ACTION_ALIASES.items():
+        if alias in (data.get("actions") or {}) and name not in data:
+            data[name] = data["actions"][alias]
+    check_interval = _number(data, "check_interval", float, 0.1)
+    target_url = data.get("target_url", DEFAULTS["target_url"])
+    command_timeout = _number(data, "command_timeout", float, 0.1)
+    targets = compile_targets(data, check_interval)
+    network = compile_network(data)
+    if network["network_source"] != "off" and any(
+        t.name == NETWORK_TARGET for t in targets
+    ):
+        raise SettingsError(
+            f"target name {NETWORK_TARGET!r} is reserved for network events"
+        )
+    return Settings(
+        target_url=_url(target_url, "target_url"),
+        check_interval=check_interval,
+        failure_threshold=_number(data, "failure_threshold", int, 1),
+        recovery_threshold=_number(data, "recovery_threshold", int, 1),
+        restart_budget=_number(data, "restart_budget", int, 0),
+        restart_window=_number(data, "restart_window", float, 0),
+        restart_cooldown=_number(data, "restart_cooldown", float, 0),
+        command_timeout=command_timeout,
+        confirm_interval=_number(data, "confirm_interval", float, 0.1),
+        max_backoff=_number(data, "max_backoff", float, 0.1),
+        probe_jitter=min(_number(data, "probe_jitter", float, 0), 0.5),
+        metrics_host=str(data.get("metrics_host", DEFAULTS["metrics_host"])),
+        metrics_port=_number(data, "metrics_port", int, 0),
+        wifi_network=data.get("wifi_network"),
+        targets=targets,
+        **compile_diagnosis(data),
+        **compile_fleet(data),
+        **network,
+        **{
+            key: compile_steps(data.get(key), key, command_timeout)
+            for key in ACTION_LISTS
+        },
+        raw=MappingProxyType(raw),
+    )
+
+
+def read_config(path):
+    """Parse a YAML or JSON config file into a plain mapping."""
+    path = Path(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.suffix.lower() == ".json":
+                return json.load(f)
+            return yaml.safe_load(f)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        raise SettingsError(f"Failed to read {path}: {e}") from e
+
+
+def load_settings(path=None):
+    path = Path(path) if path else get_settings_path()
+    if not path.exists():
+        return compile_settings(DEFAULTS)
+    return compile_settings(read_config(path))
+
+
+def save_settings(settings, path=None):
+    path = Path(path) if path else get_settings_path()
+    data = dict(settings.raw if isinstance(settings, Settings) else settings)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        if path.suffix.lower() == ".json":
+            json.dump(data, f, indent=2)
+        else:
+            yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+    os.replace(tmp, path)
+
+
+class SettingsStore:
+    """Holds the current ``Settings`` and reloads it only when the file changes.
+
+    ``check()`` costs one ``stat`` call; the file is parsed again only when
+    its mtime or size moved. A new object is compiled off to the side and
+    swapped in with a single reference assignment, so readers never see a
+    half-applied config. A file that fails validation leaves the previous
+    settings in place.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else get_settings_path()
+        self._settings = compile_settings(DEFAULTS)
+        self._stamp = None
+        self._lock = threading.Lock()
 
-CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / "config" / "config.yaml"
+    @property
+    def current(self):
+        return self._settings
 
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
-def load_settings():
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    def check(self):
+        """Reload if the file changed since the last load; return True if it did."""
+        if self._file_stamp() == self._stamp:
+            return False
+        return self.reload()
 
+    def reload(self):
+        """Force a reload from disk. Raises ``SettingsError`` on invalid config."""
+        with self._lock:
+            stamp = self._file_stamp()
+            self._stamp = stamp
+            if stamp is None:
+                settings = compile_settings(DEFAULTS)
+            else:
+                settings = compile_settings(read_config(self.path))
+            self._settings = settings
+        return True
 
-def save_settings(settings):
-    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-        yaml.dump(settings, f)
+    def save(self, data):
+        """Write ``data`` to the config file and swap it in immediately."""
+        settings = compile_settings(data)
+        with self._lock:
+            save_settings(settings, self.path)
+            self._stamp = self._file_stamp()
+            self._settings = settings
+        return settings
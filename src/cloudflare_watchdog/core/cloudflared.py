@@ -0,0 +1,129 @@
+import json
+import threading
+from dataclasses import dataclass
+
+READY_PATH = "/ready"
+METRICS_PATH = "/metrics"
+
+HA_CONNECTIONS = "cloudflared_tunnel_ha_connections"
+TOTAL_REQUESTS = "cloudflared_tunnel_total_requests"
+REQUEST_ERRORS = "cloudflared_tunnel_request_errors"
+WANTED = (HA_CONNECTIONS, TOTAL_REQUESTS, REQUEST_ERRORS)
+
+DEFAULT_MIN_CONNECTIONS = 2  # cloudflared opens 4 by default
+DEFAULT_MAX_ERROR_RATE = 0.5
+MIN_REQUESTS_FOR_RATE = 10
+
+
+def parse_metrics(lines, wanted=WANTED):
+    """Sum the samples of ``wanted`` metric families from exposition lines.
+
+    ``lines`` may be a lazy stream (``Response.iter_lines()``). Families are
+    contiguous in the text format and cloudflared's sort before the bulky
+    ``go_*``/``process_*`` ones, so parsing stops as soon as every wanted
+    family has been read and the rest of the body is never touched.
+    """
+    wanted = set(wanted)
+    totals = {}
+    current = None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", "replace")
+        if not line or line.startswith("#"):
+            continue
+        name_end = len(line)
+        for sep in ("{", " "):
+            index = line.find(sep)
+            if index != -1:
+                name_end = min(name_end, index)
+        name = line[:name_end]
+        if name != current:
+            if current in wanted and wanted <= totals.keys():
+                break
+            current = name
+        if name not in wanted:
+            continue
+        try:
+            value = float(line.rsplit(" ", 1)[1])
+        except (IndexError, ValueError):
+            continue
+        totals[name] = totals.get(name, 0.0) + value
+    return totals
+
+
+@dataclass
+class TunnelStatus:
+    ready: bool
+    ready_connections: int = None
+    ha_connections: int = None
+    requests: float = None  # since the previous scrape
+    errors: float = None
+
+    @property
+    def error_rate(self):
+        if not self.requests or self.requests < MIN_REQUESTS_FOR_RATE:
+            return None
+        return self.errors / self.requests
+
+
+class TunnelMonitor:
+    """Judge cloudflared's local ``/ready`` + ``/metrics`` for each target.
+
+    Request counters are cumulative, so the error rate is taken over the
+    interval since the previous scrape of the same target. A counter that
+    goes backwards means cloudflared restarted, and the baseline is reset.
+    """
+
+    def __init__(self):
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    def status(self, target, ready_code, ready_body, metrics):
+        ready_connections = None
+        try:
+            ready_connections = int(json.loads(ready_body)["readyConnections"])
+        except (ValueError, KeyError, TypeError):
+            pass
+        status = TunnelStatus(ready_code == 200 and ready_connections != 0)
+        status.ready_connections = ready_connections
+        if metrics is None:
+            return status
+        if HA_CONNECTIONS in metrics:
+            status.ha_connections = int(metrics[HA_CONNECTIONS])
+        counters = (metrics.get(TOTAL_REQUESTS), metrics.get(REQUEST_ERRORS, 0.0))
+        with self._lock:
+            previous = self._previous.get(target.name)
+            self._previous[target.name] = counters
+        if previous and counters[0] is not None and previous[0] is not None:
+            requests, errors = counters[0] - previous[0], counters[1] - previous[1]
+            if requests >= 0 and errors >= 0:
+                status.requests, status.errors = requests, errors
+        return status
+
+    def forget(self, keep):
+        with self._lock:
+            for name in list(self._previous):
+                if name not in keep:
+                    del self._previous[name]
+
+    @staticmethod
+    def judge(target, status):
+        """(ok, message) for a ``TunnelStatus``."""
+        if not status.ready:
+            return False, "🚇 Tunnel not ready (no edge connections)"
+        connections = status.ha_connections
+        if connections is None:
+            connections = status.ready_connections
+        if connections is not None and connections < target.min_connections:
+            return (
+                False,
+                f"🚇 Tunnel degraded: {connections} edge connection(s), "
+                f"need {target.min_connections}",
+            )
+        rate = status.error_rate
+        if rate is not None and rate > target.max_error_rate:
+            return (
+                False,
+                f"🚇 Tunnel erroring: {rate:.0%} of {status.requests:.0f} requests",
+            )
+        return True, f"✅ Tunnel ready: {connections} edge connection(s)"
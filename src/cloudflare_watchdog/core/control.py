@@ -0,0 +1,562 @@
+import getpass
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import islice
+from pathlib import Path
+
+from cloudflare_watchdog.utils.logging_utils import LogEvent
+from cloudflare_watchdog.utils.paths import get_user_config_dir
+
+SOCKET_NAME = "control.sock"
+KEY_NAME = "control.key"  # shared secret; readable only by the user
+BACKLOG = 2000  # events kept for subscribers that (re)connect
+MAX_MESSAGE = 4 * 1024 * 1024
+REQUEST_TIMEOUT = 5.0
+STREAM_INTERVAL = 0.1  # a subscriber gets at most one batch this often
+KEEPALIVE = 15.0  # idle seconds before a subscriber is sent an empty batch
+RECONNECT = 2.0
+COMMANDS = (
+    "status",
+    "start",
+    "stop",
+    "reload",
+    "profile",
+    "settings",
+    "save_settings",
+    "subscribe",
+)
+# Safe to send again when the connection broke before the reply arrived.
+IDEMPOTENT = ("status", "start", "stop", "reload", "settings")
+DAEMON_ENV = "CLOUDFLARE_WATCHDOG_DAEMON"  # set for a spawned daemon
+
+
+class ControlError(RuntimeError):
+    """The daemon could not be reached or refused a request."""
+
+
+def default_address():
+    """Per-user Unix socket, or named pipe on Windows."""
+    if os.name == "nt":
+        return rf"\\.\pipe\cloudflare-watchdog-{getpass.getuser()}"
+    return str(get_user_config_dir() / SOCKET_NAME)
+
+
+def _family(address):
+    return "AF_PIPE" if address.startswith("\\\\") else "AF_UNIX"
+
+
+def _authkey(create=False):
+    """Secret a client must prove it can read before the daemon answers.
+
+    Socket permissions alone do not cover named pipes, nor the moment
+    between binding a socket and restricting it.
+    """
+    path = get_user_config_dir() / KEY_NAME
+    if create:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "wb") as f:
+                f.write(os.urandom(32).hex().encode())
+    try:
+        return path.read_bytes()
+    except OSError as e:
+        raise ControlError(f"cannot read the control key: {e}") from e
+
+
+def _connect(address):
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+
+    try:
+        return Client(address, _family(address), authkey=_authkey())
+    except (OSError, EOFError, AuthenticationError) as e:
+        raise ControlError(f"watchdog daemon not reachable at {address}: {e}") from e
+
+
+def _send(conn, payload):
+    conn.send_bytes(json.dumps(payload, default=str).encode())
+
+
+def _receive(conn, timeout=None):
+    if timeout is not None and not conn.poll(timeout):
+        raise ControlError("watchdog daemon did not answer in time")
+    return json.loads(conn.recv_bytes(MAX_MESSAGE))
+
+
+class EventFeed:
+    """Recent pipeline events, numbered, shared by every subscriber.
+
+    ``push`` runs on the log writer thread: it JSON-encodes the event once
+    and appends it to a bounded deque. Subscriber threads wait on the
+    condition and copy out what is newer than their cursor, at most once per
+    ``STREAM_INTERVAL``, so a burst of events wakes each subscriber a few
+    times rather than once per event. The monitor loop never sees them.
+    """
+
+    def __init__(self, capacity=BACKLOG):
+        self.events = deque(maxlen=capacity)  # (seq, encoded event)
+        self.seq = 0
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        encoded = json.dumps(
+            {
+                "ts": event.timestamp,
+                "level": event.level,
+                "source": event.source,
+                "message": event.message,
+                "notify": event.notify,
+                "fields": event.fields,
+            },
+            default=str,
+        )
+        with self._cond:
+            self.seq += 1
+            self.events.append((self.seq, f'{{"seq":{self.seq},{encoded[1:]}'))
+            self._cond.notify_all()
+
+    def after(self, seq, timeout=None):
+        """Encoded events newer than ``seq`` and how many were already dropped.
+
+        Waits up to ``timeout`` when there is nothing new yet.
+        """
+        with self._cond:
+            if self.seq <= seq and timeout:
+                self._cond.wait(timeout)
+            if not self.events or self.seq <= seq:
+                return [], 0
+            first = self.events[0][0]
+            start = max(0, seq + 1 - first)
+            return [e for _, e in islice(self.events, start, None)], max(
+                0, first - seq - 1
+            )
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class ControlServer:
+    """Local control and event API for one running ``WatchdogCore``.
+
+    Clients connect to a Unix socket (a named pipe on Windows) and send
+    length-prefixed JSON requests such as ``{"cmd": "status"}``; each
+    connection gets its own thread. ``subscribe`` turns a connection into an
+    event stream: the last ``backlog`` events are replayed first (or only
+    those after ``after``, when reconnecting to the same daemon ``boot``),
+    then new ones follow in batches. ``stop`` and ``start`` only pause and
+    resume the monitor loop; the daemon keeps serving until ``quit()``.
+    """
+
+    def __init__(self, core, address=None):
+        self.core = core
+        self.address = address or default_address()
+        self.boot = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.feed = EventFeed()
+        self.paused = False
+        self.clients = 0
+        self._listener = None
+        self._key = None
+        self._quit = threading.Event()
+        self._resumed = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Bind the socket; fails if another daemon already answers on it."""
+        from multiprocessing.connection import Listener
+
+        if _family(self.address) == "AF_UNIX" and os.path.exists(self.address):
+            try:
+                _connect(self.address).close()
+            except ControlError:
+                os.unlink(self.address)  # left behind by a crashed daemon
+            else:
+                raise ControlError(
+                    f"a watchdog daemon is already running at {self.address}"
+                )
+        self._key = _authkey(create=True)
+        if _family(self.address) == "AF_UNIX":
+            # Bind with owner-only permissions from the start, not chmod later.
+            umask = os.umask(0o077)
+            try:
+                self._listener = Listener(self.address, "AF_UNIX")
+            finally:
+                os.umask(umask)
+            os.chmod(self.address, 0o600)
+        else:
+            self._listener = Listener(self.address, "AF_PIPE")
+        self.core.pipeline.subscribe(self.feed.push)
+        threading.Thread(
+            target=self._accept,
+            args=(self._listener,),
+            name="control-server",
+            daemon=True,
+        ).start()
+        self.core.log(f"🎛️ Control API listening at {self.address}", notify=False)
+        return self
+
+    def run(self):
+        """Run the monitor loop in this thread until ``quit()``."""
+        while not self._quit.is_set():
+            if self.paused:
+                self._resumed.wait()
+                self._resumed.clear()
+                continue
+            self.core.start()
+
+    def resume(self):
+        self.paused = False
+        self._resumed.set()
+
+    def pause(self):
+        self.paused = True
+        self.core.stop()
+
+    def quit(self):
+        """Stop the loop for good; safe from a signal handler."""
+        self._quit.set()
+        self._resumed.set()
+        self.core.stop()
+
+    def stop(self):
+        self.quit()
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        self.core.pipeline.unsubscribe(self.feed.push)
+        try:
+            _connect(self.address).close()  # wake the accept() call
+        except ControlError:
+            pass
+        listener.close()
+        self.feed.wake()
+
+    def _accept(self, listener):
+        while self._listener is listener:
+            try:
+                conn = listener.accept()
+            except OSError:
+                continue  # a client that gave up, or the listener closing
+            if self._listener is not listener:
+                conn.close()
+                return
+            threading.Thread(
+                target=self._serve, args=(conn,), name="control-client", daemon=True
+            ).start()
+
+    def _serve(self, conn):
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import answer_challenge, deliver_challenge
+
+        with self._lock:
+            self.clients += 1
+        try:
+            # The handshake runs here rather than in accept(), so a client
+            # that stalls in it holds up only its own thread.
+            deliver_challenge(conn, self._key)
+            answer_challenge(conn, self._key)
+            while self._listener is not None:
+                request = _receive(conn)
+                if not isinstance(request, dict):
+                    _send(conn, {"ok": False, "error": "request must be an object"})
+                    continue
+                if request.get("cmd") == "subscribe":
+                    self._stream(conn, request)
+                    return
+                try:
+                    reply = {"ok": True, "result": self.handle(request)}
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                except Exception as e:  # e.g. OSError writing the settings
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                _send(conn, reply)
+        except (EOFError, OSError, ValueError, AuthenticationError):
+            pass  # client went away, sent garbage or did not know the key
+        finally:
+            conn.close()
+            with self._lock:
+                self.clients -= 1
+
+    def handle(self, request):
+        """Run one control command and return its JSON-ready result."""
+        cmd = request.get("cmd")
+        core = self.core
+        if cmd == "status":
+            return self.status()
+        if cmd == "start":
+            self.resume()
+        elif cmd == "stop":
+            self.pause()
+        elif cmd == "reload":
+            core.reload_settings()
+        elif cmd == "profile":
+            if self.paused:
+                raise ValueError("the watchdog is stopped; start it to profile")
+            core.request_profile(
+                float(request.get("seconds", 30)), request.get("mode", "cprofile")
+            )
+        elif cmd == "settings":
+            return dict(core.settings.raw)
+        elif cmd == "save_settings":
+            core.save_settings(request["data"])  # SettingsError is a ValueError
+        else:
+            raise ValueError(f"unknown command {cmd!r}, expected one of {COMMANDS}")
+        return self.status()
+
+    def status(self):
+        core = self.core
+        return {
+            "pid": os.getpid(),
+            "boot": self.boot,
+            "started": self.started,
+            "running": core.running,
+            "paused": self.paused,
+            "clients": self.clients,
+            "settings_path": str(core.settings_path),
+            "log_path": str(core.pipeline.path),
+            "history": str(core.history.directory),
+            "targets": core.fleet_snapshot(),
+            "processes": core.process_status(),
+        }
+
+    def _stream(self, conn, request):
+        if request.get("boot") == self.boot and request.get("after") is not None:
+            cursor = int(request["after"])
+        else:
+            cursor = max(0, self.feed.seq - int(request.get("backlog", BACKLOG)))
+        _send(conn, {"ok": True, "result": {"boot": self.boot, "seq": cursor}})
+        while self._listener is not None:
+            events, dropped = self.feed.after(cursor, KEEPALIVE)
+            cursor += len(events) + dropped
+            # Events are already encoded; splice them in instead of re-encoding.
+            conn.send_bytes(
+                f'{{"dropped":{dropped},"seq":{cursor},'
+                f'"events":[{",".join(events)}]}}'.encode()
+            )
+            if events:
+                time.sleep(STREAM_INTERVAL)  # let the next batch build up
+
+
+class ControlClient:
+    """Request/response connection to a running daemon."""
+
+    def __init__(self, address=None, timeout=REQUEST_TIMEOUT):
+        self.address = address or default_address()
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def request(self, cmd, **args):
+        """Send one command and return its result.
+
+        A connection that broke mid-request (the daemon restarted) is retried
+        once, but only for ``IDEMPOTENT`` commands. Others check that the
+        connection is still alive before sending and are never sent twice.
+        """
+        retry = cmd in IDEMPOTENT
+        with self._lock:
+            if not retry and self._conn is not None and self._conn.poll():
+                # An idle connection only turns readable once the daemon
+                # closed it; start afresh rather than find out mid-request.
+                self._conn.close()
+                self._conn = None
+            for attempt in (0, 1):
+                if self._conn is None:
+                    self._conn = _connect(self.address)
+                try:
+                    _send(self._conn, dict(args, cmd=cmd))
+                    reply = _receive(self._conn, self.timeout)
+                    break
+                except (EOFError, OSError) as e:
+                    self._conn.close()
+                    self._conn = None
+                    if attempt or not retry:
+                        raise ControlError(f"lost connection to daemon: {e}") from e
+                except ControlError:
+                    self._conn.close()
+                    self._conn = None
+                    raise
+        if not reply.get("ok"):
+            raise ControlError(reply.get("error", "request failed"))
+        return reply.get("result")
+
+    def available(self):
+        try:
+            self.request("status")
+        except ControlError:
+            return False
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class EventStream:
+    """A daemon's event feed, delivered to callbacks from a reader thread.
+
+    Offers the same ``subscribe``/``unsubscribe`` as ``LogPipeline``, so
+    GUI code written against the in-process pipeline works unchanged.
+    Events arrive as ``LogEvent`` objects. If the daemon goes away the
+    stream reconnects every few seconds, asking only for what it missed
+    when the daemon is still the same process. Connection changes are
+    reported as local events.
+    """
+
+    def __init__(self, address=None, backlog=BACKLOG):
+        self.address = address or default_address()
+        self.backlog = backlog
+        self.connected = None
+        self.dropped = 0
+        self._subscribers = []
+        self._boot = None
+        self._seq = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="event-stream", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _deliver(self, event):
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception:
+                pass
+
+    def _status(self, connected, detail=""):
+        if connected == self.connected:
+            return
+        self.connected = connected
+        if connected:
+            message, level = "🔌 Connected to the watchdog daemon.", logging.INFO
+        else:
+            message = f"🔌 Watchdog daemon not reachable{detail}."
+            level = logging.WARNING
+        self._deliver(LogEvent(message, level, source="gui"))
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                conn = _connect(self.address)
+            except ControlError as e:
+                self._status(False, f" ({e.__cause__ or e})")
+                self._stopping.wait(RECONNECT)
+                continue
+            try:
+                self._read(conn)
+            except (EOFError, OSError, ValueError, ControlError) as e:
+                self._status(False, f" ({str(e) or 'connection closed'})")
+            finally:
+                conn.close()
+            self._stopping.wait(RECONNECT)
+
+    def _read(self, conn):
+        _send(
+            conn,
+            {
+                "cmd": "subscribe",
+                "backlog": self.backlog,
+                "boot": self._boot,
+                "after": self._seq,
+            },
+        )
+        result = _receive(conn, REQUEST_TIMEOUT)["result"]
+        self._boot, self._seq = result["boot"], result["seq"]
+        self._status(True)
+        while not self._stopping.is_set():
+            if not conn.poll(1.0):
+                continue
+            batch = json.loads(conn.recv_bytes(MAX_MESSAGE))
+            self.dropped += batch["dropped"]
+            self._seq = batch["seq"]
+            for e in batch["events"]:
+                self._deliver(
+                    LogEvent(
+                        e["message"],
+                        e["level"],
+                        e["source"],
+                        e["notify"],
+                        e["fields"],
+                        e["ts"],
+                    )
+                )
+
+    def close(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+def spawn_daemon(config=None, address=None, timeout=10.0):
+    """Start ``cloudflare_watchdog run`` detached and wait for its socket.
+
+    The daemon outlives whoever started it, so closing the GUI (or the GUI
+    crashing) leaves monitoring running.
+    """
+    if os.environ.get(DAEMON_ENV):
+        raise ControlError("a spawned daemon must not spawn another")
+    if getattr(sys, "frozen", False):
+        # A frozen build is the GUI executable; app.main runs the CLI
+        # instead when it finds DAEMON_ENV set.
+        argv = [sys.executable]
+    else:
+        argv = [sys.executable, "-m", "cloudflare_watchdog"]
+    if config:
+        argv += ["--config", str(config)]
+    argv.append("run")
+    import cloudflare_watchdog
+
+    source = str(Path(cloudflare_watchdog.__file__).resolve().parents[1])
+    path = os.pathsep.join(p for p in (source, os.environ.get("PYTHONPATH")) if p)
+    options = {}
+    if os.name == "nt":
+        options["creationflags"] = (
+            subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+    else:
+        options["start_new_session"] = True
+    process = subprocess.Popen(
+        argv,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONPATH=path, **{DAEMON_ENV: "1"}),
+        **options,
+    )
+    client = ControlClient(address)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.available():
+            client.close()
+            return process
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    raise ControlError("the watchdog daemon did not come up")
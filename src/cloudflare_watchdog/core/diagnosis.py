@@ -0,0 +1,262 @@
+import errno
+import ipaddress
+import selectors
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+DEFAULT_ANCHORS = (("1.1.1.1", 443), ("8.8.8.8", 53))
+DEFAULT_TIMEOUT = 1.0
+CACHE_TTL = 2.0
+MAX_WORKERS = 8  # ladders walked at once by diagnose_all
+IN_PROGRESS = {
+    errno.EINPROGRESS,
+    errno.EWOULDBLOCK,
+    errno.EAGAIN,
+    getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK),
+}
+
+# Which way a failure points, and the action list that answers it.
+NETWORK = "network"  # no route, no DNS or no internet: on_wifi_fail
+ORIGIN = "origin"  # the local app port is closed: on_site_fail
+TUNNEL = "tunnel"  # origin is up but the public URL fails: on_tunnel_fail
+SITE = "site"  # internet is fine, no origin configured to tell which
+
+
+def parse_address(value, default_port=None):
+    """``"host:port"`` / ``"[v6]:port"`` / ``("host", port)`` to a tuple."""
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        return str(value[0]), int(value[1])
+    if not isinstance(value, str):
+        raise ValueError(f"expected host:port, got {value!r}")
+    parts = urlsplit("//" + value.strip())
+    port = parts.port or default_port
+    if not parts.hostname or not port:
+        raise ValueError(f"expected host:port, got {value!r}")
+    return parts.hostname, port
+
+
+def is_ip(host):
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class Check:
+    layer: str
+    ok: bool
+    detail: str
+    duration: float
+
+
+@dataclass(frozen=True)
+class Diagnosis:
+    """Outcome of the ladder for one failed probe."""
+
+    verdict: str
+    checks: tuple
+    kind: str = "http"  # the failed target's type
+
+    @property
+    def failed(self):
+        return next((c for c in self.checks if not c.ok), None)
+
+    @property
+    def conclusive(self):
+        """True when a local check, not just the public URL, failed."""
+        return self.verdict in (NETWORK, ORIGIN)
+
+    def summary(self):
+        return " · ".join(
+            f"{c.layer} {'✓' if c.ok else '✗'} {c.duration * 1000:.0f}ms"
+            + ("" if c.ok else f" ({c.detail})")
+            for c in self.checks
+        )
+
+
+def check_route(anchor):
+    """Is there a route towards ``anchor``? Connecting a UDP socket sends
+    nothing, it only asks the kernel to pick an interface."""
+    family = socket.AF_INET6 if ":" in anchor[0] else socket.AF_INET
+    with socket.socket(family, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.connect(anchor)
+        except OSError as e:
+            return False, e.strerror or str(e)
+        local = sock.getsockname()[0]
+    if local in ("0.0.0.0", "::"):
+        return False, "no source address"
+    return True, f"via {local}"
+
+
+def resolve(host, timeout):
+    """``getaddrinfo`` with a deadline (it has none of its own)."""
+    outcome = {}
+
+    def lookup():
+        try:
+            outcome["addresses"] = socket.getaddrinfo(host, 443, 0, socket.SOCK_STREAM)
+        except OSError as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=lookup, name="diagnosis-dns", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        return False, "timed out"
+    if "error" in outcome:
+        return False, str(outcome["error"])
+    return True, outcome["addresses"][0][4][0]
+
+
+def connect_any(addresses, timeout):
+    """Race non-blocking TCP connects; succeed on the first that completes."""
+    selector = selectors.DefaultSelector()
+    errors = []
+    try:
+        for address in addresses:
+            family = socket.AF_INET6 if ":" in address[0] else socket.AF_INET
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            try:
+                code = sock.connect_ex(address)
+            except OSError as e:  # e.g. a hostname that does not resolve
+                errors.append(str(e))
+                sock.close()
+                continue
+            if code == 0:
+                sock.close()
+                return True, f"{address[0]}:{address[1]}"
+            if code not in IN_PROGRESS:
+                errors.append(errno.errorcode.get(code, str(code)))
+                sock.close()
+                continue
+            selector.register(sock, selectors.EVENT_WRITE, address)
+        deadline = time.monotonic() + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                errors.append("timed out")
+                break
+            for key, _ in selector.select(remaining):
+                selector.unregister(key.fileobj)
+                code = key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                key.fileobj.close()
+                if code == 0:
+                    return True, f"{key.data[0]}:{key.data[1]}"
+                errors.append(errno.errorcode.get(code, str(code)))
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+    return False, ", ".join(dict.fromkeys(errors)) or "no addresses"
+
+
+class Diagnoser:
+    """Ladder of cheap checks run when a probe fails.
+
+    1. route  a default route exists (UDP connect to the first anchor)
+    2. dns    the target's hostname resolves
+    3. anchor a TCP connect to any public anchor succeeds
+    4. origin the target's local origin port accepts connections
+    5. tunnel the public URL itself, i.e. the probe that just failed
+
+    For ``cloudflared`` targets the failed probe *is* the tunnel's own view
+    of its edge connections, so rung 4 is skipped and a failure past the
+    network rungs is always a tunnel failure.
+
+    The first failing rung decides the verdict and nothing above it runs.
+    Rungs 1 and 3 describe the host's connectivity rather than one target,
+    so they are cached for ``cache_ttl`` seconds under one shared key, and
+    rung 2 per hostname: when every target fails at once, route and anchor
+    are only checked once. ``diagnose_all`` walks the ladders of one pass's
+    failures in parallel, and concurrent ladders wait for a rung already
+    being checked instead of repeating it.
+    """
+
+    def __init__(self, anchors=DEFAULT_ANCHORS, timeout=DEFAULT_TIMEOUT):
+        self.anchors = tuple(anchors)
+        self.timeout = timeout
+        self.cache_ttl = CACHE_TTL
+        self._cache = {}
+        self._pending = {}  # key -> lock held while that rung is checked
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def configure(self, anchors, timeout):
+        with self._lock:
+            self.anchors = tuple(anchors)
+            self.timeout = timeout
+            self._cache.clear()
+
+    @staticmethod
+    def _timed(layer, check, *args):
+        started = time.perf_counter()
+        ok, detail = check(*args)
+        return Check(layer, ok, detail, time.perf_counter() - started)
+
+    def _cached(self, key, layer, check, *args):
+        with self._lock:
+            pending = self._pending.setdefault(key, threading.Lock())
+        with pending:
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            result = self._timed(layer, check, *args)
+            with self._lock:
+                self._cache[key] = (time.monotonic() + self.cache_ttl, result)
+            return result
+
+    def _network(self, host):
+        checks = []
+        if self.anchors:
+            checks.append(self._cached("route", "route", check_route, self.anchors[0]))
+        if all(c.ok for c in checks) and host and not is_ip(host):
+            checks.append(
+                self._cached(("dns", host), "dns", resolve, host, self.timeout)
+            )
+        if all(c.ok for c in checks) and self.anchors:
+            checks.append(
+                self._cached(
+                    "anchor", "anchor", connect_any, self.anchors, self.timeout
+                )
+            )
+        return tuple(checks)
+
+    def diagnose_all(self, results):
+        """``diagnose`` each failed result, in parallel; in the same order."""
+        if len(results) < 2:
+            return [self.diagnose(result) for result in results]
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._pool = ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix="diagnosis"
+            )
+        return list(self._pool.map(self.diagnose, results))
+
+    def diagnose(self, result):
+        """Walk the ladder for a failed ``ProbeResult``."""
+        target = result.target
+        checks = self._network(urlsplit(target.url).hostname)
+        if not all(c.ok for c in checks):
+            return Diagnosis(NETWORK, checks)
+        if target.kind == "cloudflared":
+            tunnel = Check(
+                "cloudflared", result.success, result.message, result.latency or 0
+            )
+            return Diagnosis(TUNNEL, checks + (tunnel,), target.kind)
+        if target.origin:
+            origin = self._timed("origin", connect_any, [target.origin], self.timeout)
+            checks += (origin,)
+            if not origin.ok:
+                return Diagnosis(ORIGIN, checks)
+        tunnel = Check("tunnel", result.success, result.message, result.latency or 0)
+        checks += (tunnel,)
+        return Diagnosis(TUNNEL if target.origin else SITE, checks)
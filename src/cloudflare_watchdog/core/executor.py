@@ -0,0 +1,259 @@
+import logging
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+DEFAULT_COMMAND_TIMEOUT = 15
+LONG_RUNNING_KEYWORDS = (
+    "cloudflared tunnel run",
+    "node",
+    "npm run",
+    "python",
+)
+
+
+@dataclass(frozen=True)
+class ActionStep:
+    """One remediation command and the steps it must wait for."""
+
+    name: str
+    command: str
+    after: tuple = ()
+    timeout: float = DEFAULT_COMMAND_TIMEOUT
+    supervise: bool = None  # None: decide from LONG_RUNNING_KEYWORDS
+    restart: bool = False  # restart the supervised copy instead of reusing it
+
+    @property
+    def long_running(self):
+        if self.restart:
+            return True
+        if self.supervise is None:
+            return is_long_running(self.command)
+        return self.supervise
+
+
+@dataclass
+class StepResult:
+    step: ActionStep
+    returncode: int = None
+    duration: float = 0.0
+    timed_out: bool = False
+    background: bool = False
+    error: str = None
+
+    @property
+    def ok(self):
+        if self.error:
+            return False
+        return self.background or (self.returncode == 0 and not self.timed_out)
+
+
+@dataclass
+class RemediationRun:
+    label: str
+    steps: tuple
+    results: dict = field(default_factory=dict)
+    started: float = field(default_factory=time.monotonic)
+    finished: float = None
+    done: threading.Event = field(default_factory=threading.Event)
+    context: dict = field(default_factory=dict)  # e.g. target, trigger, verdict
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+def shell_argv(command):
+    if platform.system() == "Windows":
+        return [
+            "powershell",
+            "-NoProfile",
+            "-ExecutionPolicy",
+            "Bypass",
+            "-Command",
+            f"& {{ {command} }}",
+        ]
+    return ["/bin/bash", "-c", command]
+
+
+def is_long_running(command):
+    return any(keyword in command.lower() for keyword in LONG_RUNNING_KEYWORDS)
+
+
+class RemediationExecutor:
+    """Run action lists off the probe path.
+
+    Each submitted list is scheduled as a small dependency graph: steps with
+    no pending ``after`` entries run in parallel on a worker pool, and a step
+    starts once everything it depends on has finished (whatever the exit
+    code, since e.g. ``cloudflared tunnel stop`` fails when nothing runs).
+    Output is logged line by line as the command produces it. Long-running
+    steps are handed to the ``ProcessSupervisor`` when one is attached.
+    """
+
+    def __init__(self, log, max_workers=4, supervisor=None):
+        # ``log(message, level=logging.INFO, notify=None)``, e.g. WatchdogCore.log
+        self.log = log
+        self.supervisor = supervisor
+        self.listeners = []  # called as listener(label, StepResult)
+        self.run_listeners = []  # called as listener(RemediationRun) when done
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="remediation"
+        )
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def busy(self, label):
+        with self._lock:
+            return label in self._active
+
+    def submit(self, steps, label, context=None):
+        """Start ``steps`` in the background; returns None if ``label`` is busy."""
+        steps = tuple(steps)
+        if not steps:
+            return None
+        run = RemediationRun(label, steps, context=dict(context or {}))
+        with self._lock:
+            if label in self._active:
+                return None
+            self._active[label] = run
+        threading.Thread(
+            target=self._schedule, args=(run,), name=f"run-{label}", daemon=True
+        ).start()
+        return run
+
+    def _schedule(self, run):
+        pending = {step.name: set(step.after) for step in run.steps}
+        by_name = {step.name: step for step in run.steps}
+        finished = threading.Condition()
+        futures = {}
+        try:
+            while pending or futures:
+                ready = [name for name, deps in pending.items() if not deps]
+                for name in ready:
+                    del pending[name]
+                    futures[name] = self._pool.submit(
+                        self._execute, by_name[name], run.label
+                    )
+                    futures[name].add_done_callback(
+                        lambda _f, c=finished: self._notify(c)
+                    )
+                with finished:
+                    finished.wait_for(
+                        lambda: any(f.done() for f in futures.values()), timeout=1
+                    )
+                for name, future in list(futures.items()):
+                    if future.done():
+                        del futures[name]
+                        run.results[name] = future.result()
+                        self._publish(run.label, run.results[name])
+                        for deps in pending.values():
+                            deps.discard(name)
+                if pending and not futures and all(pending.values()):
+                    self.log(
+                        f"💥 {run.label}: unresolved dependencies {pending}",
+                        logging.ERROR,
+                    )
+                    break
+        finally:
+            run.finished = time.monotonic()
+            with self._lock:
+                self._active.pop(run.label, None)
+            run.done.set()
+            self._call(self.run_listeners, run)
+
+    def _publish(self, label, result):
+        self._call(self.listeners, label, result)
+
+    def _call(self, listeners, *args):
+        for listener in list(listeners):
+            try:
+                listener(*args)
+            except Exception as e:
+                self.log(f"💥 Remediation listener failed: {e}", logging.ERROR)
+
+    @staticmethod
+    def _notify(condition):
+        with condition:
+            condition.notify_all()
+
+    def _stream(self, pipe, prefix):
+        for line in iter(pipe.readline, ""):
+            line = line.rstrip()
+            if line:
+                self.log(f"{prefix} {line}", notify=False)
+        pipe.close()
+
+    def _execute(self, step, label):
+        command = step.command
+        self.log(f"🔁 Running {label} command: {command}")
+        started = time.monotonic()
+        result = StepResult(step)
+        try:
+            if step.long_running:
+                result.background = True
+                if self.supervisor is not None:
+                    if step.restart:
+                        self.supervisor.restart(command)
+                    else:
+                        self.supervisor.ensure(command)
+                    return result
+                subprocess.Popen(
+                    shell_argv(command),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                self.log(f"🚀 Background process started: {command}")
+                return result
+
+            proc = subprocess.Popen(
+                shell_argv(command),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+            )
+            readers = [
+                threading.Thread(
+                    target=self._stream, args=(proc.stdout, "  │"), daemon=True
+                ),
+                threading.Thread(
+                    target=self._stream, args=(proc.stderr, "  ┆"), daemon=True
+                ),
+            ]
+            for reader in readers:
+                reader.start()
+            try:
+                result.returncode = proc.wait(timeout=step.timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                result.returncode = proc.wait()
+                result.timed_out = True
+            for reader in readers:
+                reader.join(timeout=1)
+
+            if result.timed_out:
+                self.log(
+                    f"⚠️ Command timed out after {step.timeout:g}s: {command}",
+                    logging.WARNING,
+                )
+            elif result.returncode == 0:
+                self.log(f"✅ Command succeeded: {command}")
+            else:
+                self.log(
+                    f"❌ Command failed ({command}) → Exit {result.returncode}",
+                    logging.WARNING,
+                )
+        except Exception as e:
+            result.error = str(e)
+            self.log(f"💥 Command error ({command}): {e}", logging.ERROR)
+        finally:
+            result.duration = time.monotonic() - started
+        return result
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,477 @@
+import gzip
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from pathlib import Path
+
+INGEST_PATH = "/v1/ingest"
+FLEET_PATH = "/v1/fleet"
+DEFAULT_PORT = 9300
+DEFAULT_HEARTBEAT = 10.0
+POST_TIMEOUT = 5.0
+MAX_EVENTS_PER_POST = 500
+BUFFER_LIMIT = 4 * 1024 * 1024  # bytes of unsent events kept on disk
+EVENT_LIMIT = 10000  # events the controller keeps in memory
+STALE_AFTER = 3  # missed heartbeats before an agent is shown as stale
+BOOT_MARKS = 8  # restarts per agent remembered for de-duplication
+MAX_BODY = 4 * 1024 * 1024  # bytes of request body the controller reads
+MAX_DECODED = 16 * 1024 * 1024  # ...and at most this much once decompressed
+
+
+def encode(payload):
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+
+def decode(body, encoding=None, limit=MAX_DECODED):
+    """Parse a request body, refusing one that inflates past ``limit`` bytes."""
+    if encoding == "gzip":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = inflater.decompress(body, limit)
+        if inflater.unconsumed_tail:
+            raise ValueError(f"payload larger than {limit} bytes decompressed")
+    return json.loads(body)
+
+
+def check_batch(payload):
+    """Raise ``ValueError`` unless ``payload`` is a well-formed agent batch."""
+    if not isinstance(payload, dict) or "agent" not in payload:
+        raise ValueError("batch must be an object with an agent id")
+    if not isinstance(payload.get("targets", {}), dict):
+        raise ValueError("targets must be an object")
+    events = payload.get("events") or []
+    if not isinstance(events, list):
+        raise ValueError("events must be a list")
+    for event in events:
+        if not isinstance(event, dict):
+            raise ValueError("each event must be an object")
+        seq, boot = event.get("seq", 0), event.get("boot")
+        if type(seq) is not int or not isinstance(boot, (str, int, type(None))):
+            raise ValueError("event boot must be a string and seq an integer")
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class EventBuffer:
+    """JSON-lines file of events the controller has not acknowledged yet.
+
+    Past ``limit`` bytes the oldest half is dropped, so an agent cut off for
+    weeks keeps its most recent history without filling the disk.
+    """
+
+    def __init__(self, path, limit=BUFFER_LIMIT):
+        self.path = Path(path)
+        self.limit = limit
+
+    def __bool__(self):
+        try:
+            return self.path.stat().st_size > 0
+        except FileNotFoundError:
+            return False
+
+    def append(self, events):
+        if not events:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(e, separators=(",", ":")) + "\n" for e in events)
+        if self.path.stat().st_size > self.limit:
+            self._trim()
+
+    def _trim(self):
+        lines = self.path.read_text(encoding="utf-8").splitlines(keepends=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text("".join(lines[len(lines) // 2 :]), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def read(self):
+        events = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        pass  # torn write from a crash
+        except FileNotFoundError:
+            pass
+        return events
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FleetAgent:
+    """Push heartbeats and state transitions to a fleet controller.
+
+    Transitions are queued by the monitor loop and sent with the next
+    heartbeat, one gzipped POST per ``interval``; a target going down or
+    recovering sends at once. When the controller cannot be reached the
+    events go to an ``EventBuffer`` and are replayed, oldest first, after
+    the next successful heartbeat. Every event carries the agent's boot id
+    and a sequence number, so the controller drops replays it already has.
+    """
+
+    def __init__(
+        self,
+        controller,
+        snapshot,
+        agent_id=None,
+        interval=DEFAULT_HEARTBEAT,
+        token=None,
+        buffer_path=None,
+        log=None,
+    ):
+        self.config = (controller, agent_id, interval, token)
+        self.url = controller.rstrip("/") + INGEST_PATH
+        self.snapshot = snapshot  # () -> {target: {...}} for the heartbeat
+        self.agent_id = agent_id or socket.gethostname()
+        self.interval = interval
+        self.token = token
+        self.buffer = EventBuffer(buffer_path) if buffer_path else None
+        self.log = log or (lambda msg, level=logging.INFO, notify=None: None)
+        self.boot = uuid.uuid4().hex[:12]
+        self.connected = None
+        self._session = None
+        self._events = []
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="fleet-agent", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def record_transition(self, transition, diagnosis=None):
+        """Queue a ``health.Transition``; never blocks on the network."""
+        with self._lock:
+            self._seq += 1
+            self._events.append(
+                {
+                    "boot": self.boot,
+                    "seq": self._seq,
+                    "ts": transition.timestamp,
+                    "target": transition.target,
+                    "from": transition.previous.value,
+                    "to": transition.current.value,
+                    "action": transition.action,
+                    "verdict": diagnosis.verdict if diagnosis else None,
+                }
+            )
+        if transition.action in ("down", "recovery"):
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopping:
+            if self._wake.wait(self.interval):
+                self._wake.clear()
+            self.flush()
+
+    def _post(self, payload):
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        response = self._session.post(
+            self.url, data=encode(payload), headers=headers, timeout=POST_TIMEOUT
+        )
+        response.raise_for_status()
+
+    def _payload(self, events, heartbeat=True):
+        payload = {"agent": self.agent_id, "sent": time.time(), "events": events}
+        if heartbeat:
+            payload["interval"] = self.interval
+            payload["targets"] = self.snapshot()
+        return payload
+
+    def flush(self):
+        """Send one heartbeat with pending events, replaying any backlog first."""
+        with self._lock:
+            events, self._events = self._events, []
+        try:
+            if self.buffer:
+                backlog = self.buffer.read()
+                for i in range(0, len(backlog), MAX_EVENTS_PER_POST):
+                    chunk = backlog[i : i + MAX_EVENTS_PER_POST]
+                    self._post(self._payload(chunk, heartbeat=False))
+                self.buffer.clear()
+            self._post(self._payload(events))
+        except Exception as e:
+            if self.buffer is not None:
+                self.buffer.append(events)
+            else:
+                with self._lock:
+                    self._events[:0] = events[-EVENT_LIMIT:]
+            if self.connected is not False:
+                self.log(
+                    f"📡 Fleet controller unreachable, buffering events: {e}",
+                    logging.WARNING,
+                    notify=False,
+                )
+            self.connected = False
+            return False
+        if self.connected is not True:
+            self.log(f"📡 Reporting to fleet controller {self.url}", notify=False)
+        self.connected = True
+        return True
+
+    def stop(self, timeout=POST_TIMEOUT):
+        """Send (or buffer) what is pending and stop the sender thread."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._session is not None:
+            self._session.close()
+
+
+class FleetState:
+    """In-memory fleet view kept by the controller.
+
+    Each agent keeps only its latest heartbeat (target states) plus the
+    highest sequence number seen per boot id; transitions go to one shared
+    bounded deque. Ingest is O(events in the batch), so hundreds of agents
+    reporting every few seconds stay well within one process.
+    """
+
+    def __init__(self, event_limit=EVENT_LIMIT):
+        self.agents = {}
+        self.events = deque(maxlen=event_limit)
+        self.received = 0
+        self.duplicates = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def ingest(self, payload, address=None, now=None):
+        """Record one agent batch; a malformed one raises ``ValueError``."""
+        check_batch(payload)
+        now = time.time() if now is None else now
+        agent_id = str(payload["agent"])
+        interval = float(payload.get("interval", DEFAULT_HEARTBEAT))
+        with self._lock:
+            agent = self.agents.get(agent_id)
+            if agent is None:
+                agent = self.agents[agent_id] = {
+                    "id": agent_id,
+                    "interval": DEFAULT_HEARTBEAT,
+                    "targets": {},
+                    "marks": {},
+                }
+            self.batches += 1
+            agent["last_seen"] = now
+            agent["address"] = address
+            if "targets" in payload:
+                agent["targets"] = payload["targets"]
+                agent["interval"] = interval
+            marks = agent["marks"]
+            accepted = 0
+            for event in payload.get("events") or ():
+                boot, seq = event.get("boot"), event.get("seq", 0)
+                if seq <= marks.get(boot, 0):
+                    self.duplicates += 1
+                    continue
+                marks[boot] = seq
+                if len(marks) > BOOT_MARKS:
+                    del marks[next(iter(marks))]
+                event["agent"] = agent_id
+                self.events.append(event)
+                accepted += 1
+            self.received += accepted
+        return accepted
+
+    def view(self, events=100, now=None):
+        """JSON-ready fleet summary with the newest ``events`` transitions."""
+        now = time.time() if now is None else now
+        agents = []
+        with self._lock:
+            for agent in self.agents.values():
+                age = now - agent["last_seen"]
+                targets = agent["targets"]
+                agents.append(
+                    {
+                        "id": agent["id"],
+                        "address": agent["address"],
+                        "last_seen": agent["last_seen"],
+                        "age": age,
+                        "stale": age > agent["interval"] * STALE_AFTER,
+                        "targets": targets,
+                        "down": sorted(
+                            name
+                            for name, t in targets.items()
+                            if t.get("state") == "down"
+                        ),
+                    }
+                )
+            recent = list(self.events)[-events:] if events else []
+        agents.sort(key=lambda a: a["id"])
+        return {
+            "now": now,
+            "agents": agents,
+            "events": recent,
+            "summary": {
+                "agents": len(agents),
+                "stale": sum(a["stale"] for a in agents),
+                "targets": sum(len(a["targets"]) for a in agents),
+                "down": sum(len(a["down"]) for a in agents),
+            },
+        }
+
+
+class FleetController:
+    """Serve ``POST /v1/ingest`` for agents and ``GET /v1/fleet`` for GUIs.
+
+    Binding anywhere but loopback requires a ``token``: without one, anyone
+    on the network could read the fleet or inject events.
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, token=None, state=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.state = state or FleetState()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlsplit
+
+        if not self.token and not is_loopback(self.host):
+            raise ValueError(
+                f"a token is required to listen on {self.host}, not just loopback"
+            )
+        controller = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            timeout = 120  # drop keep-alive connections of vanished agents
+
+            def reply(self, status, payload=None):
+                body = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def serving(self):
+                # Keep-alive connections outlive stop(); don't answer on them.
+                if self.server is controller._server:
+                    return True
+                self.close_connection = True
+                self.reply(503, {"error": "controller stopped"})
+                return False
+
+            def authorized(self):
+                if not controller.token:
+                    return True
+                expected = f"Bearer {controller.token}".encode()
+                given = self.headers.get("Authorization", "").encode()
+                if hmac.compare_digest(given, expected):
+                    return True
+                self.reply(401, {"error": "bad or missing token"})
+                return False
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY:
+                    self.close_connection = True  # the body is left unread
+                    self.reply(413, {"error": f"body must be 0-{MAX_BODY} bytes"})
+                    return
+                body = self.rfile.read(length)
+                if not self.serving():
+                    return
+                if urlsplit(self.path).path != INGEST_PATH:
+                    self.reply(404, {"error": "not found"})
+                    return
+                if not self.authorized():
+                    return
+                try:
+                    payload = decode(body, self.headers.get("Content-Encoding"))
+                    accepted = controller.state.ingest(payload, self.client_address[0])
+                except (OSError, ValueError, KeyError, TypeError, zlib.error) as e:
+                    self.reply(400, {"error": str(e)})
+                    return
+                self.reply(200, {"accepted": accepted})
+
+            def do_GET(self):
+                if not self.serving():
+                    return
+                parts = urlsplit(self.path)
+                if parts.path != FLEET_PATH:
+                    self.reply(404, {"error": "not found"})
+                    return
+                if not self.authorized():
+                    return
+                query = parse_qs(parts.query)
+                try:
+                    events = int(query.get("events", ["100"])[0])
+                except ValueError:
+                    events = 100
+                self.reply(200, controller.state.view(events))
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fleet-controller", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def fetch_view(controller, token=None, events=100, timeout=POST_TIMEOUT):
+    """GET the fleet view from a controller; used by the GUI and the CLI."""
+    import requests
+
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = requests.get(
+        controller.rstrip("/") + FLEET_PATH,
+        params={"events": events},
+        headers=headers,
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,167 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+class HealthState(Enum):
+    HEALTHY = "healthy"
+    SUSPECT = "suspect"
+    DOWN = "down"
+    RECOVERING = "recovering"
+
+
+@dataclass
+class Transition:
+    """A state change for one target, and the remediation it calls for."""
+
+    target: str
+    previous: HealthState
+    current: HealthState
+    action: str = None  # "down", "retry" or "recovery"
+    timestamp: float = field(default_factory=time.time)
+
+
+class TargetHealth:
+    """Edge-triggered health for a single target.
+
+    ``failure_threshold`` consecutive failures move a target from healthy,
+    through suspect, to down; ``recovery_threshold`` consecutive successes
+    move it back through recovering to healthy. Actions are only emitted on
+    the edges, never on every probe.
+    """
+
+    def __init__(self, name, failure_threshold=3, recovery_threshold=2):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_threshold = max(1, recovery_threshold)
+        self.state = HealthState.HEALTHY
+        self.failures = 0
+        self.successes = 0
+        self.since = time.time()
+
+    def observe(self, success, conclusive=False):
+        """Feed one probe outcome and return a ``Transition`` if the state moved.
+
+        A ``conclusive`` failure (diagnosis found a local cause, such as no
+        route or a closed origin port) goes straight to down instead of
+        waiting for ``failure_threshold`` confirmations. A ``conclusive``
+        success (the OS reports the link back) likewise recovers at once.
+        """
+        previous = self.state
+        action = None
+        if success:
+            self.failures = 0
+            self.successes += 1
+            if self.state is HealthState.SUSPECT:
+                self.state = HealthState.HEALTHY
+            elif self.state in (HealthState.DOWN, HealthState.RECOVERING):
+                if conclusive or self.successes >= self.recovery_threshold:
+                    self.state = HealthState.HEALTHY
+                    action = "recovery"
+                else:
+                    self.state = HealthState.RECOVERING
+        else:
+            self.successes = 0
+            self.failures += 1
+            if self.state is HealthState.RECOVERING:
+                self.state = HealthState.DOWN
+            elif self.state is not HealthState.DOWN:
+                if conclusive or self.failures >= self.failure_threshold:
+                    self.state = HealthState.DOWN
+                    action = "down"
+                else:
+                    self.state = HealthState.SUSPECT
+            else:
+                action = "retry"
+        if self.state is previous and action is None:
+            return None
+        if self.state is not previous:
+            self.since = time.time()
+        return Transition(self.name, previous, self.state, action)
+
+
+class RestartBudget:
+    """Circuit breaker around remediation.
+
+    Allows at most ``max_restarts`` remediation runs per ``window`` seconds,
+    with at least ``cooldown`` seconds between runs. Once the budget is spent
+    the breaker stays open until old runs age out of the window.
+    """
+
+    def __init__(self, max_restarts=3, window=600, cooldown=60):
+        self.max_restarts = max_restarts
+        self.window = window
+        self.cooldown = cooldown
+        self._runs = deque()
+
+    def _expire(self, now):
+        while self._runs and now - self._runs[0] >= self.window:
+            self._runs.popleft()
+
+    def allow(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        if self._runs and now - self._runs[-1] < self.cooldown:
+            return False
+        return len(self._runs) < self.max_restarts
+
+    def record(self, now=None):
+        self._runs.append(time.monotonic() if now is None else now)
+
+    @property
+    def is_open(self):
+        self._expire(time.monotonic())
+        return len(self._runs) >= self.max_restarts
+
+
+class HealthMonitor:
+    """Per-target state machines, and one restart budget per action list.
+
+    ``budget`` holds the limits; ``budget_for(label)`` keeps a separate
+    count per action list, so a flapping link's ``on_wifi_fail`` rounds
+    do not use up the budget of ``on_site_fail``.
+    """
+
+    def __init__(self, failure_threshold=3, recovery_threshold=2, budget=None):
+        self.failure_threshold = failure_threshold
+        self.recovery_threshold = recovery_threshold
+        self.budget = budget or RestartBudget()
+        self.budgets = {}
+        self.targets = {}
+
+    def configure(self, failure_threshold, recovery_threshold, budget_kwargs):
+        self.failure_threshold = failure_threshold
+        self.recovery_threshold = recovery_threshold
+        for health in self.targets.values():
+            health.failure_threshold = max(1, failure_threshold)
+            health.recovery_threshold = max(1, recovery_threshold)
+        for budget in (self.budget, *self.budgets.values()):
+            for key, value in budget_kwargs.items():
+                setattr(budget, key, value)
+
+    def budget_for(self, label):
+        budget = self.budgets.get(label)
+        if budget is None:
+            budget = self.budgets[label] = RestartBudget(
+                self.budget.max_restarts, self.budget.window, self.budget.cooldown
+            )
+        return budget
+
+    def observe(self, name, success, conclusive=False):
+        health = self.targets.get(name)
+        if health is None:
+            health = self.targets[name] = TargetHealth(
+                name, self.failure_threshold, self.recovery_threshold
+            )
+        return health.observe(success, conclusive)
+
+    def forget(self, keep):
+        """Drop state for targets that are no longer configured."""
+        for name in list(self.targets):
+            if name not in keep:
+                del self.targets[name]
+
+    def state(self, name):
+        health = self.targets.get(name)
+        return health.state if health else HealthState.HEALTHY
@@ -0,0 +1,430 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+JOURNAL_NAME = "journal.sqlite3"
+MAX_BATCH = 256
+HEARTBEAT = 60.0  # seconds between "still monitoring" stamps
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    target TEXT NOT NULL,
+    previous TEXT,
+    current TEXT NOT NULL,
+    action TEXT,
+    verdict TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS transitions_target_ts ON transitions (target, ts);
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY,
+    target TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL,
+    verdict TEXT,
+    closed_by TEXT
+);
+CREATE INDEX IF NOT EXISTS incidents_target_started ON incidents (target, started);
+CREATE INDEX IF NOT EXISTS incidents_started ON incidents (started);
+CREATE INDEX IF NOT EXISTS incidents_open ON incidents (target) WHERE ended IS NULL;
+CREATE TABLE IF NOT EXISTS remediations (
+    id INTEGER PRIMARY KEY,
+    incident INTEGER REFERENCES incidents (id),
+    target TEXT,
+    label TEXT NOT NULL,
+    trigger TEXT,
+    verdict TEXT,
+    started REAL NOT NULL,
+    finished REAL,
+    ok INTEGER NOT NULL,
+    steps INTEGER NOT NULL,
+    failed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS remediations_started ON remediations (started);
+CREATE INDEX IF NOT EXISTS remediations_incident ON remediations (incident);
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY,
+    remediation INTEGER NOT NULL REFERENCES remediations (id),
+    name TEXT,
+    command TEXT,
+    returncode INTEGER,
+    duration REAL,
+    timed_out INTEGER,
+    background INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS commands_remediation ON commands (remediation);
+CREATE TABLE IF NOT EXISTS monitoring (
+    id INTEGER PRIMARY KEY,
+    target TEXT NOT NULL,
+    started REAL NOT NULL,
+    seen REAL NOT NULL,
+    ended REAL
+);
+CREATE INDEX IF NOT EXISTS monitoring_target ON monitoring (target, started);
+CREATE INDEX IF NOT EXISTS monitoring_open ON monitoring (target) WHERE ended IS NULL;
+"""
+
+
+def _connect(path, readonly=False):
+    import sqlite3
+
+    if readonly:
+        return sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class IncidentJournal:
+    """Append-only SQLite record of state transitions and remediation runs.
+
+    The monitor loop only enqueues plain tuples; a background thread owns
+    the connection and commits each batch in one transaction, so a slow
+    disk never delays a probe. ``incidents`` is derived as events arrive:
+    one row per outage, opened when a target goes down and closed when it
+    is healthy again, so uptime and MTTR reports read a handful of indexed
+    rows instead of replaying every transition. ``monitoring`` holds one
+    row per target and stretch of watching it, so uptime is measured over
+    the time a target was actually monitored, failures or not.
+    """
+
+    def __init__(self, path, log=None):
+        self.path = Path(path)
+        self.log = log or (lambda msg, level=logging.INFO, notify=None: None)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the writer; safe to call more than once."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._writer,
+                    args=(time.time(),),
+                    name="journal-writer",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def record_transition(self, transition, diagnosis=None):
+        """Queue a ``health.Transition``; never blocks."""
+        self.start()
+        self._queue.put(
+            (
+                "transition",
+                (
+                    transition.timestamp,
+                    transition.target,
+                    transition.previous.value,
+                    transition.current.value,
+                    transition.action,
+                    diagnosis.verdict if diagnosis else None,
+                    diagnosis.summary() if diagnosis else None,
+                ),
+            )
+        )
+
+    def record_monitoring(self, targets, now=None):
+        """Queue the set of targets monitored from now on; empty when stopping."""
+        self.start()
+        now = time.time() if now is None else now
+        self._queue.put(("monitoring", (now, frozenset(targets))))
+
+    def record_run(self, run):
+        """Queue a finished ``RemediationRun``; an executor run listener."""
+        self.start()
+        offset = time.time() - time.monotonic()
+        steps = [
+            (
+                result.step.name,
+                result.step.command,
+                result.returncode,
+                result.duration,
+                int(result.timed_out),
+                int(result.background),
+                result.error,
+            )
+            for result in run.results.values()
+        ]
+        self._queue.put(
+            (
+                "run",
+                (
+                    run.context.get("target"),
+                    run.label,
+                    run.context.get("trigger"),
+                    run.context.get("verdict"),
+                    run.started + offset,
+                    (run.finished or time.monotonic()) + offset,
+                    int(bool(steps) and all(r.ok for r in run.results.values())),
+                    len(run.steps),
+                    sum(not r.ok for r in run.results.values()),
+                    steps,
+                ),
+            )
+        )
+
+    def _writer(self, started):
+        try:
+            connection = _connect(self.path)
+        except Exception as e:
+            self.log(f"❌ Incident journal unavailable: {e}", logging.ERROR)
+            return
+        with connection:
+            # Outages left open by a previous run cannot be closed by a
+            # recovery that was never seen; end them at this start.
+            connection.execute(
+                "UPDATE incidents SET ended = ?, closed_by = 'restart' "
+                "WHERE ended IS NULL",
+                (started,),
+            )
+            # Monitoring cut short by a crash ends at its last heartbeat.
+            connection.execute(
+                "UPDATE monitoring SET ended = seen WHERE ended IS NULL"
+            )
+        beat = time.monotonic()
+        while True:
+            try:
+                batch = [self._queue.get(timeout=HEARTBEAT)]
+            except queue.Empty:
+                batch = []
+            if time.monotonic() - beat >= HEARTBEAT:
+                beat = time.monotonic()
+                batch.append(("heartbeat", time.time()))
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None
+            try:
+                with connection:
+                    for kind, payload in batch:
+                        if kind == "transition":
+                            self._write_transition(connection, payload)
+                        elif kind == "run":
+                            self._write_run(connection, payload)
+                        elif kind == "monitoring":
+                            self._write_monitoring(connection, *payload)
+                        elif kind == "heartbeat":
+                            connection.execute(
+                                "UPDATE monitoring SET seen = ? WHERE ended IS NULL",
+                                (payload,),
+                            )
+                        else:
+                            stop = payload
+            except Exception as e:
+                self.log(f"❌ Incident journal write failed: {e}", logging.ERROR)
+            if stop is not None:
+                connection.close()
+                stop.set()
+                return
+
+    @staticmethod
+    def _write_transition(connection, row):
+        ts, target, previous, current, action, verdict, _ = row
+        connection.execute(
+            "INSERT INTO transitions (ts, target, previous, current, action, "
+            "verdict, detail) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            row,
+        )
+        if action == "down":
+            connection.execute(
+                "INSERT INTO incidents (target, started, verdict) "
+                "SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM incidents "
+                "WHERE target = ? AND ended IS NULL)",
+                (target, ts, verdict, target),
+            )
+        elif action == "recovery":
+            connection.execute(
+                "UPDATE incidents SET ended = ?, closed_by = 'recovery' "
+                "WHERE target = ? AND ended IS NULL",
+                (ts, target),
+            )
+
+    @staticmethod
+    def _write_monitoring(connection, ts, targets):
+        watched = {
+            name
+            for (name,) in connection.execute(
+                "SELECT target FROM monitoring WHERE ended IS NULL"
+            )
+        }
+        connection.executemany(
+            "UPDATE monitoring SET ended = ?, seen = ? "
+            "WHERE target = ? AND ended IS NULL",
+            [(ts, ts, name) for name in watched - targets],
+        )
+        connection.execute(
+            "UPDATE monitoring SET seen = ? WHERE ended IS NULL", (ts,)
+        )
+        connection.executemany(
+            "INSERT INTO monitoring (target, started, seen) VALUES (?, ?, ?)",
+            [(name, ts, ts) for name in targets - watched],
+        )
+
+    @staticmethod
+    def _write_run(connection, row):
+        target, _, trigger, _, started = row[:5]
+        steps = row[-1]
+        incident = None
+        if target is not None and trigger in ("down", "retry"):
+            found = connection.execute(
+                "SELECT id FROM incidents WHERE target = ? AND started <= ? "
+                "AND (ended IS NULL OR ended >= ?) ORDER BY started DESC LIMIT 1",
+                (target, started, started),
+            ).fetchone()
+            incident = found[0] if found else None
+        cursor = connection.execute(
+            "INSERT INTO remediations (incident, target, label, trigger, verdict, "
+            "started, finished, ok, steps, failed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (incident, *row[:-1]),
+        )
+        connection.executemany(
+            "INSERT INTO commands (remediation, name, command, returncode, "
+            "duration, timed_out, background, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(cursor.lastrowid, *step) for step in steps],
+        )
+
+    def close(self, timeout=5):
+        """Flush queued events and close the database."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(("stop", done))
+        done.wait(timeout)
+
+
+@dataclass
+class TargetReport:
+    target: str
+    observed: float  # seconds of the window the target was monitored
+    downtime: float
+    incidents: int
+    resolved: int
+    mttr: float = None
+    open: bool = False
+
+    @property
+    def uptime(self):
+        if self.observed <= 0:
+            return None
+        return max(0.0, 1 - self.downtime / self.observed)
+
+
+@dataclass
+class RemediationReport:
+    label: str
+    runs: int
+    succeeded: int  # every command exited 0
+    attached: int  # runs made during an outage
+    resolved: int  # ...that were the last before the outage ended
+    time_to_recover: float = None  # mean, from run end to healthy
+
+    @property
+    def effectiveness(self):
+        return self.resolved / self.attached if self.attached else None
+
+
+def report(path, since, until=None, target=None):
+    """Uptime and MTTR per target and effectiveness per action list.
+
+    Covers ``[since, until)`` (epoch seconds). Uptime is measured over the
+    part of the window each target was monitored, and every target
+    monitored in the window is listed. Journals written before monitoring
+    was recorded fall back to each target's first journaled event.
+    """
+    now = time.time()
+    until = now if until is None else until
+    connection = _connect(path, readonly=True)
+    try:
+        where, args = "", ()
+        if target is not None:
+            where, args = " WHERE target = ?", (target,)
+        observed = {}
+        if connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'monitoring'"
+        ).fetchone():
+            for name, started, ended in connection.execute(
+                f"SELECT target, started, ended FROM monitoring{where}", args
+            ):
+                overlap = min(until, now if ended is None else ended) - max(
+                    since, started
+                )
+                observed[name] = observed.get(name, 0.0) + max(0.0, overlap)
+        first_seen = dict(
+            connection.execute(
+                f"SELECT target, MIN(ts) FROM transitions{where} GROUP BY target",
+                args,
+            )
+        )
+        for name, started in connection.execute(
+            f"SELECT target, MIN(started) FROM incidents{where} GROUP BY target", args
+        ):
+            first_seen[name] = min(started, first_seen.get(name, started))
+        for name, seen in first_seen.items():
+            if name not in observed:
+                observed[name] = max(0.0, min(until, now) - max(since, seen))
+        targets = {
+            name: TargetReport(name, seconds, 0.0, 0, 0)
+            for name, seconds in sorted(observed.items())
+            if seconds > 0
+        }
+        rows = connection.execute(
+            "SELECT target, started, ended FROM incidents "
+            "WHERE started < ? AND (ended IS NULL OR ended > ?)"
+            + (" AND target = ?" if target is not None else ""),
+            (until, since) + args,
+        )
+        durations = {}
+        for name, started, ended in rows:
+            entry = targets.get(name)
+            if entry is None:
+                continue
+            overlap_end = min(until, now if ended is None else ended)
+            entry.downtime += max(0.0, overlap_end - max(since, started))
+            if started >= since:
+                entry.incidents += 1
+                if ended is None:
+                    entry.open = True
+                else:
+                    durations.setdefault(name, []).append(ended - started)
+        for name, values in durations.items():
+            targets[name].resolved = len(values)
+            targets[name].mttr = sum(values) / len(values)
+
+        remediations = [
+            RemediationReport(*row)
+            for row in connection.execute(
+                """
+                SELECT r.label, COUNT(*), COALESCE(SUM(r.ok), 0), COUNT(r.incident),
+                       COALESCE(SUM(r.id = last.id), 0),
+                       AVG(CASE WHEN r.id = last.id THEN i.ended - r.finished END)
+                FROM remediations r
+                LEFT JOIN incidents i ON i.id = r.incident
+                LEFT JOIN (
+                    SELECT incident, MAX(id) AS id FROM remediations
+                    WHERE incident IS NOT NULL GROUP BY incident
+                ) last ON last.incident = r.incident AND i.ended IS NOT NULL
+                WHERE r.started >= ? AND r.started < ?"""
+                + (" AND r.target = ?" if target is not None else "")
+                + " GROUP BY r.label ORDER BY r.label",
+                (since, until) + args,
+            )
+        ]
+    finally:
+        connection.close()
+    return list(targets.values()), remediations
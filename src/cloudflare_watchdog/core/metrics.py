@@ -0,0 +1,266 @@
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        # Held only for a dict update or a snapshot copy, never during I/O.
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def retain(self, label, keep):
+        """Drop every series whose ``label`` value is not in ``keep``."""
+        index = self.label_names.index(label)
+        with self._lock:
+            for key in [k for k in self._values if k[index] not in keep]:
+                del self._values[key]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.snapshot().items()):
+            labels = _labels(self.label_names, key)
+            lines.append(f"{self.name}{labels} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def remove(self, **labels):
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self._values.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _labels(self.label_names, key, [("le", le)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class WatchdogMetrics:
+    """In-process counters for probes, health transitions and remediation."""
+
+    def __init__(self):
+        self.probe_latency = Histogram(
+            "watchdog_probe_latency_seconds", "Probe round-trip time.", ["target"]
+        )
+        self.probes = Counter(
+            "watchdog_probes_total", "Probes run, by outcome.", ["target", "result"]
+        )
+        self.target_up = Gauge(
+            "watchdog_target_up", "1 if the last probe succeeded.", ["target"]
+        )
+        self.target_state = Gauge(
+            "watchdog_target_state",
+            "1 for the target's current health state.",
+            ["target", "state"],
+        )
+        self.transitions = Counter(
+            "watchdog_state_transitions_total",
+            "Health state changes.",
+            ["target", "from", "to"],
+        )
+        self.commands = Counter(
+            "watchdog_remediation_commands_total",
+            "Remediation commands run.",
+            ["label"],
+        )
+        self.command_failures = Counter(
+            "watchdog_remediation_failures_total",
+            "Remediation commands that failed.",
+            ["label", "reason"],
+        )
+        self.command_duration = Histogram(
+            "watchdog_remediation_command_seconds",
+            "Remediation command run time.",
+            ["label"],
+            buckets=(0.1, 0.5, 1, 2.5, 5, 10, 15, 30, 60),
+        )
+        self.loop_duration = Histogram(
+            "watchdog_loop_iteration_seconds",
+            "Time spent in one monitor loop pass.",
+            buckets=LOOP_BUCKETS,
+        )
+        self.phase_duration = Histogram(
+            "watchdog_phase_seconds",
+            "Time spent in each monitor loop phase.",
+            ["phase"],
+            buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+        )
+        self.all = [
+            self.probe_latency,
+            self.probes,
+            self.target_up,
+            self.target_state,
+            self.transitions,
+            self.commands,
+            self.command_failures,
+            self.command_duration,
+            self.loop_duration,
+            self.phase_duration,
+        ]
+
+    def forget_targets(self, keep):
+        """Stop exporting targets that are no longer configured."""
+        for metric in self.all:
+            if "target" in metric.label_names:
+                metric.retain("target", keep)
+
+    def record_probe(self, result):
+        name = result.target.name
+        outcome = "success" if result.success else "failure"
+        self.probes.inc(target=name, result=outcome)
+        self.target_up.set(1 if result.success else 0, target=name)
+        if result.latency is not None:
+            self.probe_latency.observe(result.latency, target=name)
+
+    def record_transition(self, transition, states):
+        if transition.previous is not transition.current:
+            edge = {"from": transition.previous.value, "to": transition.current.value}
+            self.transitions.inc(target=transition.target, **edge)
+        for state in states:
+            self.target_state.set(
+                1 if state is transition.current else 0,
+                target=transition.target,
+                state=state.value,
+            )
+
+    def record_command(self, label, result):
+        self.commands.inc(label=label)
+        self.command_duration.observe(result.duration, label=label)
+        if result.timed_out:
+            self.command_failures.inc(label=label, reason="timeout")
+        elif result.error:
+            self.command_failures.inc(label=label, reason="error")
+        elif not result.ok:
+            self.command_failures.inc(label=label, reason="exit")
+
+    def render(self):
+        lines = []
+        for metric in self.all:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serve ``/metrics`` from a background thread; works without the GUI."""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
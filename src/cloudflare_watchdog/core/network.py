@@ -0,0 +1,313 @@
+import logging
+import os
+import select
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from cloudflare_watchdog.core.diagnosis import check_route
+
+NETWORK_TARGET = "network"  # health-monitor name for the link itself
+SOURCES = ("auto", "netlink", "nmcli", "poll", "fake", "off")
+DEFAULT_POLL_INTERVAL = 2.0
+RESYNC = 30.0  # event sources still re-read the status this often
+SSID_TIMEOUT = 2.0
+ROUTE_ANCHOR = ("1.1.1.1", 53)  # off Linux: is there a route at all?
+
+# rtnetlink multicast groups: RTMGRP_LINK, _IPV4_IFADDR, _IPV4_ROUTE, _IPV6_ROUTE
+NETLINK_GROUPS = 0x1 | 0x10 | 0x40 | 0x400
+RTF_UP = 0x0001
+RTF_REJECT = 0x0200
+
+
+@dataclass(frozen=True)
+class NetworkStatus:
+    """What the OS says about the path to the internet right now."""
+
+    up: bool
+    interface: str = None  # carrying the default route
+    gateway: str = None
+    ssid: str = None  # None on wired links or when it cannot be read
+    wireless: bool = False
+
+    def describe(self):
+        if not self.up:
+            return f"{self.interface} link down" if self.interface else "no route"
+        via = f" via {self.gateway}" if self.gateway else ""
+        ssid = f" ({self.ssid})" if self.ssid else ""
+        return f"{self.interface}{ssid}{via}"
+
+
+def changes(old, new):
+    """Readable list of what differs between two statuses."""
+    if old is None:
+        return [f"network {'up' if new.up else 'down'}: {new.describe()}"]
+    found = []
+    if old.up != new.up:
+        found.append(f"network {'up' if new.up else 'down'}: {new.describe()}")
+    elif new.up and (old.interface, old.gateway) != (new.interface, new.gateway):
+        found.append(f"default route {old.describe()} → {new.describe()}")
+    if old.ssid != new.ssid and new.up:
+        found.append(f"SSID {old.ssid or '-'} → {new.ssid or '-'}")
+    return found
+
+
+def _ipv4(value):
+    return socket.inet_ntoa(int(value, 16).to_bytes(4, "little"))
+
+
+def _ipv6(value):
+    return socket.inet_ntop(socket.AF_INET6, bytes.fromhex(value))
+
+
+def _routes():
+    """(metric, interface, gateway) of every usable default route."""
+    try:
+        with open("/proc/net/route", encoding="ascii") as f:
+            for line in list(f)[1:]:
+                iface, dest, gateway, flags, _, _, metric, mask = line.split()[:8]
+                if dest == mask == "00000000" and int(flags, 16) & RTF_UP:
+                    yield int(metric), iface, _ipv4(gateway)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/net/ipv6_route", encoding="ascii") as f:
+            for line in f:
+                fields = line.split()
+                if fields[0] != "0" * 32 or fields[1] != "00" or fields[9] == "lo":
+                    continue
+                flags = int(fields[8], 16)
+                if flags & RTF_UP and not flags & RTF_REJECT:
+                    yield int(fields[5], 16), fields[9], _ipv6(fields[4])
+    except (OSError, ValueError, IndexError):
+        pass
+
+
+def default_route():
+    """(interface, gateway) of the best default route, from /proc; or None."""
+    best = min(_routes(), default=None)
+    return None if best is None else best[1:]
+
+
+def read_ssid(interface):
+    """SSID the interface is associated with, via whatever tool is installed."""
+    if os.name == "nt":
+        command = ["netsh", "wlan", "show", "interfaces"]
+    elif shutil.which("iwgetid"):
+        command = ["iwgetid", "-r", interface]
+    elif shutil.which("iw"):
+        command = ["iw", "dev", interface, "link"]
+    elif shutil.which("nmcli"):
+        command = ["nmcli", "-t", "-f", "GENERAL.CONNECTION", "dev", "show", interface]
+    else:
+        return None
+    try:
+        output = subprocess.run(
+            command, capture_output=True, text=True, timeout=SSID_TIMEOUT
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    for line in output.splitlines():
+        key, sep, value = line.strip().partition(":")
+        if command[0] == "iwgetid":
+            return line.strip() or None
+        if sep and key.strip() in ("SSID", "GENERAL.CONNECTION"):
+            return value.strip() or None
+    return None
+
+
+def read_status(want_ssid=False):
+    """Current ``NetworkStatus``: /proc and /sys on Linux, else a route check."""
+    if not sys.platform.startswith("linux"):
+        ok, _ = check_route(ROUTE_ANCHOR)
+        status = NetworkStatus(ok, interface="default" if ok else None)
+        if ok and want_ssid and os.name == "nt":
+            status = replace(status, ssid=read_ssid(None), wireless=True)
+        return status
+    route = default_route()
+    if route is None:
+        return NetworkStatus(False)
+    interface, gateway = route
+    device = Path("/sys/class/net") / interface
+    try:
+        operstate = (device / "operstate").read_text().strip()
+    except OSError:
+        operstate = "unknown"
+    wireless = (device / "wireless").exists()
+    up = operstate in ("up", "unknown")  # tun/ppp devices report "unknown"
+    ssid = read_ssid(interface) if up and wireless and want_ssid else None
+    return NetworkStatus(up, interface, gateway, ssid, wireless)
+
+
+class NetworkSource:
+    """Report network status changes to ``callback(status)``.
+
+    This base class polls ``read_status`` every ``interval`` seconds and is
+    the fallback everywhere. Subclasses only change what wakes it up; the
+    status itself is always re-read, so a missed or unparsed event can
+    never leave it wrong for longer than ``RESYNC``. The first status is
+    reported on ``start()``, and after that only changes.
+    """
+
+    kind = "poll"
+
+    def __init__(self, callback, want_ssid=False, interval=DEFAULT_POLL_INTERVAL):
+        self.callback = callback
+        self.want_ssid = want_ssid
+        self.interval = interval
+        self.status = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.refresh()
+        self._thread = threading.Thread(
+            target=self._run, name=f"network-{self.kind}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def refresh(self):
+        status = read_status(self.want_ssid)
+        if status != self.status:
+            self.status = status
+            self.callback(status)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+class NetlinkSource(NetworkSource):
+    """Linux: wake on rtnetlink link, address and route notifications.
+
+    The kernel sends these the moment a carrier drops or a route goes, so
+    the callback runs within a millisecond or so of the change. Messages
+    are not parsed: a burst is drained and the status re-read once.
+    """
+
+    kind = "netlink"
+
+    def start(self):
+        self._sock = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE
+        )
+        self._sock.bind((0, NETLINK_GROUPS))
+        self._sock.setblocking(False)
+        return super().start()
+
+    def _run(self):
+        resync = time.monotonic() + RESYNC
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([self._sock], [], [], 1.0)
+                if not readable and time.monotonic() < resync:
+                    continue
+                resync = time.monotonic() + RESYNC
+                self._drain()
+                self.refresh()
+        finally:
+            self._sock.close()
+
+    def _drain(self):
+        while True:
+            try:
+                self._sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:  # ENOBUFS: we fell behind; re-reading covers it
+                return
+
+
+class NmcliSource(NetworkSource):
+    """NetworkManager: wake on each line of ``nmcli monitor``."""
+
+    kind = "nmcli"
+
+    def start(self):
+        if not shutil.which("nmcli"):
+            raise OSError("nmcli not found")
+        self._proc = subprocess.Popen(
+            ["nmcli", "monitor"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return super().start()
+
+    def _run(self):
+        for _line in self._proc.stdout:
+            if self._stop.is_set():
+                break
+            self.refresh()
+
+    def stop(self):
+        self._stop.set()
+        self._proc.terminate()
+        super().stop()
+
+
+class FakeNetworkSource(NetworkSource):
+    """Status set by hand with ``set()``, for tests and benchmarks."""
+
+    kind = "fake"
+
+    def __init__(self, callback, want_ssid=False, interval=DEFAULT_POLL_INTERVAL):
+        super().__init__(callback, want_ssid, interval)
+        self.current = NetworkStatus(True, "fake0", "192.0.2.1")
+
+    def start(self):
+        self.refresh()
+        return self
+
+    def refresh(self):
+        if self.current != self.status:
+            self.status = self.current
+            self.callback(self.current)
+
+    def set(self, **fields):
+        """Change the fake status, e.g. ``set(up=False)``; reported at once."""
+        self.current = replace(self.current, **fields)
+        self.refresh()
+
+    def stop(self):
+        pass
+
+
+def open_source(
+    kind, callback, want_ssid=False, interval=DEFAULT_POLL_INTERVAL, log=None
+):
+    """Start source ``kind``; ``auto`` picks netlink on Linux, else polling.
+
+    A source that cannot start (no netlink, no nmcli) falls back to polling.
+    """
+    if kind == "off":
+        return None
+    if kind == "auto":
+        kind = "netlink" if hasattr(socket, "AF_NETLINK") else "poll"
+    classes = {
+        "netlink": NetlinkSource,
+        "nmcli": NmcliSource,
+        "poll": NetworkSource,
+        "fake": FakeNetworkSource,
+    }
+    try:
+        return classes[kind](callback, want_ssid, interval).start()
+    except OSError as e:
+        if log is not None:
+            log(
+                f"⚠️ {kind} network events unavailable ({e}), polling instead.",
+                logging.WARNING,
+                notify=False,
+            )
+        return NetworkSource(callback, want_ssid, interval).start()
@@ -0,0 +1,254 @@
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from cloudflare_watchdog.core.cloudflared import (
+    DEFAULT_MAX_ERROR_RATE,
+    DEFAULT_MIN_CONNECTIONS,
+    METRICS_PATH,
+    READY_PATH,
+    TunnelMonitor,
+    parse_metrics,
+)
+from cloudflare_watchdog.core.scheduler import ProbeScheduler
+from cloudflare_watchdog.core.validation import DEFAULT_EXPECTATION
+
+DEFAULT_TIMEOUT = 5
+DEFAULT_INTERVAL = 30
+DNS_TTL = 300
+
+
+@dataclass(frozen=True)
+class ProbeTarget:
+    """A single endpoint to watch, with its own cadence and timeout."""
+
+    name: str
+    url: str
+    interval: float = DEFAULT_INTERVAL
+    timeout: float = DEFAULT_TIMEOUT
+    origin: tuple = None  # (host, port) of the app behind the tunnel
+    kind: str = "http"  # or "cloudflared": the tunnel's local metrics server
+    min_connections: int = DEFAULT_MIN_CONNECTIONS
+    max_error_rate: float = DEFAULT_MAX_ERROR_RATE
+    method: str = "GET"  # or "HEAD"
+    expect: object = DEFAULT_EXPECTATION  # validation.Expectation
+
+
+@dataclass
+class ProbeResult:
+    target: ProbeTarget
+    success: bool
+    message: str
+    status_code: int = None
+    latency: float = None
+    error: str = None
+    timestamp: float = field(default_factory=time.time)
+
+
+class DNSCache:
+    """Small TTL cache in front of ``getaddrinfo`` for new pooled connections."""
+
+    def __init__(self, ttl=DNS_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get((host, port))
+        if cached and cached[0] > now:
+            return cached[1]
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[(host, port)] = (now + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class _CachedDNSConnection:
+    """Resolve through ``dns_cache`` and try each cached address in turn.
+
+    Only ``_dns_host`` is swapped, so TLS still sends SNI and checks the
+    certificate against the original host name.
+    """
+
+    dns_cache = None
+
+    def _new_conn(self):
+        host = self._dns_host
+        name = host.strip("[]")
+        try:
+            addresses = self.dns_cache.resolve(name, self.port)
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to resolve {name}: {e}") from e
+        error = None
+        for ip in addresses:
+            self._dns_host = ip
+            try:
+                return super()._new_conn()
+            except ConnectTimeoutError as e:  # includes NewConnectionError
+                error = e
+            finally:
+                self._dns_host = host
+        self.dns_cache.forget(name, self.port)
+        raise error or NewConnectionError(self, f"No addresses for {name}")
+
+
+class DNSCachingAdapter(HTTPAdapter):
+    """``HTTPAdapter`` whose new connections resolve through a ``DNSCache``.
+
+    The cache applies only to sessions the adapter is mounted on; other
+    ``requests`` users in the process keep plain ``getaddrinfo``.
+    """
+
+    def __init__(self, dns_cache, **kwargs):
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        extra = {"dns_cache": self.dns_cache}
+        pools = {}
+        for scheme, pool, conn in (
+            ("http", HTTPConnectionPool, HTTPConnection),
+            ("https", HTTPSConnectionPool, HTTPSConnection),
+        ):
+            cls = type(conn.__name__, (_CachedDNSConnection, conn), extra)
+            pools[scheme] = type(pool.__name__, (pool,), {"ConnectionCls": cls})
+        self.poolmanager.pool_classes_by_scheme = pools
+
+
+class ProbeEngine:
+    """Probe many targets concurrently over keep-alive sessions.
+
+    Each target gets its own ``requests.Session`` so its connection stays warm
+    between passes, and a sweep costs roughly as much as its slowest target.
+    """
+
+    def __init__(self, targets=(), max_workers=32, dns_cache=None, scheduler=None):
+        self.max_workers = max_workers
+        self.dns_cache = dns_cache or DNSCache()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="probe"
+        )
+        self._sessions = {}
+        self.tunnels = TunnelMonitor()
+        self.scheduler = scheduler or ProbeScheduler()
+        self._lock = threading.Lock()
+        self.targets = []
+        self.set_targets(targets)
+
+    def set_targets(self, targets):
+        """Replace the watched targets, keeping sessions for unchanged URLs."""
+        targets = list(targets)
+        if targets == self.targets:
+            return
+        keep = {t.name for t in targets}
+        with self._lock:
+            for name in list(self._sessions):
+                if name not in keep:
+                    self._sessions.pop(name).close()
+        self.scheduler.set_targets(targets)
+        self.tunnels.forget(keep)
+        self.targets = targets
+
+    def _session(self, target):
+        with self._lock:
+            session = self._sessions.get(target.name)
+            if session is None:
+                session = requests.Session()
+                adapter = DNSCachingAdapter(
+                    self.dns_cache, pool_connections=1, pool_maxsize=2
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[target.name] = session
+            return session
+
+    def _probe_tunnel(self, target, started):
+        """Read cloudflared's ``/ready``, then stream just enough ``/metrics``."""
+        base = target.url.rstrip("/")
+        session = self._session(target)
+        ready = session.get(base + READY_PATH, timeout=target.timeout)
+        metrics = None
+        if ready.status_code == 200:
+            with session.get(
+                base + METRICS_PATH, timeout=target.timeout, stream=True
+            ) as r:
+                if r.status_code == 200:
+                    metrics = parse_metrics(r.iter_lines())
+        status = self.tunnels.status(target, ready.status_code, ready.text, metrics)
+        ok, message = self.tunnels.judge(target, status)
+        return ProbeResult(
+            target, ok, message, ready.status_code, time.perf_counter() - started
+        )
+
+    def probe(self, target):
+        """Run a single HTTP check and describe the outcome.
+
+        The body is streamed and only read as far as ``target.expect`` needs.
+        """
+        url = target.url
+        started = time.perf_counter()
+        try:
+            if target.kind == "cloudflared":
+                return self._probe_tunnel(target, started)
+            with self._session(target).request(
+                target.method, url, timeout=target.timeout, stream=True
+            ) as r:
+                problem = target.expect.check(r)
+            latency = time.perf_counter() - started
+            problem = problem or target.expect.check_latency(latency)
+            if problem is None:
+                return ProbeResult(
+                    target, True, f"✅ Site online: {url}", r.status_code, latency
+                )
+            return ProbeResult(
+                target,
+                False,
+                f"⚠️ Site reachable but not responding correctly: {problem}",
+                r.status_code,
+                latency,
+            )
+        except requests.ConnectionError as e:
+            msg, error = f"❌ Connection failed: {url}", str(e)
+        except requests.Timeout as e:
+            msg, error = f"⏱️ Connection timed out: {url}", str(e)
+        except Exception as e:
+            msg, error = f"❌ Unexpected error: {e}", str(e)
+        return ProbeResult(
+            target, False, msg, latency=time.perf_counter() - started, error=error
+        )
+
+    def sweep(self, targets=None):
+        """Probe ``targets`` (default: all) in parallel and return their results."""
+        targets = self.targets if targets is None else list(targets)
+        return list(self._pool.map(self.probe, targets))
+
+    def run_due(self, now=None):
+        """Probe only the targets the scheduler says are due."""
+        due = self.scheduler.pop_due(now)
+        return self.sweep(due) if due else []
+
+    def seconds_until_due(self, now=None):
+        return self.scheduler.seconds_until_due(now)
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
@@ -0,0 +1,291 @@
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Bucket upper bounds in seconds, 10 us to 30 s, roughly x2.5 apart.
+PHASE_BUCKETS = (
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)  # fmt: skip
+WINDOW = 300.0  # seconds of history in the rolling histograms
+SLICES = 10
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_PROFILE_SECONDS = 30.0
+SAMPLE_INTERVAL = 0.005
+
+
+class RollingHistogram:
+    """Bucketed durations over the last ``window`` seconds.
+
+    The window is cut into ``slices`` rings of bucket counts; observing only
+    bumps one counter (clearing a slice when time has moved on to it), and
+    old data falls out without ever walking the samples.
+    """
+
+    def __init__(self, buckets=PHASE_BUCKETS, window=WINDOW, slices=SLICES):
+        self.buckets = buckets
+        self.slice_seconds = window / slices
+        self._slices = [[-1, [0] * (len(buckets) + 1), 0.0, 0.0] for _ in range(slices)]
+
+    def observe(self, value, now):
+        tick = int(now // self.slice_seconds)
+        entry = self._slices[tick % len(self._slices)]
+        if entry[0] != tick:
+            entry[0], entry[1], entry[2], entry[3] = tick, [0] * len(entry[1]), 0.0, 0.0
+        entry[1][bisect_left(self.buckets, value)] += 1
+        entry[2] += value
+        if value > entry[3]:
+            entry[3] = value
+
+    def summary(self, now):
+        """(count, total, max, p50, p95, p99) over the window; None if empty."""
+        oldest = int(now // self.slice_seconds) - len(self._slices) + 1
+        counts = [0] * (len(self.buckets) + 1)
+        total = peak = 0.0
+        for tick, slice_counts, slice_total, slice_max in self._slices:
+            if tick < oldest:
+                continue
+            counts = [a + b for a, b in zip(counts, slice_counts)]
+            total += slice_total
+            peak = max(peak, slice_max)
+        count = sum(counts)
+        if not count:
+            return None
+        quantiles = []
+        for q in (0.5, 0.95, 0.99):
+            rank, seen = q * count, 0
+            for index, n in enumerate(counts):
+                seen += n
+                if seen >= rank:
+                    bound = self.buckets[index] if index < len(self.buckets) else peak
+                    quantiles.append(min(bound, peak))
+                    break
+        return (count, total, peak, *quantiles)
+
+
+class _Span:
+    __slots__ = ("timer", "phase", "started")
+
+    def __init__(self, timer, phase):
+        self.timer = timer
+        self.phase = phase
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.observe(self.phase, time.perf_counter() - self.started)
+        return False
+
+
+class PhaseTimer:
+    """Rolling per-phase duration histograms for the monitor loop.
+
+    ``with timer.span("probe"): ...`` costs two ``perf_counter`` calls and a
+    bucket increment. ``histogram`` (a metrics ``Histogram`` with a
+    ``phase`` label), if set, receives every observation as well.
+    """
+
+    def __init__(self, window=WINDOW, histogram=None):
+        self.window = window
+        self.histogram = histogram
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def span(self, phase):
+        return _Span(self, phase)
+
+    def observe(self, phase, seconds):
+        now = time.monotonic()
+        with self._lock:
+            histogram = self._phases.get(phase)
+            if histogram is None:
+                histogram = self._phases[phase] = RollingHistogram(window=self.window)
+            histogram.observe(seconds, now)
+        if self.histogram is not None:
+            self.histogram.observe(seconds, phase=phase)
+
+    def summary(self):
+        """{phase: (count, total, max, p50, p95, p99)} over the window."""
+        now = time.monotonic()
+        with self._lock:
+            rows = {name: h.summary(now) for name, h in self._phases.items()}
+        return {name: row for name, row in rows.items() if row is not None}
+
+    def format(self):
+        rows = sorted(self.summary().items(), key=lambda item: -item[1][1])
+        lines = [
+            f"Phase timings over the last {self.window:g}s (by total time)",
+            f"{'phase':<28} {'count':>7} {'total':>9} {'p50':>9} {'p95':>9} "
+            f"{'p99':>9} {'max':>9}",
+        ]
+        for name, (count, total, peak, p50, p95, p99) in rows:
+            lines.append(
+                f"{name:<28} {count:>7} {_ms(total):>9} {_ms(p50):>9} "
+                f"{_ms(p95):>9} {_ms(p99):>9} {_ms(peak):>9}"
+            )
+        return "\n".join(lines)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.2f}ms"
+
+
+class Profiler:
+    """Capture one profiling window on demand and write it to ``directory``.
+
+    ``request()`` only sets a flag, so it is safe from a signal handler or
+    the GUI thread. The monitor loop calls ``poll()`` once per pass; when
+    nothing was requested that is a single attribute check. ``flush()``
+    ends a capture early when the loop stops.
+
+    * ``cprofile``: deterministic profile of the monitor loop thread,
+      written as a ``.prof`` file (``python -m pstats``, snakeviz) plus a
+      text summary of the top functions.
+    * ``sample``: a background thread samples every thread's stack every
+      few milliseconds and writes collapsed stacks (``.folded``) that
+      flamegraph.pl or speedscope read directly. It also sees the log
+      writer, probe and remediation threads.
+    """
+
+    def __init__(self, directory, log, timer=None):
+        self.directory = Path(directory)
+        self.log = log
+        self.timer = timer
+        self.pending = None  # (mode, seconds) once requested
+        self._active = None
+        self._lock = threading.Lock()
+
+    def request(self, seconds=DEFAULT_PROFILE_SECONDS, mode="cprofile"):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"profile mode must be one of {PROFILE_MODES}")
+        with self._lock:
+            if self._active is None:
+                self.pending = (mode, float(seconds))
+
+    def poll(self):
+        """Start or finish a capture; called from the loop thread."""
+        if self.pending is None and self._active is None:
+            return
+        with self._lock:
+            if self._active is None and self.pending is not None:
+                mode, seconds = self.pending
+                self.pending = None
+                self._start(mode, seconds)
+            elif self._active is not None and time.monotonic() >= self._active[1]:
+                self._finish()
+
+    def flush(self):
+        """Write out a running capture early and drop one not yet started.
+
+        Called by the loop thread as it exits, so a stopped loop never
+        leaves a capture that nothing will finish.
+        """
+        with self._lock:
+            if self.pending is not None:
+                self.pending = None
+                self.log("🔬 Profile request dropped: the watchdog stopped.")
+            if self._active is not None:
+                return self._finish()
+
+    @property
+    def deadline(self):
+        """When the running capture should stop, for the loop's wait."""
+        return None if self._active is None else self._active[1]
+
+    def _start(self, mode, seconds):
+        if mode == "cprofile":
+            import cProfile
+
+            handle = cProfile.Profile()
+            handle.enable()
+        else:
+            handle = StackSampler().start()
+        self._active = (mode, time.monotonic() + seconds, handle)
+        self.log(f"🔬 Profiling ({mode}) for {seconds:g}s...")
+
+    def _finish(self):
+        mode, _, handle = self._active
+        self._active = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stem = self.directory / f"{mode}-{datetime.now():%Y%m%d-%H%M%S}"
+        if mode == "cprofile":
+            import io
+            import pstats
+
+            handle.disable()
+            path = stem.with_suffix(".prof")
+            handle.dump_stats(path)
+            text = io.StringIO()
+            pstats.Stats(handle, stream=text).sort_stats("cumulative").print_stats(40)
+            summary = text.getvalue()
+        else:
+            handle.stop()
+            path = stem.with_suffix(".folded")
+            path.write_text(handle.folded(), encoding="utf-8")
+            summary = handle.top()
+        if self.timer is not None:
+            summary = self.timer.format() + "\n\n" + summary
+        stem.with_suffix(".txt").write_text(summary, encoding="utf-8")
+        self.log(f"🔬 Profile written to {path}")
+        return path
+
+
+class StackSampler:
+    """Sample every thread's Python stack at a fixed interval."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def top(self, limit=40):
+        """Leaf functions by share of samples, as text."""
+        leaves = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += n
+        total = sum(leaves.values()) or 1
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms"]
+        for leaf, n in leaves.most_common(limit):
+            lines.append(f"{n / total:7.1%}  {leaf}")
+        return "\n".join(lines)
@@ -0,0 +1,261 @@
+import json
+import random
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+
+from cloudflare_watchdog.core.health import HealthMonitor, HealthState, RestartBudget
+from cloudflare_watchdog.core.probe import ProbeTarget
+from cloudflare_watchdog.core.scheduler import ProbeScheduler
+from cloudflare_watchdog.core.timeseries import TimeSeriesStore
+
+DEFAULT_MIN_OUTAGE = 60.0
+
+
+class Recording:
+    """Recorded probe outcomes per target, queried as a step function.
+
+    The outcome at time ``t`` is that of the last recorded probe at or
+    before ``t``. Queries only move forward during a replay, so each
+    target keeps a cursor and a lookup is amortised O(1).
+    """
+
+    def __init__(self, series):
+        # {target: (times, oks)}, each sorted by time
+        self.series = {name: s for name, s in series.items() if s[0]}
+        self.failures = {
+            name: [t for t, ok in zip(times, oks) if not ok]
+            for name, (times, oks) in self.series.items()
+        }
+        self._cursors = dict.fromkeys(self.series, 0)
+
+    @classmethod
+    def from_store(cls, directory, start=None, end=None):
+        store = TimeSeriesStore(directory, readonly=True)
+        try:
+            series = {}
+            for name in store.targets():
+                samples = store.window(name, start, end)
+                series[name] = (
+                    [s.timestamp for s in samples],
+                    [s.ok for s in samples],
+                )
+        finally:
+            store.close()
+        return cls(series)
+
+    @classmethod
+    def from_jsonl(cls, path, start=None, end=None):
+        """Lines of ``{"ts": epoch, "target": name, "ok": bool}``."""
+        rows = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                ts = float(row["ts"])
+                if (start is None or ts >= start) and (end is None or ts < end):
+                    samples = rows.setdefault(str(row["target"]), [])
+                    samples.append((ts, bool(row["ok"])))
+        series = {}
+        for name, samples in rows.items():
+            samples.sort()
+            series[name] = ([s[0] for s in samples], [s[1] for s in samples])
+        return cls(series)
+
+    @property
+    def span(self):
+        starts = [times[0] for times, _ in self.series.values()]
+        ends = [times[-1] for times, _ in self.series.values()]
+        return (min(starts), max(ends)) if starts else (0.0, 0.0)
+
+    def samples(self):
+        return sum(len(times) for times, _ in self.series.values())
+
+    def rewind(self):
+        self._cursors = dict.fromkeys(self.series, 0)
+
+    def at(self, target, t):
+        times, oks = self.series[target]
+        i = self._cursors[target]
+        if i + 1 < len(times) and times[i + 1] <= t:
+            i += 1
+            if i + 1 < len(times) and times[i + 1] <= t:
+                i = bisect_right(times, t, i) - 1
+            self._cursors[target] = i
+        return oks[i]
+
+    def next_failure(self, target, t):
+        """Time of the first recorded failure after ``t`` (inf if none)."""
+        failures = self.failures[target]
+        i = bisect_right(failures, t)
+        return failures[i] if i < len(failures) else float("inf")
+
+    def outages(self, target, min_duration=DEFAULT_MIN_OUTAGE):
+        """``(start, end)`` of failure runs lasting at least ``min_duration``.
+
+        This is the ground truth a replay is scored against; shorter runs
+        of failures are blips that a good config should ride out.
+        """
+        times, oks = self.series[target]
+        found, start = [], None
+        for t, ok in zip(times, oks):
+            if not ok and start is None:
+                start = t
+            elif ok and start is not None:
+                if t - start >= min_duration:
+                    found.append((start, t))
+                start = None
+        if start is not None and times[-1] - start >= min_duration:
+            found.append((start, times[-1]))
+        return found
+
+
+@dataclass
+class TargetReplay:
+    target: str
+    probes: int = 0
+    outages: int = 0
+    detected: int = 0
+    false_positives: int = 0
+    remediations: int = 0
+    skipped: int = 0  # remediation refused by the restart budget
+    detection: list = field(default_factory=list)  # seconds per detected outage
+    downs: list = field(default_factory=list)  # (start, end) simulated down
+
+    @property
+    def missed(self):
+        return self.outages - self.detected
+
+    @property
+    def mean_detection(self):
+        return sum(self.detection) / len(self.detection) if self.detection else None
+
+    @property
+    def max_detection(self):
+        return max(self.detection) if self.detection else None
+
+
+@dataclass
+class ReplayReport:
+    start: float
+    end: float
+    samples: int
+    wall: float
+    targets: dict
+
+    def total(self, key):
+        return sum(getattr(t, key) for t in self.targets.values())
+
+
+def replay(
+    recording,
+    settings,
+    start=None,
+    end=None,
+    min_outage=DEFAULT_MIN_OUTAGE,
+    remediation_seconds=10.0,
+    seed=0,
+):
+    """Run ``settings``' decision logic over ``recording`` on a virtual clock.
+
+    The real ``ProbeScheduler``, ``HealthMonitor`` and ``RestartBudget``
+    decide when to probe, when a target is down and whether remediation may
+    run; a probe "returns" the recorded outcome at that instant. Remediation
+    is stubbed: it only counts, and ``remediation_seconds`` later expedites
+    the next probe as a finished run would. Diagnosis is not replayed, so
+    the fast path for conclusive failures does not apply. Healthy stretches
+    with no recorded failure ahead are skipped rather than probed one by one,
+    so a month of history replays in about a second.
+    """
+    wall = time.perf_counter()
+    first, last = recording.span
+    start = first if start is None else max(start, first)
+    end = last if end is None else min(end, last)
+    intervals = {t.name: t.interval for t in settings.targets}
+    targets = [
+        ProbeTarget(
+            name, f"replay://{name}", intervals.get(name, settings.check_interval)
+        )
+        for name in sorted(recording.series)
+    ]
+    scheduler = ProbeScheduler(
+        settings.confirm_interval,
+        settings.max_backoff,
+        settings.probe_jitter,
+        rng=random.Random(seed),
+    )
+    scheduler.set_targets(targets, now=start)
+    budget = RestartBudget(
+        settings.restart_budget, settings.restart_window, settings.restart_cooldown
+    )
+    health = HealthMonitor(
+        settings.failure_threshold, settings.recovery_threshold, budget
+    )
+    reports = {t.name: TargetReplay(t.name) for t in targets}
+    down_since = {}
+    finishing = None  # virtual time the running remediation round ends
+    recording.rewind()
+
+    now = start
+    while targets:
+        now += scheduler.seconds_until_due(now)
+        if finishing is not None and finishing <= now:
+            # As _remediation_finished: re-check whatever is still down.
+            scheduler.expedite(
+                [n for n in down_since if health.state(n) is HealthState.DOWN],
+                now=finishing,
+            )
+            now = min(now, finishing + scheduler.seconds_until_due(finishing))
+            finishing = None
+        if now >= end:
+            break
+        for target in scheduler.pop_due(now):
+            name = target.name
+            report = reports[name]
+            report.probes += 1
+            transition = health.observe(name, recording.at(name, now))
+            state = health.state(name)
+            since = now
+            if state is HealthState.HEALTHY:
+                # Until the next recorded failure every probe succeeds and
+                # changes nothing, so jump over those probes in one step.
+                quiet = min(recording.next_failure(name, now), end) - now
+                jump = int(quiet / target.interval - 1 - scheduler.jitter)
+                if jump > 0:
+                    report.probes += jump
+                    since += jump * target.interval
+            scheduler.reschedule(target, state, since)
+            action = transition.action if transition else None
+            if action == "down":
+                down_since[name] = now
+            elif action == "recovery":
+                report.downs.append((down_since.pop(name), now))
+            if action not in ("down", "retry"):
+                continue
+            if not budget.allow(now):
+                report.skipped += action == "down"
+            elif finishing is None:  # the executor runs one round at a time
+                budget.record(now)
+                report.remediations += 1
+                finishing = now + remediation_seconds
+    for name, since in down_since.items():
+        reports[name].downs.append((since, end))
+
+    for name, report in reports.items():
+        outages = [
+            (s, e) for s, e in recording.outages(name, min_outage) if start <= s < end
+        ]
+        report.outages = len(outages)
+        for o_start, o_end in outages:
+            overlapping = [d for d in report.downs if d[0] < o_end and d[1] > o_start]
+            if overlapping:
+                report.detected += 1
+                report.detection.append(max(0.0, overlapping[0][0] - o_start))
+        report.false_positives = sum(
+            not any(d[0] < o_end and d[1] > o_start for o_start, o_end in outages)
+            for d in report.downs
+        )
+    return ReplayReport(
+        start, end, recording.samples(), time.perf_counter() - wall, reports
+    )
@@ -0,0 +1,142 @@
+import heapq
+import random
+import threading
+import time
+
+DEFAULT_CONFIRM_INTERVAL = 1.0
+DEFAULT_MAX_BACKOFF = 300.0
+DEFAULT_JITTER = 0.1
+IDLE_WAIT = 30.0  # nothing scheduled at all
+MAX_STREAK = 32  # backoff doubling stops here; 2**32 s is far past any cap
+
+
+class ProbeScheduler:
+    """Deadline heap deciding when each target is probed next.
+
+    * healthy: every ``target.interval`` seconds
+    * suspect / recovering: after ``confirm_interval``, so a first failure
+      (or a first success while down) is confirmed within a second or two
+    * down: ``confirm_interval`` doubling on every further failure, up to
+      ``max_backoff``, while remediation runs; ``expedite`` brings the next
+      probe forward once a remediation round has finished
+
+    Every delay is spread by +/- ``jitter`` so targets added together drift
+    apart instead of hitting the network in lockstep. Entries are replaced
+    lazily: rescheduling pushes a new entry and stale ones are skipped when
+    they surface, so every operation is O(log n).
+    """
+
+    def __init__(
+        self,
+        confirm_interval=DEFAULT_CONFIRM_INTERVAL,
+        max_backoff=DEFAULT_MAX_BACKOFF,
+        jitter=DEFAULT_JITTER,
+        rng=None,
+    ):
+        self.confirm_interval = confirm_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.targets = {}
+        self._heap = []
+        self._entries = {}  # name -> (due, seq) of the live heap entry
+        self._streaks = {}  # name -> consecutive probes while down
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def configure(self, confirm_interval, max_backoff, jitter):
+        self.confirm_interval = confirm_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def _push(self, name, due):
+        self._seq += 1
+        self._entries[name] = (due, self._seq)
+        heapq.heappush(self._heap, (due, self._seq, name))
+
+    def _spread(self, delay):
+        if not self.jitter:
+            return delay
+        return delay * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def set_targets(self, targets, now=None):
+        """Track ``targets``; new ones are due almost at once, staggered."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            fresh = {t.name: t for t in targets}
+            for name in list(self.targets):
+                if name not in fresh:
+                    self._entries.pop(name, None)
+                    self._streaks.pop(name, None)
+            for name, target in fresh.items():
+                previous = self.targets.get(name)
+                if previous is None:
+                    self._push(name, now + self.rng.uniform(0, self.jitter))
+                elif previous.interval != target.interval:
+                    self._push(name, now + self._spread(target.interval))
+            self.targets = fresh
+
+    def pop_due(self, now=None):
+        """Targets whose deadline has passed.
+
+        Each is provisionally rescheduled one interval ahead, so a pass that
+        fails before calling ``reschedule`` cannot lose a target.
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, name = heapq.heappop(self._heap)
+                entry = self._entries.get(name)
+                if entry is None or entry[1] != seq:
+                    continue
+                target = self.targets[name]
+                self._push(name, now + self._spread(target.interval))
+                due.append(target)
+        return due
+
+    def seconds_until_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._heap:
+                due, seq, name = self._heap[0]
+                entry = self._entries.get(name)
+                if entry is not None and entry[1] == seq:
+                    return max(0.0, due - now)
+                heapq.heappop(self._heap)
+        return IDLE_WAIT
+
+    def delay_for(self, target, state):
+        """Seconds until the next probe of ``target`` in health ``state``."""
+        state = getattr(state, "value", state)
+        if state == "down":
+            streak = self._streaks.get(target.name, 0)
+            self._streaks[target.name] = min(streak + 1, MAX_STREAK)
+            delay = self.confirm_interval * 2**streak
+            return min(delay, max(self.max_backoff, self.confirm_interval))
+        self._streaks.pop(target.name, None)
+        if state in ("suspect", "recovering"):
+            return min(self.confirm_interval, target.interval)
+        return target.interval
+
+    def reschedule(self, target, state, now=None):
+        """Schedule the next probe of ``target`` from its new health state."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if target.name not in self.targets:
+                return None
+            due = now + self._spread(self.delay_for(target, state))
+            self._push(target.name, due)
+            return due
+
+    def expedite(self, names, now=None):
+        """Probe ``names`` again soon and restart their backoff."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for name in names:
+                if name not in self.targets:
+                    continue
+                self._streaks.pop(name, None)
+                due = now + self._spread(self.confirm_interval)
+                if due < self._entries.get(name, (float("inf"),))[0]:
+                    self._push(name, due)
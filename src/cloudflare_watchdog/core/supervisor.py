@@ -0,0 +1,320 @@
+import hashlib
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cloudflare_watchdog.core.executor import shell_argv
+
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 60.0
+STABLE_AFTER = 60.0
+ADOPT_POLL = 2.0
+QUERY_TIMEOUT = 10.0  # seconds for the PowerShell process query on Windows
+
+
+def process_identity(command):
+    """Commands that differ only in whitespace or case are the same process."""
+    return " ".join(command.split()).lower()
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        return _windows_pid_alive(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _windows_pid_alive(pid):
+    """On Windows ``os.kill(pid, 0)`` sends CTRL_C_EVENT, so ask the kernel."""
+    import ctypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # QUERY_LIMITED_INFORMATION
+    if not handle:
+        return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: it exists
+    try:
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        return bool(ok) and code.value == 259  # STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _command_line(pid):
+    """``pid``'s command line via psutil, /proc or CIM; None if unreadable."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            return " ".join(psutil.Process(pid).cmdline())
+        except psutil.Error:
+            return None
+    if os.name == "nt":
+        query = f"(Get-CimInstance Win32_Process -Filter 'ProcessId={int(pid)}')"
+        try:
+            output = subprocess.run(
+                ["powershell", "-NoProfile", "-Command", query + ".CommandLine"],
+                capture_output=True,
+                text=True,
+                timeout=QUERY_TIMEOUT,
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return output.strip() or None
+    try:
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return None
+    return cmdline.replace(b"\0", b" ").decode(errors="replace")
+
+
+def _pid_matches(pid, command):
+    """Best-effort check that ``pid`` still runs ``command``."""
+    cmdline = _command_line(pid)
+    program = command.split()[0].lower()
+    return cmdline is not None and program in cmdline.lower()
+
+
+@dataclass
+class ManagedProcess:
+    identity: str
+    command: str
+    proc: subprocess.Popen = None
+    pid: int = None
+    started_at: float = None
+    restarts: int = 0
+    last_exit: int = None
+    backoff: float = BACKOFF_INITIAL
+    stopping: bool = False
+    wake: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def running(self):
+        if self.proc is not None:
+            return self.proc.poll() is None
+        return self.pid is not None and _pid_alive(self.pid)
+
+    @property
+    def uptime(self):
+        if not self.running or self.started_at is None:
+            return 0.0
+        return time.monotonic() - self.started_at
+
+    def snapshot(self):
+        return {
+            "identity": self.identity,
+            "command": self.command,
+            "pid": self.pid if self.running else None,
+            "running": self.running,
+            "uptime": round(self.uptime, 1),
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+            "adopted": self.proc is None and self.pid is not None,
+        }
+
+
+class ProcessSupervisor:
+    """Own, de-duplicate and restart long-running recovery commands.
+
+    Each command is keyed by its identity, so at most one copy of e.g.
+    ``cloudflared tunnel run mytunnel`` exists no matter how many failed
+    passes ask for it. Children are reaped by a watcher thread and restarted
+    with exponential backoff when they exit non-zero; the backoff resets once
+    a child has stayed up for ``STABLE_AFTER`` seconds. PIDs are written to
+    ``state_dir`` so a restarted watchdog adopts its previous children
+    instead of spawning duplicates next to them.
+    """
+
+    def __init__(self, log, state_dir=None):
+        self.log = log
+        self.state_dir = Path(state_dir) if state_dir else None
+        if self.state_dir:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._processes = {}
+        self._lock = threading.Lock()
+
+    def _pid_file(self, identity):
+        if not self.state_dir:
+            return None
+        digest = hashlib.sha1(identity.encode()).hexdigest()[:16]
+        return self.state_dir / f"{digest}.pid"
+
+    def _adopt(self, managed):
+        pid_file = self._pid_file(managed.identity)
+        if not pid_file or not pid_file.exists():
+            return False
+        try:
+            pid = int(pid_file.read_text().strip())
+        except (OSError, ValueError):
+            return False
+        if not (_pid_alive(pid) and _pid_matches(pid, managed.command)):
+            pid_file.unlink(missing_ok=True)
+            return False
+        managed.pid = pid
+        managed.started_at = time.monotonic()
+        self.log(f"🧲 Adopted running process {pid}: {managed.command}")
+        return True
+
+    def _spawn(self, managed):
+        kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        managed.proc = subprocess.Popen(shell_argv(managed.command), **kwargs)
+        managed.pid = managed.proc.pid
+        managed.started_at = time.monotonic()
+        pid_file = self._pid_file(managed.identity)
+        if pid_file:
+            pid_file.write_text(str(managed.pid))
+        self.log(
+            f"🚀 Supervised process started (pid {managed.pid}): {managed.command}"
+        )
+
+    def ensure(self, command):
+        """Make sure exactly one copy of ``command`` is running."""
+        identity = process_identity(command)
+        with self._lock:
+            managed = self._processes.get(identity)
+            if managed and managed.running:
+                self.log(f"♻️ Already running (pid {managed.pid}): {command}")
+                return managed
+            if managed:
+                # Waiting out a backoff: start now instead.
+                managed.backoff = BACKOFF_INITIAL
+                managed.wake.set()
+                return managed
+            managed = ManagedProcess(identity, command)
+            self._processes[identity] = managed
+            if not self._adopt(managed):
+                try:
+                    self._spawn(managed)
+                except OSError:
+                    # Nothing will watch it; let the next ensure() try afresh.
+                    del self._processes[identity]
+                    raise
+        threading.Thread(
+            target=self._watch, args=(managed,), name="supervisor", daemon=True
+        ).start()
+        return managed
+
+    def _wait_exit(self, managed):
+        if managed.proc is not None:
+            return managed.proc.wait()
+        while managed.pid and not managed.stopping and _pid_alive(managed.pid):
+            managed.wake.wait(ADOPT_POLL)
+            managed.wake.clear()
+        return None
+
+    def _watch(self, managed):
+        while True:
+            code = self._wait_exit(managed)
+            managed.last_exit = code
+            if managed.stopping:
+                break
+            if code == 0:
+                self.log(f"⏹️ Supervised process exited cleanly: {managed.command}")
+                break
+            uptime = time.monotonic() - (managed.started_at or time.monotonic())
+            if uptime > STABLE_AFTER:
+                managed.backoff = BACKOFF_INITIAL
+            delay = managed.backoff
+            managed.backoff = min(managed.backoff * 2, BACKOFF_MAX)
+            self.log(
+                f"💀 Supervised process exited ({code}), restarting in {delay:g}s: "
+                f"{managed.command}",
+                logging.WARNING,
+            )
+            managed.wake.clear()
+            managed.wake.wait(delay)
+            with self._lock:
+                if managed.stopping:
+                    break
+                managed.restarts += 1
+                try:
+                    self._spawn(managed)
+                except OSError as e:
+                    self.log(
+                        f"💥 Could not restart {managed.command}: {e}", logging.ERROR
+                    )
+                    managed.proc = None
+                    managed.pid = None
+                    continue
+        with self._lock:
+            owner = self._processes.get(managed.identity)
+            if owner is managed:
+                del self._processes[managed.identity]
+            pid_file = self._pid_file(managed.identity)
+            if pid_file and owner in (None, managed):
+                pid_file.unlink(missing_ok=True)
+
+    def _terminate(self, managed, timeout):
+        pid = managed.pid
+        if pid is None or not managed.running:
+            return
+        try:
+            if os.name == "nt":
+                if managed.proc is not None:
+                    managed.proc.terminate()
+                else:
+                    os.kill(pid, signal.SIGTERM)
+            else:
+                os.killpg(os.getpgid(pid), signal.SIGTERM)
+        except OSError:
+            pass
+        deadline = time.monotonic() + timeout
+        while managed.running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if managed.running:
+            try:
+                if os.name != "nt":
+                    os.killpg(os.getpgid(pid), signal.SIGKILL)
+                elif managed.proc is not None:
+                    managed.proc.kill()
+            except OSError:
+                pass
+
+    def stop(self, command, timeout=5):
+        """Stop a supervised process and keep it from being restarted."""
+        with self._lock:
+            managed = self._processes.get(process_identity(command))
+        if managed is None:
+            return False
+        managed.stopping = True
+        managed.wake.set()
+        self._terminate(managed, timeout)
+        return True
+
+    def restart(self, command, timeout=5):
+        """Stop ``command`` if it is running and start a fresh copy."""
+        self.stop(command, timeout)
+        with self._lock:
+            managed = self._processes.pop(process_identity(command), None)
+        if managed and managed.proc is not None:
+            managed.proc.wait()
+        return self.ensure(command)
+
+    def stop_all(self, timeout=5):
+        with self._lock:
+            commands = [m.command for m in self._processes.values()]
+        for command in commands:
+            self.stop(command, timeout)
+
+    def status(self):
+        """PID, uptime, restart count and last exit code per supervised command."""
+        with self._lock:
+            return [m.snapshot() for m in self._processes.values()]
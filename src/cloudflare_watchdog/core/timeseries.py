@@ -0,0 +1,303 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+MAGIC = b"CFWTS1\0\0"
+HEADER = struct.Struct("<8sIII12x")  # magic, capacity, head, count
+RECORD = struct.Struct("<dfhBB")  # timestamp, latency, status, state, ok
+DEFAULT_CAPACITY = 2**19  # ~30 days at a 5 s interval, 8 MiB per target
+
+STATE_CODES = {"healthy": 0, "suspect": 1, "down": 2, "recovering": 3}
+
+_numpy = None
+
+
+def numpy_or_none():
+    """Import numpy on first use; the headless daemon never needs it."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+@dataclass
+class Sample:
+    timestamp: float
+    latency: float
+    status: int
+    state: int
+    ok: bool
+
+
+@dataclass
+class Bucket:
+    """Downsampled summary of the samples falling in one time slot."""
+
+    timestamp: float
+    count: int
+    uptime: float
+    mean_latency: float
+    max_latency: float
+
+
+class SeriesRing:
+    """Fixed-size ring of probe samples in a memory-mapped file.
+
+    Appending packs one 16-byte record into the next slot and bumps the
+    header, so writes are O(1) and the file never grows. Readers can open
+    the same file read-only (even from another process) and see new
+    samples without reloading.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, readonly=False):
+        self.path = Path(path)
+        self.readonly = readonly
+        if not self.path.exists():
+            if readonly:
+                raise FileNotFoundError(self.path)
+            self._create(capacity)
+        self._file = open(self.path, "rb" if readonly else "r+b")
+        access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+        self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        magic, self.capacity, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a time-series ring")
+
+    def _create(self, capacity):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, capacity, 0, 0))
+            f.truncate(HEADER.size + capacity * RECORD.size)
+        os.replace(tmp, self.path)
+
+    def _header(self):
+        _, _, head, count = HEADER.unpack_from(self._map, 0)
+        return head, count
+
+    def __len__(self):
+        return self._header()[1]
+
+    def append(self, timestamp, latency, status, state, ok):
+        head, count = self._header()
+        if count:  # window() bisects, so a wall-clock step back is clamped
+            timestamp = max(timestamp, self._timestamp(count - 1, head, count))
+        RECORD.pack_into(
+            self._map,
+            HEADER.size + head * RECORD.size,
+            timestamp,
+            -1.0 if latency is None else latency,
+            status or 0,
+            state,
+            1 if ok else 0,
+        )
+        head = (head + 1) % self.capacity
+        HEADER.pack_into(
+            self._map, 0, MAGIC, self.capacity, head, min(count + 1, self.capacity)
+        )
+
+    def _slot(self, index, head, count):
+        """Physical slot of the ``index``-th oldest sample."""
+        return (head - count + index) % self.capacity
+
+    def _timestamp(self, index, head, count):
+        offset = HEADER.size + self._slot(index, head, count) * RECORD.size
+        return struct.unpack_from("<d", self._map, offset)[0]
+
+    def _bounds(self, start, end, head, count):
+        class _Times:
+            def __len__(_self):
+                return count
+
+            def __getitem__(_self, i):
+                return self._timestamp(i, head, count)
+
+        times = _Times()
+        lo = 0 if start is None else bisect_left(times, start)
+        hi = count if end is None else bisect_left(times, end)
+        return lo, hi
+
+    def _raw(self, lo, hi, head, count):
+        """Bytes for logical samples ``lo``..``hi`` (at most two slices)."""
+        if lo >= hi:
+            return b""
+        first = self._slot(lo, head, count)
+        last = self._slot(hi - 1, head, count)
+        base, size = HEADER.size, RECORD.size
+        if first <= last:
+            return self._map[base + first * size : base + (last + 1) * size]
+        return (
+            self._map[base + first * size : base + self.capacity * size]
+            + self._map[base : base + (last + 1) * size]
+        )
+
+    def window(self, start=None, end=None):
+        """Samples with ``start <= timestamp < end``, oldest first."""
+        head, count = self._header()
+        lo, hi = self._bounds(start, end, head, count)
+        return [
+            Sample(t, None if lat < 0 else lat, status, state, bool(ok))
+            for t, lat, status, state, ok in RECORD.iter_unpack(
+                self._raw(lo, hi, head, count)
+            )
+        ]
+
+    def downsample(self, start, end, buckets):
+        """Summarise ``[start, end)`` into ``buckets`` equal time slots."""
+        head, count = self._header()
+        lo, hi = self._bounds(start, end, head, count)
+        raw = self._raw(lo, hi, head, count)
+        width = (end - start) / buckets
+        np = numpy_or_none()
+        if np is not None:
+            return self._downsample_np(np, raw, start, width, buckets)
+        slots = [[0, 0, 0.0, 0.0, 0] for _ in range(buckets)]
+        for t, lat, _status, _state, ok in RECORD.iter_unpack(raw):
+            slot = slots[min(int((t - start) / width), buckets - 1)]
+            slot[0] += 1
+            slot[1] += ok
+            if lat >= 0:
+                slot[2] += lat
+                slot[3] = max(slot[3], lat)
+                slot[4] += 1
+        return [
+            Bucket(
+                start + (i + 0.5) * width,
+                n,
+                up / n,
+                total / timed if timed else None,
+                peak if timed else None,
+            )
+            for i, (n, up, total, peak, timed) in enumerate(slots)
+            if n
+        ]
+
+    @staticmethod
+    def _downsample_np(np, raw, start, width, buckets):
+        dtype = np.dtype(
+            [
+                ("t", "<f8"),
+                ("latency", "<f4"),
+                ("status", "<i2"),
+                ("state", "u1"),
+                ("ok", "u1"),
+            ]
+        )
+        data = np.frombuffer(raw, dtype=dtype)
+        if not len(data):
+            return []
+        index = np.minimum(((data["t"] - start) / width).astype(int), buckets - 1)
+        counts = np.bincount(index, minlength=buckets)
+        up = np.bincount(index, weights=data["ok"], minlength=buckets)
+        timed = data["latency"] >= 0
+        timed_counts = np.bincount(index[timed], minlength=buckets)
+        totals = np.bincount(
+            index[timed], weights=data["latency"][timed], minlength=buckets
+        )
+        peaks = np.zeros(buckets)
+        np.maximum.at(peaks, index[timed], data["latency"][timed])
+        return [
+            Bucket(
+                start + (i + 0.5) * width,
+                int(counts[i]),
+                float(up[i] / counts[i]),
+                float(totals[i] / timed_counts[i]) if timed_counts[i] else None,
+                float(peaks[i]) if timed_counts[i] else None,
+            )
+            for i in np.nonzero(counts)[0].tolist()
+        ]
+
+    def flush(self):
+        if not self.readonly:
+            self._map.flush()
+
+    def close(self):
+        self.flush()
+        self._map.close()
+        self._file.close()
+
+
+def _digest(target):
+    return hashlib.sha1(target.encode()).hexdigest()[:8]
+
+
+def _file_name(target):
+    """Escaped name plus a short hash, so names never share a file.
+
+    The hash also keeps ``Site`` and ``site`` apart on case-insensitive
+    filesystems; ``_target_name`` reverses the escaping.
+    """
+    return f"{quote(target, safe='')}-{_digest(target)}.ts"
+
+
+def _target_name(path):
+    escaped, _, digest = path.stem.rpartition("-")
+    name = unquote(escaped)
+    return name if digest == _digest(name) else path.stem
+
+
+class TimeSeriesStore:
+    """One ``SeriesRing`` per target under a directory."""
+
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY, readonly=False):
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.readonly = readonly
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def ring(self, target):
+        with self._lock:
+            ring = self._rings.get(target)
+            if ring is None:
+                path = self.directory / _file_name(target)
+                if self.readonly and not path.exists():
+                    return None
+                ring = self._rings[target] = SeriesRing(
+                    path, self.capacity, self.readonly
+                )
+            return ring
+
+    def record(self, result, state):
+        """Append one ``ProbeResult`` with the target's current health state."""
+        self.ring(result.target.name).append(
+            result.timestamp,
+            result.latency,
+            result.status_code,
+            STATE_CODES.get(getattr(state, "value", state), 0),
+            result.success,
+        )
+
+    def targets(self):
+        if not self.directory.exists():
+            return []
+        return sorted(_target_name(p) for p in self.directory.glob("*.ts"))
+
+    def window(self, target, start=None, end=None):
+        ring = self.ring(target)
+        return ring.window(start, end) if ring else []
+
+    def downsample(self, target, seconds, buckets=300, now=None):
+        """Latency/uptime buckets for the last ``seconds`` of ``target``."""
+        ring = self.ring(target)
+        if ring is None:
+            return []
+        end = time.time() if now is None else now
+        return ring.downsample(end - seconds, end, buckets)
+
+    def close(self):
+        with self._lock:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings.clear()
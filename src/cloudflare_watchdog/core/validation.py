@@ -0,0 +1,188 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+DEFAULT_MAX_BYTES = 64 * 1024
+CHUNK_SIZE = 8 * 1024
+DRAIN_LIMIT = 64 * 1024  # finish small bodies so the connection is reused
+
+
+def parse_status(spec):
+    """``200``, ``[200, 204]``, ``"2xx"`` or ``"200-299"`` to a frozenset."""
+    if spec is None:
+        return frozenset({200})
+    items = spec if isinstance(spec, (list, tuple)) else [spec]
+    codes = set()
+    for item in items:
+        text = str(item).strip().lower()
+        if re.fullmatch(r"[1-5]xx", text):
+            first = int(text[0]) * 100
+            codes.update(range(first, first + 100))
+        elif re.fullmatch(r"\d{3}-\d{3}", text):
+            low, high = (int(x) for x in text.split("-"))
+            codes.update(range(low, high + 1))
+        elif re.fullmatch(r"\d{3}", text):
+            codes.add(int(text))
+        else:
+            raise ValueError(f"bad status {item!r}; use 200, '2xx' or '200-299'")
+    return frozenset(codes)
+
+
+def _strings(value):
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return tuple(str(v) for v in value)
+
+
+@dataclass(frozen=True)
+class Expectation:
+    """What a healthy response looks like, checked on a streamed body.
+
+    At most ``max_bytes`` of the body are read. Reading stops as soon as
+    every body assertion is settled, so the default check (any non-empty
+    body) costs one chunk however large the page is.
+    """
+
+    status: frozenset = frozenset({200})
+    contains: tuple = ()  # all must appear in the first max_bytes
+    absent: tuple = ()  # none may appear, e.g. "Error 1033"
+    regex: re.Pattern = None
+    sha256: str = None  # of the first max_bytes of the body
+    headers: tuple = ()  # (name, substring or None for "present")
+    max_latency: float = None
+    max_bytes: int = DEFAULT_MAX_BYTES
+    require_body: bool = True
+
+    @classmethod
+    def from_config(cls, data, method="GET"):
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            raise ValueError("expect must be a mapping")
+        regex = data.get("regex")
+        headers = data.get("headers") or {}
+        if not isinstance(headers, dict):
+            raise ValueError("expect.headers must be a mapping")
+        expectation = cls(
+            status=parse_status(data.get("status")),
+            contains=_strings(data.get("contains")),
+            absent=_strings(data.get("absent")),
+            regex=re.compile(regex.encode()) if regex else None,
+            sha256=str(data["sha256"]).lower() if data.get("sha256") else None,
+            headers=tuple(
+                (str(k).lower(), None if v is None else str(v))
+                for k, v in headers.items()
+            ),
+            max_latency=(
+                float(data["max_latency"]) if data.get("max_latency") else None
+            ),
+            max_bytes=int(data.get("max_bytes", DEFAULT_MAX_BYTES)),
+            require_body=bool(data.get("require_body", method != "HEAD")),
+        )
+        if method == "HEAD" and expectation.reads_body:
+            raise ValueError("HEAD probes cannot check the body")
+        if expectation.max_bytes <= 0:
+            raise ValueError("expect.max_bytes must be positive")
+        return expectation
+
+    @property
+    def reads_body(self):
+        return bool(
+            self.require_body
+            or self.contains
+            or self.absent
+            or self.regex
+            or self.sha256
+        )
+
+    def check_head(self, response):
+        """Status and header assertions; None if they pass, else a reason."""
+        if response.status_code not in self.status:
+            return f"unexpected status {response.status_code}"
+        for name, expected in self.headers:
+            value = response.headers.get(name)
+            if value is None:
+                return f"missing header {name}"
+            if expected is not None and expected not in value:
+                return f"header {name} is {value!r}"
+        return None
+
+    def check_body(self, response):
+        """Stream up to ``max_bytes`` and check the body assertions."""
+        wanted = [k.encode() for k in self.contains]
+        unwanted = [k.encode() for k in self.absent]
+        longest = max(map(len, wanted + unwanted), default=1)
+        digest = hashlib.sha256() if self.sha256 else None
+        body = bytearray()
+        scanned = 0  # keyword matches before this offset are already known
+        exhausted = True
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunk = chunk[: self.max_bytes - len(body)]
+            body += chunk
+            if digest:
+                digest.update(chunk)
+            window = bytes(body[max(0, scanned - longest + 1) :])
+            wanted = [k for k in wanted if k not in window]
+            for keyword in unwanted:
+                if keyword in window:
+                    return f"found {keyword.decode()!r}"
+            scanned = len(body)
+            settled = (
+                not wanted
+                and not unwanted
+                and not digest
+                and not self.regex
+                and (body.strip() or not self.require_body)
+            )
+            if settled or len(body) >= self.max_bytes:
+                exhausted = False
+                break
+        limit = f"first {self.max_bytes // 1024} KB"
+        if self.require_body and not body.strip():
+            return "empty body"
+        if wanted:
+            return f"missing {wanted[0].decode()!r} in {limit}"
+        if self.regex and not self.regex.search(body):
+            return f"no match for /{self.regex.pattern.decode()}/ in {limit}"
+        if digest and digest.hexdigest() != self.sha256:
+            return f"content hash changed ({digest.hexdigest()[:12]}…)"
+        if not exhausted:
+            release(response, len(body))
+        return None
+
+    def check_latency(self, latency):
+        if self.max_latency is not None and latency > self.max_latency:
+            return f"slow response ({latency:.2f}s > {self.max_latency:g}s)"
+        return None
+
+    def check(self, response):
+        """Run every response assertion; None if they pass, else a reason.
+
+        The response must have been requested with ``stream=True``.
+        """
+        problem = self.check_head(response)
+        if problem is None and self.reads_body:
+            return self.check_body(response)
+        release(response, 0)
+        return problem
+
+
+def release(response, read):
+    """Drain a small remainder to keep the connection alive, else drop it."""
+    if response.request is not None and response.request.method == "HEAD":
+        remaining = 0
+    else:
+        try:
+            remaining = int(response.headers.get("Content-Length", "")) - read
+        except ValueError:
+            remaining = None
+    if remaining is not None and remaining <= DRAIN_LIMIT:
+        for _ in response.iter_content(CHUNK_SIZE):
+            pass
+    else:
+        response.close()
+
+
+DEFAULT_EXPECTATION = Expectation()
@@ -1,208 +1,509 @@
 import logging
-import os
-import requests
-from datetime import datetime
-from logging.handlers import RotatingFileHandler
-from pathlib import Path
-from winotify import Notification
-
-
-def get_settings_path():
-    if os.name == "nt":
-        base = Path(os.getenv("APPDATA", Path.home())) / "CloudflareWatchdog"
-    else:
-        base = Path.home() / ".config" / "cloudflare-watchdog"
-    base.mkdir(parents=True, exist_ok=True)
-    return base / "settings.json"
-
-
-LOG_PATH = Path(__file__).parent / "watchdog.log"
-logger = logging.getLogger("watchdog")
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(
-    LOG_PATH, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8"
+import threading
+import time
+
+from cloudflare_watchdog.config.settings_loader import SettingsError, SettingsStore
+from cloudflare_watchdog.core.diagnosis import (
+    NETWORK,
+    TUNNEL,
+    Check,
+    Diagnoser,
+    Diagnosis,
+)
+from cloudflare_watchdog.core.executor import ActionStep, RemediationExecutor
+from cloudflare_watchdog.core.fleet import FleetAgent
+from cloudflare_watchdog.core.health import HealthMonitor, HealthState, RestartBudget
+from cloudflare_watchdog.core.journal import JOURNAL_NAME, IncidentJournal
+from cloudflare_watchdog.core.metrics import MetricsServer, WatchdogMetrics
+from cloudflare_watchdog.core.network import NETWORK_TARGET, changes, open_source
+from cloudflare_watchdog.core.probe import ProbeEngine
+from cloudflare_watchdog.core.profiling import (
+    DEFAULT_PROFILE_SECONDS,
+    PhaseTimer,
+    Profiler,
 )
-logger.addHandler(handler)
+from cloudflare_watchdog.core.supervisor import ProcessSupervisor
+from cloudflare_watchdog.core.timeseries import TimeSeriesStore
+from cloudflare_watchdog.utils.logging_utils import get_pipeline, logger
+from cloudflare_watchdog.utils.paths import get_user_config_dir
 
 
 class WatchdogCore:
-    def __init__(self):
-        self.settings_path = get_settings_path()
+    def __init__(self, settings_path=None, pipeline=None):
+        self.pipeline = pipeline or get_pipeline()
+        self.settings_store = SettingsStore(settings_path)
+        self.settings_path = self.settings_store.path
         self.running = False
-        self.settings = self.load_settings()
+        self.probe_engine = ProbeEngine()
+        self.health = HealthMonitor(budget=RestartBudget())
+        self.diagnoser = Diagnoser()
+        self.supervisor = ProcessSupervisor(
+            self.log, state_dir=get_user_config_dir() / "supervisor"
+        )
+        self.executor = RemediationExecutor(self.log, supervisor=self.supervisor)
+        self.history = TimeSeriesStore(get_user_config_dir() / "history")
+        self.journal = IncidentJournal(get_user_config_dir() / JOURNAL_NAME, self.log)
+        self.metrics = WatchdogMetrics()
+        self.timings = PhaseTimer(histogram=self.metrics.phase_duration)
+        self.pipeline.timings = self.timings
+        self.profiler = Profiler(
+            get_user_config_dir() / "profiles", self.log, self.timings
+        )
+        self.metrics_server = None
+        self.fleet = None
+        self.network = None
+        self._network_config = None
+        self._network_status = None
+        self._last_results = {}
+        self.executor.listeners.append(self.metrics.record_command)
+        self.executor.listeners.append(self._time_command)
+        self.executor.run_listeners.append(self._time_run)
+        self.executor.run_listeners.append(self._remediation_finished)
+        self.executor.run_listeners.append(self.journal.record_run)
+        self._wake = threading.Event()
+        # Probe results (loop thread) and network events (source thread) both
+        # drive the health monitor; each transition is handled under this lock.
+        self._state_lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        try:
+            self.settings_store.reload()
+        except SettingsError as e:
+            logger.error(f"Failed to load settings: {e}")
+        self.apply_settings()
+
+    @property
+    def settings(self):
+        return self.settings_store.current
+
+    def save_settings(self, data):
+        """Validate, persist and apply a new raw settings mapping."""
+        self.settings_store.save(data)
+        self.apply_settings()
+
+    def apply_settings(self):
+        """Push the current settings into the probe engine and health monitor.
 
-    def load_settings(self):
-        if self.settings_path.exists():
+        Control clients call this from their own threads, so one apply runs
+        at a time, and the targets and health monitor change under the
+        state lock. The network source is restarted outside it: its thread
+        may be waiting for that lock.
+        """
+        with self._apply_lock:
+            with self._state_lock:
+                self.probe_engine.scheduler.configure(
+                    self.settings.confirm_interval,
+                    self.settings.max_backoff,
+                    self.settings.probe_jitter,
+                )
+                self.probe_engine.set_targets(self.settings.targets)
+                self.diagnoser.configure(
+                    self.settings.anchors, self.settings.diagnosis_timeout
+                )
+                self.apply_health_settings()
+            self.apply_metrics_settings()
+            self.apply_fleet_settings()
+            self.apply_network_settings()
+
+    def apply_metrics_settings(self):
+        """Start, move or stop the /metrics endpoint to match the settings."""
+        host, port = self.settings.metrics_host, self.settings.metrics_port
+        server = self.metrics_server
+        if server and (not port or (server.host, server.port) != (host, port)):
+            server.stop()
+            self.metrics_server = server = None
+        if port and server is None:
             try:
-                with open(self.settings_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load settings: {e}")
-        defaults = {
-            "target_url": "https://example.com",
-            "check_interval": 30,
-            "retries": 3,
-        }
-        self.save_settings(defaults)
-        return defaults
-
-    def save_settings(self, data=None):
-        data = data or self.settings
-        try:
-            with open(self.settings_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to save settings: {e}")
-
-    def log(self, msg):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] {msg}")
-        logger.info(msg)
-        try:
-            toast = Notification(
-                app_id="Cloudflare Watchdog", title="Cloudflare Watchdog", msg=msg
+                self.metrics_server = MetricsServer(self.metrics, host, port).start()
+                self.log(f"📈 Metrics available at http://{host}:{port}/metrics")
+            except OSError as e:
+                self.log(f"❌ Could not start metrics endpoint: {e}", logging.ERROR)
+
+    def apply_fleet_settings(self):
+        """Start, replace or stop the fleet agent to match the settings."""
+        s = self.settings
+        wanted = None
+        if s.fleet_controller:
+            wanted = (
+                s.fleet_controller,
+                s.fleet_agent_id,
+                s.fleet_interval,
+                s.fleet_token,
+            )
+        agent = self.fleet
+        if agent is not None and wanted != agent.config:
+            agent.stop()
+            self.fleet = agent = None
+        if wanted and agent is None:
+            self.fleet = FleetAgent(
+                s.fleet_controller,
+                self.fleet_snapshot,
+                agent_id=s.fleet_agent_id,
+                interval=s.fleet_interval,
+                token=s.fleet_token,
+                buffer_path=get_user_config_dir() / "fleet-buffer.jsonl",
+                log=self.log,
             )
-            toast.show()
-        except Exception:
-            pass
+            if self.running:
+                self.fleet.start()
+
+    def apply_network_settings(self):
+        """Start, replace or stop the network event source to match the settings.
+
+        The source only runs while the monitor loop does.
+        """
+        s = self.settings
+        wanted = None
+        if s.network_source != "off":
+            wanted = (s.network_source, s.network_poll_interval, s.wifi_network)
+        if self.network is not None and wanted != self._network_config:
+            self.network.stop()
+            self.network = None
+        self._network_config = wanted
+        if wanted and self.network is None and self.running:
+            self.network = open_source(
+                s.network_source,
+                self._network_changed,
+                want_ssid=bool(s.wifi_network),
+                interval=s.network_poll_interval,
+                log=self.log,
+            )
+            self.log(f"📶 Watching network changes ({self.network.kind}).")
+
+    def _network_changed(self, status):
+        """Feed a network status from the event source into the health monitor.
+
+        Runs on the source's thread, so a lost link reaches ``on_wifi_fail``
+        without waiting for probes to time out. Any change also re-probes
+        every target straight away.
+        """
+        with self._state_lock:
+            previous, self._network_status = self._network_status, status
+            for change in changes(previous, status):
+                self.log(f"📶 {change}", notify=False, target=NETWORK_TARGET)
+            wanted = self.settings.wifi_network
+            ok = status.up
+            detail = status.describe()
+            if ok and wanted and status.ssid and status.ssid != wanted:
+                ok, detail = False, f"on {status.ssid}, expected {wanted}"
+            transition = self.health.observe(NETWORK_TARGET, ok, conclusive=True)
+            if transition:
+                diagnosis = None
+                if not ok:
+                    check = Check("link", False, detail, 0.0)
+                    diagnosis = Diagnosis(NETWORK, (check,), kind="network")
+                self._publish(transition, diagnosis)
+                self.handle_transition(transition, diagnosis)
+        if previous is not None:
+            self.probe_engine.scheduler.expedite(
+                [t.name for t in self.probe_engine.targets]
+            )
+            self._wake.set()
+
+    def fleet_snapshot(self):
+        """Current state of every target, for fleet heartbeats."""
+        snapshot = {}
+        for name, health in list(self.health.targets.items()):
+            result = self._last_results.get(name)
+            snapshot[name] = {
+                "state": health.state.value,
+                "since": health.since,
+                "ok": None if result is None else result.success,
+                "latency": None if result is None else result.latency,
+                "message": None if result is None else result.message,
+            }
+        status = self._network_status
+        if NETWORK_TARGET in snapshot and status is not None:
+            snapshot[NETWORK_TARGET].update(ok=status.up, message=status.describe())
+        return snapshot
+
+    def apply_health_settings(self):
+        """Push thresholds and restart budget from settings into the monitor."""
+        self.health.configure(
+            failure_threshold=self.settings.failure_threshold,
+            recovery_threshold=self.settings.recovery_threshold,
+            budget_kwargs={
+                "max_restarts": self.settings.restart_budget,
+                "window": self.settings.restart_window,
+                "cooldown": self.settings.restart_cooldown,
+            },
+        )
+        keep = self.monitored_targets()
+        self.health.forget(keep)
+        self.metrics.forget_targets(keep)
+        if self.running:
+            self.journal.record_monitoring(keep)
+
+    def monitored_targets(self):
+        """Names the health monitor tracks: every target, plus the link."""
+        names = {t.name for t in self.probe_engine.targets}
+        if self.settings.network_source != "off":
+            names.add(NETWORK_TARGET)
+        return names
+
+    def log(self, msg, level=logging.INFO, notify=None, **fields):
+        """Queue a message for the background log writer; never blocks."""
+        self.pipeline.emit(msg, level, source="core", notify=notify, **fields)
 
     def start(self, log_callback=None):
+        """Run the monitor loop until ``stop()``.
+
+        ``log_callback(msg)``, if given, is called from the log writer thread
+        for every message; GUIs should marshal it onto their own thread.
+        """
+        subscriber = None
+        if log_callback is not None:
+            subscriber = self.pipeline.subscribe(lambda e: log_callback(e.message))
         self.running = True
+        self._wake.clear()
+        self.journal.start()
+        if self.fleet is not None:
+            self.fleet.start()
         self.log("🔍 Starting watchdog monitor loop...")
+        try:
+            self.journal.record_monitoring(self.monitored_targets())
+            with self._apply_lock:
+                self.apply_network_settings()
+            self._loop()
+        finally:
+            self.profiler.flush()
+            self.journal.record_monitoring(())
+            with self._apply_lock:
+                if self.network is not None:
+                    self.network.stop()
+                    self.network = None
+            if subscriber is not None:
+                self.pipeline.unsubscribe(subscriber)
+
+    def _loop(self):
+        span = self.timings.span
         while self.running:
+            started = time.perf_counter()
+            idle = 0.0  # the wait for the next probe is not part of a pass
             try:
-                self.settings = self.load_settings()
-                url = self.settings.get("target_url", "https://example.com")
-                # Removed unused variables: retries and interval
-
-                msg = None  # Predefine message to avoid unbound errors
-                try:
-                    r = requests.get(url, timeout=5)
-                    if r.status_code == 200 and r.text.strip():
-                        msg = f"✅ Site online: {url}"
-                        success = True
-                    else:
-                        msg = f"⚠️ Site reachable but not responding correctly (status {r.status_code})"
-                        success = False
-                except requests.ConnectionError:
-                    msg = f"❌ Connection failed: {url}"
-                    success = False
-                except requests.Timeout:
-                    msg = f"⏱️ Connection timed out: {url}"
-                    success = False
-                except Exception as e:
-                    msg = f"❌ Unexpected error: {e}"
-                    success = False
-
-                import subprocess, platform
-
-                def run_commands(command_list, label):
-                    for raw in command_list:
-                        if not raw.strip():
-                            continue
-                        commands = [
-                            c.strip()
-                            for c in raw.replace(";", "\n").splitlines()
-                            if c.strip()
-                        ]
-                        for command in commands:
-                            self.log(f"🔁 Running {label} command: {command}")
-                            try:
-                                long_running = any(
-                                    keyword in command.lower()
-                                    for keyword in [
-                                        "cloudflared tunnel run",
-                                        "pm2 start",
-                                        "node",
-                                        "npm run",
-                                        "python",
-                                    ]
-                                )
-
-                                if platform.system() == "Windows":
-                                    if long_running:
-                                        subprocess.Popen(
-                                            [
-                                                "powershell",
-                                                "-NoProfile",
-                                                "-ExecutionPolicy",
-                                                "Bypass",
-                                                "-Command",
-                                                f"& {{ {command} }}",
-                                            ],
-                                            stdout=subprocess.DEVNULL,
-                                            stderr=subprocess.DEVNULL,
-                                            shell=True,
-                                        )
-                                        self.log(
-                                            f"🚀 Background process started: {command}"
-                                        )
-                                        continue
-
-                                    completed = subprocess.run(
-                                        [
-                                            "powershell",
-                                            "-NoProfile",
-                                            "-ExecutionPolicy",
-                                            "Bypass",
-                                            "-Command",
-                                            f"& {{ {command} }}",
-                                        ],
-                                        capture_output=True,
-                                        text=True,
-                                        encoding="utf-8",
-                                        timeout=15,
-                                    )
-                                else:
-                                    if long_running:
-                                        subprocess.Popen(
-                                            ["/bin/bash", "-c", command],
-                                            stdout=subprocess.DEVNULL,
-                                            stderr=subprocess.DEVNULL,
-                                        )
-                                        self.log(
-                                            f"🚀 Background process started: {command}"
-                                        )
-                                        continue
-
-                                    completed = subprocess.run(
-                                        ["/bin/bash", "-c", command],
-                                        capture_output=True,
-                                        text=True,
-                                        encoding="utf-8",
-                                        timeout=15,
-                                    )
-
-                                if completed.returncode == 0:
-                                    self.log(f"✅ Command succeeded: {command}")
-                                    if completed.stdout:
-                                        self.log(completed.stdout.strip())
-                                else:
-                                    self.log(
-                                        f"❌ Command failed ({command}) → Exit {completed.returncode}"
-                                    )
-                                    if completed.stderr:
-                                        self.log(completed.stderr.strip())
-                            except subprocess.TimeoutExpired:
-                                self.log(f"⚠️ Command timed out after 15s: {command}")
-                            except Exception as e:
-                                self.log(f"💥 Command error ({command}): {e}")
-
-                run_commands(self.settings.get("on_site_fail", []), "on-site-fail")
-                run_commands(self.settings.get("on_wifi_fail", []), "on-wifi-fail")
-                run_commands(self.settings.get("on_recovery", []), "on-recovery")
+                self.profiler.poll()
+                with span("settings"):
+                    if self.settings_store.check():
+                        self.apply_settings()
+                        self.log("🔄 Settings changed on disk, reloaded.")
+
+                with span("probe"):
+                    results = self.probe_engine.run_due()
+                if not results:
+                    wait = self.probe_engine.seconds_until_due()
+                    if self.profiler.deadline is not None:
+                        wait = min(wait, self.profiler.deadline - time.monotonic())
+                    waited = time.perf_counter()
+                    if self._wake.wait(max(0.0, wait)):
+                        self._wake.clear()
+                    idle = time.perf_counter() - waited
+                    continue
+                with span("diagnose"):
+                    diagnoses = iter(
+                        self.diagnoser.diagnose_all(
+                            [r for r in results if not r.success]
+                        )
+                    )
+                for result in results:
+                    with span("record"):
+                        self.metrics.record_probe(result)
+                        self._last_results[result.target.name] = result
+                        self.log(
+                            result.message,
+                            logging.INFO if result.success else logging.WARNING,
+                            notify=False,
+                            target=result.target.name,
+                        )
+                    diagnosis = None if result.success else next(diagnoses)
+                    with self._state_lock:
+                        with span("health"):
+                            transition = self.health.observe(
+                                result.target.name,
+                                result.success,
+                                conclusive=bool(
+                                    diagnosis
+                                    and diagnosis.conclusive
+                                    and self.settings.fast_path
+                                ),
+                            )
+                            state = self.health.state(result.target.name)
+                            self.probe_engine.scheduler.reschedule(
+                                result.target, state
+                            )
+                        with span("history"):
+                            self.history.record(result, state)
+                        if transition:
+                            self._publish(transition, diagnosis)
+                            with span("transition"):
+                                self.handle_transition(transition, diagnosis)
 
+            except SettingsError as e:
+                self.log(f"⚠️ Keeping previous settings: {e}", logging.ERROR)
             except Exception as e:
-                self.log(f"❌ Watchdog encountered an error: {e}")
+                self.log(f"❌ Watchdog encountered an error: {e}", logging.ERROR)
+            finally:
+                self.metrics.loop_duration.observe(
+                    time.perf_counter() - started - idle
+                )
+
+    def _publish(self, transition, diagnosis=None):
+        """Hand a transition to metrics, the journal and the fleet agent."""
+        with self.timings.span("publish"):
+            self.metrics.record_transition(transition, HealthState)
+            self.journal.record_transition(transition, diagnosis)
+            if self.fleet is not None:
+                self.fleet.record_transition(transition, diagnosis)
+
+    def request_profile(self, seconds=DEFAULT_PROFILE_SECONDS, mode="cprofile"):
+        """Profile the next ``seconds`` of the loop; safe from signal handlers."""
+        self.profiler.request(seconds, mode)
+        self._wake.set()
+
+    def _time_command(self, label, result):
+        self.timings.observe(f"command.{label}", result.duration)
+
+    def _time_run(self, run):
+        if run.finished is not None:
+            self.timings.observe(f"remediation.{run.label}", run.finished - run.started)
+
+    def tunnel_restart_steps(self):
+        """Restart steps for every cloudflared process the supervisor owns."""
+        return tuple(
+            ActionStep(
+                f"tunnel-restart[{i}]",
+                process["command"],
+                timeout=self.settings.command_timeout,
+                restart=True,
+            )
+            for i, process in enumerate(
+                p for p in self.supervisor.status() if "cloudflared" in p["command"]
+            )
+        )
+
+    def _remediation_finished(self, run):
+        """Re-check down targets soon after a remediation round completes."""
+        down = [
+            name
+            for name, health in list(self.health.targets.items())
+            if health.state is HealthState.DOWN
+        ]
+        if down:
+            self.probe_engine.scheduler.expedite(down)
+            self._wake.set()
+
+    def remediation_for(self, diagnosis):
+        """(steps, label) of the single action list a diagnosis calls for.
+
+        Tunnel failures use ``on_tunnel_fail``, else restart the supervised
+        cloudflared. Only plain HTTP targets fall back to ``on_site_fail``;
+        a failing cloudflared target never restarts the apps behind it.
+        """
+        verdict = diagnosis.verdict if diagnosis else None
+        if verdict == NETWORK:
+            return self.settings.on_wifi_fail, "on-wifi-fail"
+        if verdict == TUNNEL:
+            steps = self.settings.on_tunnel_fail or self.tunnel_restart_steps()
+            if steps or diagnosis.kind == "cloudflared":
+                return steps, "on-tunnel-fail"
+        return self.settings.on_site_fail, "on-site-fail"
+
+    def handle_transition(self, transition, diagnosis=None):
+        """Fire the action list that matches a health state change."""
+        if transition.previous is not transition.current:
+            self.log(
+                f"🔀 {transition.target}: "
+                f"{transition.previous.value} → {transition.current.value}",
+                logging.ERROR if transition.action == "down" else logging.INFO,
+                notify=transition.action in ("down", "recovery"),
+                target=transition.target,
+            )
+        context = {"target": transition.target, "trigger": transition.action}
+        if transition.action == "recovery":
+            # A returning link only re-probes; the targets behind it fire
+            # on_recovery themselves once they pass.
+            if transition.target != NETWORK_TARGET:
+                self.run_commands(self.settings.on_recovery, "on-recovery", context)
+            return
+        if transition.action not in ("down", "retry"):
+            return
+        steps, label = self.remediation_for(diagnosis)
+        if diagnosis is not None:
+            self.log(
+                f"🩺 {transition.target}: {diagnosis.verdict} → {label} "
+                f"[{diagnosis.summary()}]",
+                notify=False,
+                target=transition.target,
+            )
+        if (
+            transition.action == "down"
+            and diagnosis is not None
+            and diagnosis.verdict == NETWORK
+            and transition.target != NETWORK_TARGET
+            and self.health.state(NETWORK_TARGET) is HealthState.DOWN
+        ):
+            return  # the link event already ran on_wifi_fail
+        budget = self.health.budget_for(label)
+        if not budget.allow():
+            if transition.action == "down":
+                self.log(
+                    f"🧯 Remediation for {transition.target} skipped: "
+                    f"{label} budget exhausted or cooling down.",
+                    logging.WARNING,
+                )
+            return
+        if diagnosis is not None:
+            context["verdict"] = diagnosis.verdict
+        if self.run_commands(steps, label, context):
+            budget.record()
+
+    def run_commands(self, steps, label, context=None):
+        """Hand an action list to the executor without blocking the probe loop."""
+        if not steps:
+            return None
+        with self.timings.span("submit"):
+            run = self.executor.submit(steps, label, context)
+        if run is None:
+            self.log(
+                f"⏳ {label} actions still running, not starting another round.",
+                logging.WARNING,
+                notify=False,
+            )
+        return run
 
         # --- Control Methods ---
 
     def stop(self):
         """Stop the watchdog loop."""
-        self.running = False
-        self.log("🛑 Watchdog stopped.")
+        was_running, self.running = self.running, False
+        self._wake.set()
+        if was_running:
+            self.log("🛑 Watchdog stopped.")
+
+    def shutdown(self, stop_processes=True):
+        """Stop the loop and, unless told otherwise, every supervised process.
+
+        The headless daemon passes ``stop_processes=False`` so a service
+        restart leaves the tunnel up; the next start adopts it by pidfile.
+        """
+        self.stop()
+        if stop_processes:
+            self.supervisor.stop_all()
+        self.executor.shutdown()
+        self.history.close()
+        self.journal.close()
+        if self.fleet is not None:
+            self.fleet.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+
+    def process_status(self):
+        return self.supervisor.status()
 
     def reload_settings(self):
-        """Reload settings from disk."""
-        self.settings = self.load_settings()
+        """Reload settings from disk, even if the file looks unchanged."""
+        try:
+            self.settings_store.reload()
+        except SettingsError as e:
+            self.log(f"⚠️ Keeping previous settings: {e}", logging.ERROR)
+            return
+        self.apply_settings()
         self.log("🔄 Settings reloaded.")
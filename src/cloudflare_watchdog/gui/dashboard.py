@@ -0,0 +1,143 @@
+import time
+
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+from matplotlib.figure import Figure
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QVBoxLayout, QWidget
+
+WINDOWS = {
+    "1 hour": 3600,
+    "24 hours": 86400,
+    "7 days": 7 * 86400,
+    "30 days": 30 * 86400,
+}
+BUCKETS = 300
+REFRESH_MS = 5000
+HEADROOM = 0.1  # fraction of the window kept free on the right of "now"
+
+
+def _days(timestamp):
+    """Epoch seconds to matplotlib date numbers."""
+    return timestamp / 86400.0
+
+
+class DashboardView(QWidget):
+    """Latency and uptime per target, read from the ``TimeSeriesStore``.
+
+    Every refresh reads one downsampled window (``BUCKETS`` points per
+    target, whatever the span) and redraws only the data lines by
+    blitting them over a cached background. The axes, grid and legend are
+    re-rendered only when a new target appears, the window is changed, the
+    latency scale overflows, or time runs past the right edge.
+    """
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.seconds = WINDOWS["1 hour"]
+        self.lines = {}
+        self._background = None
+        self._xmax = 0
+        self._ymax = 0
+
+        self.figure = Figure(figsize=(5, 3))
+        self.canvas = FigureCanvas(self.figure)
+        self.latency_ax, self.uptime_ax = self.figure.subplots(2, 1, sharex=True)
+        self.latency_ax.set_ylabel("Latency (ms)")
+        self.uptime_ax.set_ylabel("Uptime (%)")
+        self.uptime_ax.set_ylim(-5, 105)
+        locator = AutoDateLocator(maxticks=6)
+        self.uptime_ax.xaxis.set_major_locator(locator)
+        self.uptime_ax.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+        for ax in (self.latency_ax, self.uptime_ax):
+            ax.grid(True, alpha=0.3)
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+        self.window_box = QComboBox(self)
+        self.window_box.addItems(WINDOWS)
+        self.window_box.currentTextChanged.connect(self.set_window)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Window"))
+        controls.addWidget(self.window_box)
+        controls.addStretch()
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.canvas)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def set_window(self, name):
+        self.seconds = WINDOWS.get(name, self.seconds)
+        self._xmax = 0
+        self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def _on_draw(self, _event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for latency_line, uptime_line in self.lines.values():
+            self.latency_ax.draw_artist(latency_line)
+            self.uptime_ax.draw_artist(uptime_line)
+
+    def _line_pair(self, target):
+        pair = self.lines.get(target)
+        if pair is None:
+            (latency_line,) = self.latency_ax.plot(
+                [], [], label=target, animated=True
+            )
+            (uptime_line,) = self.uptime_ax.plot(
+                [], [], color=latency_line.get_color(), animated=True
+            )
+            pair = self.lines[target] = (latency_line, uptime_line)
+            self.latency_ax.legend(loc="upper left", fontsize="small")
+        return pair
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        now = time.time()
+        full_redraw = False
+        ymax = self._ymax
+        for target in self.store.targets():
+            if target not in self.lines:
+                full_redraw = True
+            latency_line, uptime_line = self._line_pair(target)
+            buckets = self.store.downsample(target, self.seconds, BUCKETS, now)
+            xs = [_days(b.timestamp) for b in buckets]
+            latencies = [
+                float("nan") if b.mean_latency is None else b.mean_latency * 1000
+                for b in buckets
+            ]
+            latency_line.set_data(xs, latencies)
+            uptime_line.set_data(xs, [b.uptime * 100 for b in buckets])
+            peak = max((v for v in latencies if v == v), default=0)
+            ymax = max(ymax, peak)
+
+        if now >= self._xmax:
+            self._xmax = now + self.seconds * HEADROOM
+            self.uptime_ax.set_xlim(
+                _days(self._xmax - self.seconds * (1 + HEADROOM)), _days(self._xmax)
+            )
+            full_redraw = True
+        if ymax > self._ymax:
+            self._ymax = ymax * 1.25 or 1
+            self.latency_ax.set_ylim(0, self._ymax)
+            full_redraw = True
+
+        if full_redraw or self._background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_lines()
+        self.canvas.blit(self.figure.bbox)
@@ -0,0 +1,124 @@
+import logging
+from collections import deque
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtWidgets import (
+    QComboBox,
+    QHBoxLayout,
+    QLabel,
+    QPlainTextEdit,
+    QVBoxLayout,
+    QWidget,
+)
+
+FEED_CAPACITY = 5000
+PENDING_CAPACITY = 10000
+FLUSH_MS = 250
+
+SEVERITIES = {
+    "All": logging.NOTSET,
+    "Info": logging.INFO,
+    "Warnings": logging.WARNING,
+    "Errors": logging.ERROR,
+}
+
+
+class EventBridge(QObject):
+    """Carry pipeline events from a background thread into the GUI thread.
+
+    The source (a ``LogPipeline``, or the daemon's ``EventStream``) calls
+    ``push`` from its own thread; that only appends to a bounded deque (an
+    atomic operation, no Qt calls). A ``QTimer`` living in the GUI thread
+    drains the deque every ``FLUSH_MS`` and emits one
+    ``batch`` signal per tick, however many events arrived in between.
+    """
+
+    batch = pyqtSignal(list)
+
+    def __init__(self, pipeline, parent=None):
+        super().__init__(parent)
+        self.pipeline = pipeline
+        self.dropped = 0
+        self._pending = deque(maxlen=PENDING_CAPACITY)
+        self._timer = QTimer(self)
+        self._timer.setInterval(FLUSH_MS)
+        self._timer.timeout.connect(self.flush)
+        pipeline.subscribe(self.push)
+        self._timer.start()
+
+    def push(self, event):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(event)
+
+    def flush(self):
+        events = []
+        while self._pending:
+            events.append(self._pending.popleft())
+        if events:
+            self.batch.emit(events)
+
+    def close(self):
+        self._timer.stop()
+        self.pipeline.unsubscribe(self.push)
+
+
+class EventLogView(QWidget):
+    """Fixed-capacity, severity-filtered view of the event feed.
+
+    Both the backing buffer and the ``QPlainTextEdit`` are capped at
+    ``capacity`` entries, so memory and repaint cost stay flat no matter
+    how long the window has been open.
+    """
+
+    def __init__(self, capacity=FEED_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.events = deque(maxlen=capacity)
+        self.min_level = logging.NOTSET
+
+        self.text = QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setMaximumBlockCount(capacity)
+        self.text.setUndoRedoEnabled(False)
+
+        self.filter_box = QComboBox(self)
+        self.filter_box.addItems(SEVERITIES)
+        self.filter_box.currentTextChanged.connect(self.set_filter)
+
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(QLabel("Show"))
+        filter_row.addWidget(self.filter_box)
+        filter_row.addStretch()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filter_row)
+        layout.addWidget(self.text)
+
+    @staticmethod
+    def _line(event):
+        return event.format()
+
+    def _visible(self, event):
+        return event.level >= self.min_level
+
+    def append_events(self, events):
+        self.events.extend(events)
+        lines = [self._line(e) for e in events[-self.capacity :] if self._visible(e)]
+        if not lines:
+            return
+        scrollbar = self.text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        self.text.appendPlainText("\n".join(lines))
+        if at_bottom:
+            self.text.moveCursor(QTextCursor.MoveOperation.End)
+            scrollbar.setValue(scrollbar.maximum())
+
+    def set_filter(self, name):
+        self.min_level = SEVERITIES.get(name, logging.NOTSET)
+        self.text.setPlainText(
+            "\n".join(self._line(e) for e in self.events if self._visible(e))
+        )
+        self.text.moveCursor(QTextCursor.MoveOperation.End)
@@ -0,0 +1,109 @@
+import threading
+import time
+from datetime import datetime
+
+from PyQt6.QtCore import QTimer, pyqtSignal
+from PyQt6.QtWidgets import (
+    QHeaderView,
+    QLabel,
+    QPlainTextEdit,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from cloudflare_watchdog.core.fleet import fetch_view
+
+REFRESH_MS = 5000
+EVENTS_SHOWN = 200
+COLUMNS = ("Agent", "Last seen", "Targets", "Down")
+
+
+class FleetView(QWidget):
+    """Agents and recent transitions from a fleet controller.
+
+    The controller is polled from a short-lived worker thread every
+    ``REFRESH_MS`` while the tab is visible; the result comes back through
+    a signal, so a slow or unreachable controller never blocks the GUI.
+    """
+
+    loaded = pyqtSignal(object)
+
+    def __init__(self, settings_source, parent=None):
+        super().__init__(parent)
+        self.settings_source = settings_source  # () -> Settings
+        self._busy = False
+
+        self.summary = QLabel("No fleet controller configured.")
+        self.table = QTableWidget(0, len(COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Stretch
+        )
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.events = QPlainTextEdit(self)
+        self.events.setReadOnly(True)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.summary)
+        layout.addWidget(self.table, 2)
+        layout.addWidget(QLabel("Recent transitions"))
+        layout.addWidget(self.events, 1)
+
+        self.loaded.connect(self.render)
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        settings = self.settings_source()
+        if not self.isVisible() or self._busy or not settings.fleet_controller:
+            return
+        self._busy = True
+
+        def work():
+            try:
+                view = fetch_view(
+                    settings.fleet_controller, settings.fleet_token, EVENTS_SHOWN
+                )
+            except Exception as e:
+                view = e
+            self.loaded.emit(view)
+
+        threading.Thread(target=work, name="fleet-view", daemon=True).start()
+
+    def render(self, view):
+        self._busy = False
+        if isinstance(view, Exception):
+            self.summary.setText(f"⚠️ Fleet controller unreachable: {view}")
+            return
+        s = view["summary"]
+        self.summary.setText(
+            f"{s['agents']} agents ({s['stale']} stale) · "
+            f"{s['targets']} targets · {s['down']} down"
+        )
+        self.table.setRowCount(len(view["agents"]))
+        for row, agent in enumerate(view["agents"]):
+            mark = "⚪" if agent["stale"] else "🔴" if agent["down"] else "🟢"
+            cells = (
+                f"{mark} {agent['id']}",
+                f"{agent['age']:.0f}s ago",
+                str(len(agent["targets"])),
+                ", ".join(agent["down"]) or "-",
+            )
+            for column, text in enumerate(cells):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+        lines = []
+        for event in reversed(view["events"]):
+            stamp = datetime.fromtimestamp(event.get("ts", time.time()))
+            lines.append(
+                f"{stamp:%Y-%m-%d %H:%M:%S}  {event['agent']}/{event['target']}: "
+                f"{event['from']} → {event['to']}"
+            )
+        self.events.setPlainText("\n".join(lines))
@@ -1,11 +1,10 @@
-import json
 import sys
-from PyQt6.QtCore import Qt
+import threading
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
-    QTextEdit,
     QPushButton,
     QVBoxLayout,
     QHBoxLayout,
@@ -18,12 +17,48 @@ from PyQt6.QtWidgets import (
 )
 import os
 
-from cloudflare_watchdog.core.watchdog import WatchdogCore
+from cloudflare_watchdog.config.settings_loader import compile_settings, load_settings
+from cloudflare_watchdog.core.control import (
+    ControlClient,
+    ControlError,
+    EventStream,
+    spawn_daemon,
+)
+from cloudflare_watchdog.core.timeseries import TimeSeriesStore
+from cloudflare_watchdog.gui.dashboard import DashboardView
+from cloudflare_watchdog.gui.event_feed import EventBridge, EventLogView
+from cloudflare_watchdog.gui.fleet_view import FleetView
+from cloudflare_watchdog.utils.logging_utils import LogEvent, get_log_path
+from cloudflare_watchdog.utils.paths import get_user_config_dir
+
+STATUS_MS = 2000
 
 
 class WatchdogGUI(QMainWindow):
+    """Thin client for the watchdog daemon.
+
+    Monitoring runs in a separate ``cloudflare_watchdog run`` process, which
+    is started here if none is running and keeps going when the window is
+    closed. Commands and settings go over the control socket, the event
+    feed is streamed from it, and the Dashboard reads the daemon's history
+    files directly. Status is polled from a worker thread with its own
+    connection, so a busy or hung daemon never blocks the event loop.
+    """
+
+    status_loaded = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
+        self.client = ControlClient()
+        self.status_client = ControlClient()
+        self.status = {}
+        self._status_busy = False
+        if not self.client.available():
+            try:
+                spawn_daemon()
+            except ControlError as e:
+                print(f"⚠️ {e}")
+        self.settings = self.fetch_settings()
         icon_path = os.path.join(os.path.dirname(__file__), "icon.ico")
         # Load icon
         base_path = (
@@ -39,13 +74,14 @@ class WatchdogGUI(QMainWindow):
         self.tabs = QTabWidget()
         self.monitor_tab = QWidget()
         self.dashboard_tab = QWidget()
+        self.fleet_tab = QWidget()
         self.tabs.addTab(self.monitor_tab, "Monitor")
         self.tabs.addTab(self.dashboard_tab, "Dashboard")
+        self.tabs.addTab(self.fleet_tab, "Fleet")
 
         # --- Monitor Tab Layout ---
         self.status_label = QLabel("Status: Idle")
-        self.text_area = QTextEdit(self)
-        self.text_area.setReadOnly(True)
+        self.text_area = EventLogView(parent=self)
         self.start_btn = QPushButton("Start")
         self.stop_btn = QPushButton("Stop")
         self.viewlog_btn = QPushButton("View Log")
@@ -65,28 +101,31 @@ class WatchdogGUI(QMainWindow):
         self.monitor_tab.setLayout(monitor_layout)
 
         # --- Dashboard Tab Layout ---
-        from matplotlib.figure import Figure
-        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-
-        self.figure = Figure(figsize=(5, 3))
-        self.canvas = FigureCanvas(self.figure)
+        history = get_user_config_dir() / "history"
+        self.history = TimeSeriesStore(history, readonly=True)
+        self.dashboard = DashboardView(self.history, self)
 
         dash_layout = QVBoxLayout()
-        dash_layout.addWidget(self.canvas)
-
-        save_button = QPushButton("Save")
-        cancel_button = QPushButton("Cancel")
-        button_layout = QHBoxLayout()
-        button_layout.addWidget(save_button)
-        button_layout.addWidget(cancel_button)
-        dash_layout.addLayout(button_layout)
-
+        dash_layout.addWidget(self.dashboard)
         self.dashboard_tab.setLayout(dash_layout)
 
+        # --- Fleet Tab Layout ---
+        self.fleet_view = FleetView(lambda: self.settings, self)
+        fleet_layout = QVBoxLayout()
+        fleet_layout.addWidget(self.fleet_view)
+        self.fleet_tab.setLayout(fleet_layout)
+
         # --- Final Assembly ---
         self.setCentralWidget(self.tabs)
-        self.core = WatchdogCore()
-        self.thread = None
+        self.stream = EventStream()
+        self.event_bridge = EventBridge(self.stream, self)
+        self.event_bridge.batch.connect(self.on_events)
+        self.stream.start()
+        self.status_loaded.connect(self.on_status)
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(STATUS_MS)
+        self.status_timer.timeout.connect(self.refresh_status)
+        self.status_timer.start()
 
         # --- System Tray Icon with Fallback ---
         icon_path = os.path.join(base_path, "cloudflare_watchdog_logo.png")
@@ -105,6 +144,7 @@ class WatchdogGUI(QMainWindow):
         tray_menu.addAction("Stop", self.stop_watchdog)
         tray_menu.addAction("Settings", self.open_settings)
         tray_menu.addAction("View Log", self.view_log)
+        tray_menu.addAction("Profile 30 s", self.profile_watchdog)
         tray_menu.addAction("Restore", self.showNormal)
         tray_menu.addAction("Exit", QApplication.quit)
         self.tray.setContextMenu(tray_menu)
@@ -115,31 +155,95 @@ class WatchdogGUI(QMainWindow):
         self.stop_btn.clicked.connect(self.stop_watchdog)
         self.viewlog_btn.clicked.connect(self.view_log)
         self.settings_btn.clicked.connect(self.open_settings)
+        self.show_status()
+        self.refresh_status()
+
+    def on_events(self, events):
+        """Render a coalesced batch of pipeline events (GUI thread only)."""
+        self.text_area.append_events(events)
+        self.tray.setToolTip(f"Cloudflare Watchdog – {events[-1].message[:60]}")
 
     def log_message(self, msg: str):
-        self.text_area.append(msg)
-        self.text_area.ensureCursorVisible()
-        self.tray.setToolTip(f"Cloudflare Watchdog – {msg[:60]}")
+        """Show a GUI-side message in the feed; it is not sent to the daemon."""
+        self.event_bridge.push(LogEvent(msg, source="gui"))
+
+    def command(self, cmd, **args):
+        """Send one control request; errors are shown in the feed."""
+        try:
+            self.status = self.client.request(cmd, **args) or self.status
+        except ControlError as e:
+            self.log_message(f"❌ {e}")
+            return False
+        self.show_status()
+        return True
+
+    def refresh_status(self):
+        """Ask for status off the GUI thread; skip the tick if one is pending."""
+        if self._status_busy:
+            return
+        self._status_busy = True
+
+        def work():
+            try:
+                status = self.status_client.request("status")
+            except ControlError:
+                status = {}
+            self.status_loaded.emit(status)
+
+        threading.Thread(target=work, name="status-poll", daemon=True).start()
+
+    def on_status(self, status):
+        self._status_busy = False
+        self.status = status
+        self.show_status()
+
+    def show_status(self):
+        if not self.status:
+            text, tip = "Status: Daemon not running ⚪", "Offline ⚪"
+        elif self.status["paused"]:
+            text, tip = "Status: Stopped 🔴", "Offline 🔴"
+        else:
+            down = [
+                name
+                for name, t in self.status["targets"].items()
+                if t["state"] == "down"
+            ]
+            text = f"Status: Running 🟢 ({len(self.status['targets'])} targets)"
+            if down:
+                text += f" · down: {', '.join(down)}"
+            tip = "Online 🟢"
+        self.status_label.setText(text)
+        self.tray.setToolTip(f"Cloudflare Watchdog - {tip}")
+
+    def fetch_settings(self):
+        """The daemon's settings, or the local config file without a daemon."""
+        try:
+            return compile_settings(self.client.request("settings"))
+        except (ControlError, ValueError):
+            return load_settings()
 
     def start_watchdog(self):
-        if not self.thread or not self.thread.is_alive():
-            from threading import Thread
-
-            self.thread = Thread(target=self.core.start, args=(self.log_message,))
-            self.thread.daemon = True
-            self.thread.start()
-            self.status_label.setText("Status: Running 🟢")
-            self.tray.setToolTip("Cloudflare Watchdog - Online 🟢")
+        if not self.client.available():
+            try:
+                spawn_daemon()
+            except ControlError as e:
+                self.log_message(f"❌ {e}")
+                return
+        if self.command("start"):
             self.log_message("▶️ Watchdog started.")
 
     def stop_watchdog(self):
-        self.core.stop()
-        self.status_label.setText("Status: Stopped 🔴")
-        self.tray.setToolTip("Cloudflare Watchdog - Offline 🔴")
-        self.log_message("⏹️ Watchdog stopped.")
+        if self.command("stop"):
+            self.log_message("⏹️ Watchdog stopped.")
+
+    def profile_watchdog(self):
+        if not self.status or self.status["paused"]:
+            self.log_message("⚠️ Start the watchdog before profiling it.")
+            return
+        self.command("profile")
 
     def open_settings(self):
-        settings = self.core.settings
+        self.settings = settings = self.fetch_settings()
         from PyQt6.QtWidgets import QDialog, QFormLayout, QLineEdit, QTextEdit
 
         dialog = QDialog(self)
@@ -147,9 +251,12 @@ class WatchdogGUI(QMainWindow):
         layout = QFormLayout(dialog)
 
         # Basic fields
-        url_input = QLineEdit(settings.get("target_url", ""))
+        url_input = QLineEdit(settings.target_url)
         interval_input = QSpinBox()
-        interval_input.setValue(settings.get("check_interval", 30))
+        interval_input.setRange(1, 86400)
+        interval_input.setValue(int(settings.check_interval))
+        self.url_edit = url_input
+        self.interval_spin = interval_input
 
         layout.addRow("Target URL", url_input)
         layout.addRow("Check Interval (s)", interval_input)
@@ -157,7 +264,7 @@ class WatchdogGUI(QMainWindow):
         # Recovery command sections
         # Recovery command sections (single-line with horizontal scroll)
         site_down_input = QTextEdit()
-        site_down_input.setPlainText("\n".join(settings.get("on_site_fail", [])))
+        site_down_input.setPlainText(self._commands_text(settings.on_site_fail))
         site_down_input.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
         site_down_input.setHorizontalScrollBarPolicy(
             Qt.ScrollBarPolicy.ScrollBarAsNeeded
@@ -165,7 +272,7 @@ class WatchdogGUI(QMainWindow):
         site_down_input.setFixedHeight(60)
 
         wifi_down_input = QTextEdit()
-        wifi_down_input.setPlainText("\n".join(settings.get("on_wifi_fail", [])))
+        wifi_down_input.setPlainText(self._commands_text(settings.on_wifi_fail))
         wifi_down_input.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
         wifi_down_input.setHorizontalScrollBarPolicy(
             Qt.ScrollBarPolicy.ScrollBarAsNeeded
@@ -173,13 +280,17 @@ class WatchdogGUI(QMainWindow):
         wifi_down_input.setFixedHeight(60)
 
         recovery_input = QTextEdit()
-        recovery_input.setPlainText("\n".join(settings.get("on_recovery", [])))
+        recovery_input.setPlainText(self._commands_text(settings.on_recovery))
         recovery_input.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
         recovery_input.setHorizontalScrollBarPolicy(
             Qt.ScrollBarPolicy.ScrollBarAsNeeded
         )
         recovery_input.setFixedHeight(60)
 
+        self.site_fail_edit = site_down_input
+        self.wifi_fail_edit = wifi_down_input
+        self.recovery_edit = recovery_input
+
         layout.addRow("Site Down (one per line)", site_down_input)
         layout.addRow("Wi-Fi Down (one per line)", wifi_down_input)
         layout.addRow("On Recovery (one per line)", recovery_input)
@@ -192,41 +303,37 @@ class WatchdogGUI(QMainWindow):
         dialog.setLayout(layout)
         dialog.exec()
 
+    @staticmethod
+    def _commands_text(steps):
+        return "\n".join(step.command for step in steps)
+
     def save_settings(self):
         """Save settings without resetting to defaults."""
-        self.core.settings["target_url"] = (
-            self.url_edit.text().strip() if hasattr(self, "url_edit") else ""
-        )
-        self.core.settings["check_interval"] = (
-            int(self.interval_spin.value()) if hasattr(self, "interval_spin") else 30
-        )
-        self.core.settings["on_site_fail"] = (
-            self.site_fail_edit.toPlainText().splitlines()
-            if hasattr(self, "site_fail_edit")
-            else []
-        )
-        self.core.settings["on_wifi_fail"] = (
-            self.wifi_fail_edit.toPlainText().splitlines()
-            if hasattr(self, "wifi_fail_edit")
-            else []
-        )
-        self.core.settings["on_recovery"] = (
-            self.recovery_edit.toPlainText().splitlines()
-            if hasattr(self, "recovery_edit")
-            else []
-        )
+        data = dict(self.settings.raw)
+        data["target_url"] = self.url_edit.text().strip()
+        data["check_interval"] = int(self.interval_spin.value())
+        for key, edit in (
+            ("on_site_fail", self.site_fail_edit),
+            ("on_wifi_fail", self.wifi_fail_edit),
+            ("on_recovery", self.recovery_edit),
+        ):
+            # Leave structured (dependency-ordered) action lists alone unless edited.
+            text = edit.toPlainText()
+            if text != self._commands_text(self.settings.actions(key)):
+                data[key] = text.splitlines()
 
         try:
-            with open("settings.json", "w") as f:
-                json.dump(self.core.settings, f, indent=4)
-            self.log_message("💾 Settings saved successfully.")
-        except Exception as e:
+            self.client.request("save_settings", data=data)
+        except ControlError as e:
             self.log_message(f"❌ Failed to save settings: {e}")
+            return
+        self.settings = self.fetch_settings()
+        self.log_message("💾 Settings saved successfully.")
 
     def view_log(self):
         import subprocess
 
-        log_path = os.path.join(os.path.dirname(__file__), "watchdog.log")
+        log_path = self.status.get("log_path") or str(get_log_path())
         if os.path.exists(log_path):
             try:
                 os.startfile(log_path)
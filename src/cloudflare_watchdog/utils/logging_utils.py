@@ -1,15 +1,341 @@
+import atexit
+import contextlib
 import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
+from pathlib import Path
 
-logger = logging.getLogger("CloudflareWatchdog")
+from cloudflare_watchdog.utils.paths import get_user_config_dir
+
+APP_NAME = "Cloudflare Watchdog"
+LOG_ENV = "CLOUDFLARE_WATCHDOG_LOG"
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+MAX_BATCH = 256
+FLUSH_INTERVAL = 0.5
+
+
+def get_log_path():
+    if os.getenv(LOG_ENV):
+        return Path(os.environ[LOG_ENV])
+    return get_user_config_dir() / "watchdog.log"
+
+
+@dataclass
+class LogEvent:
+    """One structured log entry travelling through the pipeline."""
+
+    message: str
+    level: int = logging.INFO
+    source: str = "core"
+    notify: bool = False
+    fields: dict = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def level_name(self):
+        return logging.getLevelName(self.level)
+
+    def format(self):
+        stamp = datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        return f"[{stamp}] {self.level_name} - {self.message}"
+
+
+class RotatingBatchWriter:
+    """Append whole batches to a size-rotated file with one write per batch."""
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _rotate(self):
+        self.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{index}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+
+    def write(self, text):
+        f = self._open()
+        size = len(text.encode("utf-8"))
+        if self.max_bytes and f.tell() and f.tell() + size > self.max_bytes:
+            self._rotate()
+            f = self._open()
+        f.write(text)
+        f.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def default_notifier():
+    """Return a ``notify(title, message)`` callable for this desktop, or None."""
+    if os.name == "nt":
+        try:
+            from winotify import Notification
+        except ImportError:
+            return None
+
+        def notify(title, message):
+            Notification(app_id=APP_NAME, title=title, msg=message).show()
+
+        return notify
+    if shutil.which("notify-send") and (
+        os.getenv("DISPLAY") or os.getenv("WAYLAND_DISPLAY")
+    ):
+
+        def notify(title, message):
+            subprocess.Popen(
+                ["notify-send", "--app-name", APP_NAME, title, message],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+
+        return notify
+    return None
+
+
+def _describe_window(seconds):
+    if seconds >= 60:
+        return f"{seconds / 60:g} min"
+    return f"{seconds:g} s"
+
+
+class NotificationCoalescer:
+    """Rate-limit and de-duplicate desktop notifications.
+
+    The first occurrence of a message is shown straight away; repeats inside
+    ``window`` seconds are only counted, and summarised once the window
+    closes ("site down (x42 in 5 min)"). No two toasts are shown less than
+    ``min_interval`` seconds apart; held-back messages go out with the next
+    summary.
+    """
+
+    def __init__(self, notify, window=300, min_interval=10):
+        self.notify = notify
+        self.window = window
+        self.min_interval = min_interval
+        self._entries = {}
+        self._last_sent = float("-inf")
+
+    def _send(self, message, now):
+        if now - self._last_sent < self.min_interval:
+            return False
+        self._last_sent = now
+        try:
+            self.notify(APP_NAME, message)
+        except Exception:
+            pass
+        return True
+
+    def offer(self, message, now=None):
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(message)
+        if entry is not None and now - entry["first"] < self.window:
+            entry["count"] += 1
+            return
+        if entry is not None:
+            self._summarise(message, entry, now)
+        sent = self._send(message, now)
+        self._entries[message] = {"first": now, "count": 1, "sent": int(sent)}
+
+    def _summarise(self, message, entry, now):
+        unsent = entry["count"] - entry["sent"]
+        if unsent <= 0:
+            return True
+        if entry["count"] == 1:
+            text = message
+        else:
+            window = _describe_window(self.window)
+            text = f"{message} (x{entry['count']} in {window})"
+        if self._send(text, now):
+            entry["sent"] = entry["count"]
+            return True
+        return False
+
+    def tick(self, now=None):
+        """Flush summaries for windows that have closed."""
+        now = time.monotonic() if now is None else now
+        for message, entry in list(self._entries.items()):
+            if now - entry["first"] >= self.window:
+                if self._summarise(message, entry, now):
+                    del self._entries[message]
+
+
+class LogPipeline:
+    """Queue-backed logging: producers enqueue, one background thread writes.
+
+    ``emit`` only builds a ``LogEvent`` and puts it on a queue, so the monitor
+    loop never waits on disk, console or notification I/O. The writer thread
+    drains the queue in batches, appends each batch to the rotating log file
+    with a single write, echoes it to the console, fans events out to
+    subscribers and passes ``notify`` events through the coalescer.
+    """
+
+    def __init__(self, path=None, console=True, notifier=None, coalescer=None):
+        self.path = Path(path) if path else get_log_path()
+        self.console = console
+        self.writer = RotatingBatchWriter(self.path)
+        notifier = notifier if notifier is not None else default_notifier()
+        self.coalescer = coalescer or (
+            NotificationCoalescer(notifier) if notifier else None
+        )
+        self.timings = None  # optional profiling.PhaseTimer
+        self._queue = queue.SimpleQueue()
+        self._subscribers = []
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="log-writer", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` from the writer thread for every event."""
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def emit(self, message, level=logging.INFO, source="core", notify=None, **fields):
+        if notify is None:
+            notify = level >= logging.WARNING
+        self._queue.put(LogEvent(str(message), level, source, notify, fields))
+
+    def _drain(self):
+        try:
+            first = self._queue.get(timeout=FLUSH_INTERVAL)
+        except queue.Empty:
+            return []
+        batch = [first]
+        while len(batch) < MAX_BATCH:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._drain()
+            markers = [item for item in batch if isinstance(item, threading.Event)]
+            events = [item for item in batch if isinstance(item, LogEvent)]
+            if events:
+                self._write(events)
+            if self.coalescer:
+                self.coalescer.tick()
+            for marker in markers:
+                marker.set()
+        self.writer.close()
+
+    def _span(self, phase):
+        if self.timings is None:
+            return contextlib.nullcontext()
+        return self.timings.span(phase)
+
+    def _write(self, events):
+        with self._span("log.file"):
+            try:
+                self.writer.write("".join(event.format() + "\n" for event in events))
+            except OSError as e:
+                print(f"[log-writer] {e}", file=sys.stderr)
+        if self.console:
+            with self._span("log.console"):
+                print("\n".join(event.format() for event in events))
+        with self._span("log.subscribers"):
+            for event in events:
+                for callback in list(self._subscribers):
+                    try:
+                        callback(event)
+                    except Exception:
+                        pass
+        if self.coalescer:
+            with self._span("log.notify"):
+                for event in events:
+                    if event.notify:
+                        self.coalescer.offer(event.message)
+
+    def flush(self, timeout=5):
+        """Block until everything emitted so far has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def close(self):
+        self.flush()
+        self._stopped.set()
+        self._queue.put(threading.Event())  # wake the writer out of its wait
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+class PipelineHandler(logging.Handler):
+    """Route stdlib ``logging`` records into a ``LogPipeline``."""
+
+    def __init__(self, pipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def emit(self, record):
+        try:
+            self.pipeline.emit(
+                record.getMessage(), record.levelno, source=record.name, notify=False
+            )
+        except Exception:
+            self.handleError(record)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Process-wide pipeline, started on first use."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = LogPipeline().start()
+            logger.addHandler(PipelineHandler(_pipeline))
+            atexit.register(_pipeline.close)
+        return _pipeline
+
+
+logger = logging.getLogger("cloudflare_watchdog")
 logger.setLevel(logging.INFO)
-handler = logging.FileHandler("watchdog.log", encoding="utf-8")
-formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+logger.propagate = False
 
 
-def log(message):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{timestamp}] {message}")
-    logger.info(message)
+def log(message, level=logging.INFO, **kwargs):
+    get_pipeline().emit(message, level, **kwargs)
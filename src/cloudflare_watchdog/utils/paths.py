@@ -0,0 +1,11 @@
+import os
+from pathlib import Path
+
+
+def get_user_config_dir():
+    if os.name == "nt":
+        base = Path(os.getenv("APPDATA", Path.home())) / "CloudflareWatchdog"
+    else:
+        base = Path.home() / ".config" / "cloudflare-watchdog"
+    base.mkdir(parents=True, exist_ok=True)
+    return base
@@ -0,0 +1,47 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cloudflare_watchdog import cli
+
+
+class Healthy(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Healthy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_check_probes_without_touching_daemon_state(user_dir, origin, capsys):
+    config = user_dir / "config.json"
+    targets = [{"name": "up", "url": origin}]
+    config.write_text(json.dumps({"targets": targets, "metrics_port": 1}))
+    assert cli.main(["--config", str(config), "check"]) == 0
+    assert "up" in capsys.readouterr().out
+    # No metrics port, journal, pidfiles or history: just the probe.
+    assert sorted(p.name for p in user_dir.iterdir()) == ["config.json"]
+    targets.append({"name": "down", "url": "http://127.0.0.1:9/"})
+    config.write_text(json.dumps({"targets": targets}))
+    assert cli.main(["--config", str(config), "check"]) == 1
+
+
+def test_check_rejects_an_invalid_config(user_dir, capsys):
+    config = user_dir / "config.json"
+    config.write_text(json.dumps({"check_interval": 0}))
+    assert cli.main(["--config", str(config), "check"]) == 2
+    assert "check_interval" in capsys.readouterr().err
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+
+from cloudflare_watchdog.bench.faults import CloudflaredStandIn
+from cloudflare_watchdog.core.cloudflared import (
+    HA_CONNECTIONS,
+    REQUEST_ERRORS,
+    TOTAL_REQUESTS,
+    parse_metrics,
+)
+from cloudflare_watchdog.core.probe import ProbeEngine, ProbeTarget
+
+FIXTURES = (
+    Path(__file__).resolve().parents[1]
+    / "src/cloudflare_watchdog/bench/fixtures/cloudflared"
+)
+
+
+def test_parse_metrics_sums_labelled_samples():
+    lines = [
+        "# HELP cloudflared_tunnel_ha_connections Number of active ha connections",
+        "# TYPE cloudflared_tunnel_ha_connections gauge",
+        'cloudflared_tunnel_ha_connections{conn="0"} 1',
+        'cloudflared_tunnel_ha_connections{conn="1"} 1',
+        b"cloudflared_tunnel_total_requests 12",
+        "cloudflared_tunnel_request_errors not-a-number",
+        "",
+        "cloudflared_tunnel_request_errors 3",
+    ]
+    assert parse_metrics(lines) == {
+        HA_CONNECTIONS: 2.0,
+        TOTAL_REQUESTS: 12.0,
+        REQUEST_ERRORS: 3.0,
+    }
+
+
+def test_parse_metrics_stops_after_the_wanted_families():
+    def stream():
+        yield "cloudflared_tunnel_ha_connections 4"
+        yield "cloudflared_tunnel_request_errors 0"
+        yield "cloudflared_tunnel_total_requests 5"
+        yield "go_goroutines 12"
+        raise AssertionError("read past the wanted families")
+
+    assert parse_metrics(stream())[TOTAL_REQUESTS] == 5.0
+
+
+def test_parse_metrics_reads_the_recorded_fixture():
+    lines = (FIXTURES / "degraded.prom").read_text().splitlines()
+    assert parse_metrics(lines)[HA_CONNECTIONS] == 1.0
+
+
+@pytest.fixture
+def standin():
+    with CloudflaredStandIn() as server:
+        yield server
+
+
+def probe(engine, target):
+    result = engine.probe(target)
+    return result.success, result.message
+
+
+@pytest.mark.parametrize(
+    "state, expected",
+    [("healthy", True), ("degraded", False), ("down", False)],
+)
+def test_probe_against_recorded_states(standin, state, expected):
+    engine = ProbeEngine()
+    target = ProbeTarget("tunnel", standin.url, kind="cloudflared", timeout=2)
+    standin.set_fault(state)
+    ok, message = probe(engine, target)
+    assert ok is expected, message
+    engine.close()
+
+
+def test_error_rate_is_measured_between_scrapes(standin):
+    engine = ProbeEngine()
+    target = ProbeTarget("tunnel", standin.url, kind="cloudflared", timeout=2)
+    standin.set_fault("erroring")
+    first = probe(engine, target)
+    second = probe(engine, target)
+    assert first[0]  # no baseline yet
+    assert not second[0] and "erroring" in second[1]
+    engine.close()
@@ -0,0 +1,150 @@
+import json
+import os
+import stat
+import threading
+import time
+from multiprocessing.connection import Client
+
+import pytest
+
+from cloudflare_watchdog.core.control import (
+    ControlClient,
+    ControlError,
+    ControlServer,
+    EventFeed,
+    EventStream,
+    _connect,
+)
+from cloudflare_watchdog.utils.logging_utils import LogEvent
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def server(user_dir):
+    from cloudflare_watchdog.core.watchdog import WatchdogCore
+
+    config = user_dir / "config.json"
+    config.write_text(json.dumps({"target_url": "http://127.0.0.1:9/"}))
+    core = WatchdogCore(config)
+    server = ControlServer(core, str(user_dir / "control.sock")).start()
+    yield server
+    server.stop()
+
+
+def test_socket_and_key_are_owner_only(server, user_dir):
+    assert stat.S_IMODE(os.stat(server.address).st_mode) == 0o600
+    key = user_dir / ".config" / "cloudflare-watchdog" / "control.key"
+    assert stat.S_IMODE(os.stat(key).st_mode) == 0o600
+
+
+def test_client_without_the_key_cannot_save_settings(server):
+    before = server.core.settings_path.read_text()
+    conn = Client(server.address, "AF_UNIX")
+    conn.send_bytes(json.dumps({"cmd": "save_settings", "data": {}}).encode())
+    replies = []
+    with pytest.raises(EOFError):
+        while True:
+            replies.append(conn.recv_bytes())
+    conn.close()
+    assert not any(reply.startswith(b"{") for reply in replies)
+    assert server.core.settings_path.read_text() == before
+    client = ControlClient(server.address)
+    assert client.request("status")["pid"] == os.getpid()
+    client.close()
+
+
+def test_requests_and_errors(server):
+    client = ControlClient(server.address)
+    status = client.request("status")
+    assert (status["paused"], status["clients"]) == (False, 1)
+    assert client.request("settings") == {"target_url": "http://127.0.0.1:9/"}
+    client.request("save_settings", data={"check_interval": 7})
+    assert server.core.settings.check_interval == 7
+    assert client.request("settings") == {"check_interval": 7}
+    for cmd, args in (
+        ("save_settings", {"data": {"check_interval": 0}}),
+        ("save_settings", {}),
+        ("profile", {"seconds": "soon"}),
+        ("explode", {}),
+    ):
+        with pytest.raises(ControlError):
+            client.request(cmd, **args)
+    assert client.request("status")["pid"] == os.getpid()  # still connected
+    client.close()
+
+
+def test_non_object_request_gets_an_error(server):
+    conn = _connect(server.address)
+    conn.send_bytes(b"[1, 2]")
+    assert json.loads(conn.recv_bytes()) == {
+        "ok": False,
+        "error": "request must be an object",
+    }
+    conn.close()
+
+
+def test_stop_and_start_pause_the_loop(server):
+    loop = threading.Thread(target=server.run, daemon=True)
+    loop.start()
+    client = ControlClient(server.address)
+    wait_for(lambda: server.core.running)
+    assert client.request("stop")["paused"]
+    wait_for(lambda: not server.core.running)
+    assert not client.request("start")["paused"]
+    wait_for(lambda: server.core.running)
+    client.close()
+    server.quit()
+    loop.join(5)
+    assert not loop.is_alive()
+
+
+def test_profile_is_flushed_on_stop_and_refused_while_stopped(server, user_dir):
+    loop = threading.Thread(target=server.run, daemon=True)
+    loop.start()
+    client = ControlClient(server.address)
+    wait_for(lambda: server.core.running)
+    client.request("profile", seconds=600)
+    wait_for(lambda: server.core.profiler.deadline is not None)
+    client.request("stop")
+    profiles = user_dir / ".config" / "cloudflare-watchdog" / "profiles"
+    wait_for(lambda: list(profiles.glob("*.prof")))
+    assert server.core.profiler.deadline is None
+    with pytest.raises(ControlError, match="stopped"):
+        client.request("profile")
+    assert server.core.profiler.pending is None
+    client.close()
+    server.quit()
+    loop.join(5)
+
+
+def test_subscribers_get_backlog_then_new_events(server):
+    server.core.log("before", notify=False)
+    server.core.pipeline.flush()
+    stream = EventStream(server.address, backlog=50)
+    seen = []
+    stream.subscribe(lambda event: seen.append(event.message))
+    stream.start()
+    wait_for(lambda: "before" in seen)
+    server.core.log("after", notify=False)
+    wait_for(lambda: "after" in seen)
+    assert stream.connected
+    stream.close()
+
+
+def test_feed_reports_dropped_events():
+    feed = EventFeed(capacity=3)
+    for i in range(5):
+        feed.push(LogEvent(f"e{i}"))
+    events, dropped = feed.after(0)
+    assert [json.loads(e)["message"] for e in events] == ["e2", "e3", "e4"]
+    assert dropped == 2
+    assert feed.after(5, timeout=0.01) == ([], 0)
+    events, dropped = feed.after(3)
+    assert (len(events), dropped) == (2, 0)
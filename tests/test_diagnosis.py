@@ -0,0 +1,107 @@
+import socket
+import threading
+
+import pytest
+
+from cloudflare_watchdog.core import diagnosis
+from cloudflare_watchdog.core.diagnosis import (
+    NETWORK,
+    ORIGIN,
+    SITE,
+    TUNNEL,
+    Diagnoser,
+    connect_any,
+    parse_address,
+)
+from cloudflare_watchdog.core.probe import ProbeResult, ProbeTarget
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    yield server.getsockname()
+    server.close()
+
+
+@pytest.fixture
+def closed():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    address = sock.getsockname()
+    sock.close()
+    return address
+
+
+def failed(url="http://127.0.0.1:1/", origin=None, kind="http", name="site"):
+    target = ProbeTarget(name, url, origin=origin, kind=kind)
+    return ProbeResult(target, False, "❌ 502", 502, 0.01)
+
+
+def test_parse_address():
+    assert parse_address("example.com:443") == ("example.com", 443)
+    assert parse_address("[::1]:8080") == ("::1", 8080)
+    assert parse_address(("1.1.1.1", "53")) == ("1.1.1.1", 53)
+    assert parse_address("localhost", default_port=80) == ("localhost", 80)
+    for bad in ("localhost", ":80", 42):
+        with pytest.raises(ValueError):
+            parse_address(bad)
+
+
+def test_connect_any(listener, closed):
+    assert connect_any([closed, listener], 1.0) == (True, f"127.0.0.1:{listener[1]}")
+    ok, detail = connect_any([closed], 1.0)
+    assert not ok and "ECONNREFUSED" in detail
+    assert connect_any([], 1.0) == (False, "no addresses")
+
+
+def test_ladder_verdicts(listener, closed):
+    diagnoser = Diagnoser(anchors=[listener], timeout=1.0)
+    site = diagnoser.diagnose(failed())
+    assert site.verdict == SITE and not site.conclusive
+    assert [c.layer for c in site.checks] == ["route", "anchor", "tunnel"]
+    origin_down = diagnoser.diagnose(failed(origin=closed))
+    assert origin_down.verdict == ORIGIN and origin_down.conclusive
+    assert origin_down.failed.layer == "origin"
+    tunnel = diagnoser.diagnose(failed(origin=listener))
+    assert tunnel.verdict == TUNNEL and not tunnel.conclusive
+    cloudflared = diagnoser.diagnose(failed(kind="cloudflared", origin=closed))
+    assert (cloudflared.verdict, cloudflared.kind) == (TUNNEL, "cloudflared")
+    assert cloudflared.checks[-1].layer == "cloudflared"
+
+
+def test_unreachable_anchor_means_network(closed):
+    result = Diagnoser(anchors=[closed], timeout=1.0).diagnose(failed())
+    assert result.verdict == NETWORK and result.conclusive
+    assert result.failed.layer == "anchor"
+    assert "origin" not in [c.layer for c in result.checks]
+
+
+def test_dns_failure_means_network(listener, monkeypatch):
+    monkeypatch.setattr(diagnosis, "resolve", lambda host, timeout: (False, "nx"))
+    result = Diagnoser(anchors=[listener]).diagnose(failed("https://site.test/"))
+    assert result.verdict == NETWORK
+    assert [c.layer for c in result.checks] == ["route", "dns"]
+
+
+def test_shared_rungs_run_once_for_many_failures(listener, monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def counted(name, check):
+        def wrapper(*args):
+            with lock:
+                calls.append(name)
+            return check(*args)
+
+        return wrapper
+
+    route = counted("route", diagnosis.check_route)
+    monkeypatch.setattr(diagnosis, "check_route", route)
+    monkeypatch.setattr(diagnosis, "connect_any", counted("anchor", connect_any))
+    diagnoser = Diagnoser(anchors=[listener], timeout=1.0)
+    results = [failed(name=f"site{i}") for i in range(10)]
+    diagnoses = diagnoser.diagnose_all(results)
+    assert [d.verdict for d in diagnoses] == [SITE] * 10
+    assert sorted(calls) == ["anchor", "route"]
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from cloudflare_watchdog.core.executor import ActionStep, RemediationExecutor
+
+
+@pytest.fixture
+def executor():
+    messages = []
+    executor = RemediationExecutor(lambda msg, *args, **kwargs: messages.append(msg))
+    executor.messages = messages
+    yield executor
+    executor.shutdown()
+
+
+def run(executor, steps, label="on-site-fail"):
+    run = executor.submit(steps, label)
+    assert run.wait(10)
+    return run
+
+
+def test_independent_steps_run_in_parallel(executor):
+    started = time.monotonic()
+    result = run(executor, [ActionStep("a", "sleep 0.5"), ActionStep("b", "sleep 0.5")])
+    assert time.monotonic() - started < 0.9
+    assert all(r.ok for r in result.results.values())
+
+
+def test_steps_wait_for_after_even_when_it_fails(executor, tmp_path):
+    log = tmp_path / "order"
+    steps = [
+        ActionStep("stop", f"sleep 0.2; echo stop >> {log}; false"),
+        ActionStep("other", f"echo other >> {log}"),
+        ActionStep("start", f"echo start >> {log}", after=("stop",)),
+    ]
+    result = run(executor, steps)
+    lines = log.read_text().split()
+    assert lines.index("stop") < lines.index("start")
+    assert lines[0] == "other"
+    assert result.results["stop"].returncode == 1
+    assert not result.results["stop"].ok
+    assert result.results["start"].ok
+
+
+def test_a_busy_label_is_not_started_twice(executor):
+    first = executor.submit([ActionStep("a", "sleep 0.3")], "on-site-fail")
+    assert executor.busy("on-site-fail")
+    assert executor.submit([ActionStep("a", "true")], "on-site-fail") is None
+    other = executor.submit([ActionStep("a", "true")], "on-wifi-fail")
+    assert other is not None and other.wait(5)
+    assert first.wait(5)
+    assert not executor.busy("on-site-fail")
+    assert executor.submit([], "on-site-fail") is None
+
+
+def test_timeout_kills_the_command(executor):
+    step = ActionStep("slow", "sleep 5", timeout=0.2)
+    started = time.monotonic()
+    result = run(executor, [step]).results["slow"]
+    assert time.monotonic() - started < 3
+    assert result.timed_out and not result.ok
+
+
+def test_output_is_logged_and_listeners_are_called(executor):
+    results, runs = [], []
+    executor.listeners.append(lambda label, result: results.append(label))
+    executor.run_listeners.append(runs.append)
+    done = run(executor, [ActionStep("a", "echo hello; echo oops >&2")])
+    assert "  │ hello" in executor.messages
+    assert "  ┆ oops" in executor.messages
+    assert results == ["on-site-fail"]
+    assert runs == [done]
+    assert done.finished >= done.started
+
+
+def test_long_running_steps_go_to_the_background(executor):
+    step = ActionStep("tunnel", "sleep 0.1", supervise=True)
+    result = run(executor, [step]).results["tunnel"]
+    assert result.background and result.ok
+    assert result.returncode is None
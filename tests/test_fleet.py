@@ -0,0 +1,136 @@
+import gzip
+import http.client
+import time
+
+import pytest
+import requests
+
+from cloudflare_watchdog.core.fleet import (
+    INGEST_PATH,
+    FleetAgent,
+    FleetController,
+    FleetState,
+    decode,
+    encode,
+    fetch_view,
+)
+from cloudflare_watchdog.core.health import HealthState, Transition
+
+TOKEN = "s3cret"
+
+
+def snapshot():
+    return {"site": {"state": "healthy"}}
+
+
+def down(target="site"):
+    return Transition(
+        target, HealthState.SUSPECT, HealthState.DOWN, "down", time.time()
+    )
+
+
+@pytest.fixture
+def controller():
+    controller = FleetController("127.0.0.1", 0, token=TOKEN).start()
+    yield controller
+    controller.stop()
+
+
+def test_agent_reports_to_controller(controller):
+    agent = FleetAgent(controller.url, snapshot, "edge-1", token=TOKEN)
+    agent.record_transition(down())
+    assert agent.flush()
+    view = fetch_view(controller.url, TOKEN)
+    assert view["summary"]["agents"] == 1
+    assert [e["target"] for e in view["events"]] == ["site"]
+    assert view["agents"][0]["targets"] == snapshot()
+    agent.stop()
+
+
+def test_wrong_token_is_refused(controller):
+    with pytest.raises(requests.HTTPError):
+        fetch_view(controller.url, "wrong")
+    agent = FleetAgent(controller.url, snapshot, "edge-1", token="wrong")
+    assert not agent.flush()
+    assert controller.state.view()["summary"]["agents"] == 0
+
+
+def test_buffered_events_replay_once_after_an_outage(tmp_path):
+    state = FleetState()
+    controller = FleetController("127.0.0.1", 0, state=state).start()
+    port = controller.port
+    agent = FleetAgent(controller.url, snapshot, "edge-1", buffer_path=tmp_path / "b")
+    agent.record_transition(down("a"))
+    assert agent.flush()
+    controller.stop()
+    agent.record_transition(down("b"))
+    agent.record_transition(down("c"))
+    assert not agent.flush()
+    assert len(agent.buffer.read()) == 2
+    controller = FleetController("127.0.0.1", port, state=state).start()
+    try:
+        assert agent.flush()
+        assert agent.flush()  # nothing left to send twice
+    finally:
+        controller.stop()
+    assert not agent.buffer
+    assert [e["target"] for e in state.events] == ["a", "b", "c"]
+    assert state.duplicates == 0
+
+
+def test_duplicate_events_are_dropped():
+    state = FleetState()
+    event = {"boot": "b1", "seq": 1, "target": "site"}
+    assert state.ingest({"agent": "edge", "events": [dict(event)]}) == 1
+    assert state.ingest({"agent": "edge", "events": [dict(event)]}) == 0
+    assert state.duplicates == 1
+    assert state.ingest({"agent": "edge", "events": [{**event, "boot": "b2"}]}) == 1
+
+
+def test_malformed_batches_change_nothing():
+    state = FleetState()
+    for payload in (
+        [1, 2],
+        {"events": []},
+        {"agent": "edge", "events": {"seq": 1}},
+        {"agent": "edge", "events": ["transition"]},
+        {"agent": "edge", "events": [{"boot": ["b1"], "seq": 1}]},
+        {"agent": "edge", "events": [{"boot": "b1", "seq": "1"}]},
+        {"agent": "edge", "targets": ["site"]},
+        {"agent": "edge", "interval": "often"},
+    ):
+        with pytest.raises(ValueError):
+            state.ingest(payload)
+    assert (state.agents, state.batches) == ({}, 0)
+
+
+def test_malformed_batch_gets_400(controller):
+    url = f"http://127.0.0.1:{controller.port}{INGEST_PATH}"
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    for payload in ([1, 2], {"agent": "edge", "events": [None]}):
+        response = requests.post(url, json=payload, headers=headers, timeout=5)
+        assert response.status_code == 400
+    assert controller.state.agents == {}
+
+
+def test_decode_caps_the_inflated_size():
+    assert decode(encode({"a": 1}), "gzip") == {"a": 1}
+    bomb = gzip.compress(b" " * 1024 * 1024)
+    with pytest.raises(ValueError):
+        decode(bomb, "gzip", limit=1024)
+
+
+def test_controller_requires_a_token_off_loopback():
+    with pytest.raises(ValueError):
+        FleetController("0.0.0.0", 0).start()
+
+
+def test_oversized_body_is_rejected(controller):
+    connection = http.client.HTTPConnection("127.0.0.1", controller.port, timeout=5)
+    connection.putrequest("POST", INGEST_PATH)
+    connection.putheader("Authorization", f"Bearer {TOKEN}")
+    connection.putheader("Content-Length", str(10**12))
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 413
+    connection.close()
@@ -0,0 +1,92 @@
+from cloudflare_watchdog.core.health import (
+    HealthMonitor,
+    HealthState,
+    RestartBudget,
+    TargetHealth,
+)
+
+
+def actions(health, outcomes, conclusive=False):
+    found = []
+    for ok in outcomes:
+        transition = health.observe(ok, conclusive)
+        found.append(transition.action if transition else None)
+    return found
+
+
+def test_failure_threshold_then_retries():
+    health = TargetHealth("site", failure_threshold=3, recovery_threshold=2)
+    assert actions(health, [False] * 5) == [None, None, "down", "retry", "retry"]
+    assert health.state is HealthState.DOWN
+
+
+def test_single_failure_is_only_suspect():
+    health = TargetHealth("site", failure_threshold=3)
+    transition = health.observe(False)
+    assert transition.current is HealthState.SUSPECT
+    transition = health.observe(True)
+    assert transition.current is HealthState.HEALTHY
+    assert transition.action is None
+
+
+def test_recovery_threshold_and_relapse():
+    health = TargetHealth("site", failure_threshold=1, recovery_threshold=2)
+    assert actions(health, [False]) == ["down"]
+    assert actions(health, [True]) == [None]
+    assert health.state is HealthState.RECOVERING
+    health.observe(False)  # a relapse goes straight back to down
+    assert health.state is HealthState.DOWN
+    assert actions(health, [True, True]) == [None, "recovery"]
+    assert health.state is HealthState.HEALTHY
+
+
+def test_conclusive_outcomes_skip_the_thresholds():
+    health = TargetHealth("site", failure_threshold=5, recovery_threshold=5)
+    assert actions(health, [False], conclusive=True) == ["down"]
+    assert actions(health, [True], conclusive=True) == ["recovery"]
+
+
+def test_thresholds_below_one_are_clamped():
+    health = TargetHealth("site", failure_threshold=0, recovery_threshold=0)
+    assert actions(health, [False, True]) == ["down", "recovery"]
+
+
+def test_budget_cooldown_and_window():
+    budget = RestartBudget(max_restarts=2, window=100, cooldown=10)
+    assert budget.allow(now=0)
+    budget.record(now=0)
+    assert not budget.allow(now=9.9)  # cooling down
+    assert budget.allow(now=10)
+    budget.record(now=10)
+    assert not budget.allow(now=50)  # spent
+    assert not budget.allow(now=99.9)
+    assert budget.allow(now=100)  # the first run aged out
+
+
+def test_zero_budget_never_allows():
+    assert not RestartBudget(max_restarts=0).allow(now=0)
+
+
+def test_monitor_forget_and_configure():
+    monitor = HealthMonitor(failure_threshold=3)
+    monitor.observe("a", False)
+    monitor.observe("b", False)
+    monitor.forget({"b"})
+    assert set(monitor.targets) == {"b"}
+    monitor.configure(1, 1, {"max_restarts": 7})
+    assert monitor.targets["b"].failure_threshold == 1
+    assert monitor.budget.max_restarts == 7
+    assert monitor.observe("b", False).action == "down"
+    assert monitor.state("unknown") is HealthState.HEALTHY
+
+
+def test_each_action_list_has_its_own_budget():
+    monitor = HealthMonitor(budget=RestartBudget(max_restarts=1, cooldown=0))
+    wifi = monitor.budget_for("on-wifi-fail")
+    assert monitor.budget_for("on-wifi-fail") is wifi
+    wifi.record(now=0)
+    assert not wifi.allow(now=1)
+    assert monitor.budget_for("on-site-fail").allow(now=1)
+    monitor.configure(3, 2, {"max_restarts": 2})
+    assert wifi.allow(now=1)
+    assert monitor.budget_for("on-tunnel-fail").max_restarts == 2
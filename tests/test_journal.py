@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from cloudflare_watchdog.core.executor import ActionStep, RemediationRun, StepResult
+from cloudflare_watchdog.core.health import HealthState, Transition
+from cloudflare_watchdog.core.journal import IncidentJournal, report
+
+DAY = 86400.0
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = IncidentJournal(tmp_path / "journal.sqlite3")
+    yield journal
+    journal.close()
+
+
+def outage(journal, target, start, end, verdict="site"):
+    journal.record_transition(
+        Transition(target, HealthState.SUSPECT, HealthState.DOWN, "down", start),
+        None,
+    )
+    if end is not None:
+        journal.record_transition(
+            Transition(target, HealthState.DOWN, HealthState.HEALTHY, "recovery", end)
+        )
+
+
+def by_target(path, since, until=None):
+    targets, _ = report(path, since, until)
+    return {t.target: t for t in targets}
+
+
+def test_uptime_covers_the_whole_monitored_window(journal):
+    now = time.time()
+    journal.record_monitoring({"site", "quiet"}, now=now - 30 * DAY)
+    outage(journal, "site", now - 3600, now - 3000)
+    journal.close()
+    targets = by_target(journal.path, now - 30 * DAY)
+    assert set(targets) == {"site", "quiet"}  # never-failed targets too
+    site = targets["site"]
+    assert site.observed == pytest.approx(30 * DAY, abs=5)
+    assert site.downtime == pytest.approx(600)
+    assert site.uptime == pytest.approx(1 - 600 / (30 * DAY), abs=1e-6)
+    assert site.incidents == site.resolved == 1
+    assert site.mttr == pytest.approx(600)
+    assert targets["quiet"].uptime == 1.0
+
+
+def test_window_starts_at_monitoring_not_since(journal):
+    now = time.time()
+    journal.record_monitoring({"site"}, now=now - DAY)
+    journal.record_monitoring((), now=now - DAY / 2)  # watchdog stopped
+    journal.close()
+    site = by_target(journal.path, now - 30 * DAY)["site"]
+    assert site.observed == pytest.approx(DAY / 2)
+
+
+def test_removed_target_stops_accruing(journal):
+    now = time.time()
+    journal.record_monitoring({"a", "b"}, now=now - 2 * DAY)
+    journal.record_monitoring({"a"}, now=now - DAY)
+    journal.close()
+    targets = by_target(journal.path, now - 30 * DAY)
+    assert targets["b"].observed == pytest.approx(DAY)
+    assert targets["a"].observed == pytest.approx(2 * DAY, abs=5)
+
+
+def test_crash_ends_monitoring_at_the_last_heartbeat(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    now = time.time()
+    first = IncidentJournal(path)
+    first.record_monitoring({"site"}, now=now - DAY)
+    first.close()  # no "stopped" record: as if the process died
+    second = IncidentJournal(path)
+    second.record_monitoring({"site"}, now=now - 3600)
+    second.close()
+    site = by_target(path, now - 30 * DAY)["site"]
+    # The first stretch ends at its last stamp (its start), not at restart.
+    assert site.observed == pytest.approx(3600, abs=5)
+
+
+def test_open_incident_counts_until_now(journal):
+    now = time.time()
+    journal.record_monitoring({"site"}, now=now - DAY)
+    outage(journal, "site", now - 100, None)
+    journal.close()
+    site = by_target(journal.path, now - DAY)["site"]
+    assert site.open and site.resolved == 0
+    assert site.downtime == pytest.approx(100, abs=5)
+
+
+def test_remediation_effectiveness(journal):
+    now = time.time()
+    journal.record_monitoring({"site"}, now=now - DAY)
+    outage(journal, "site", now - 600, now - 300)
+    run = RemediationRun("on-site-fail", (ActionStep("fix", "true"),))
+    run.context = {"target": "site", "trigger": "down", "verdict": "site"}
+    offset = time.time() - time.monotonic()
+    run.started, run.finished = now - 550 - offset, now - 540 - offset
+    run.results = {"fix": StepResult(run.steps[0], returncode=0)}
+    journal.record_run(run)
+    journal.close()
+    _, remediations = report(journal.path, now - DAY)
+    (entry,) = remediations
+    assert (entry.label, entry.runs, entry.succeeded) == ("on-site-fail", 1, 1)
+    assert entry.effectiveness == 1.0
+    assert entry.time_to_recover == pytest.approx(240, abs=1)
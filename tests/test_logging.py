@@ -0,0 +1,94 @@
+import logging
+
+from cloudflare_watchdog.utils.logging_utils import (
+    LogPipeline,
+    NotificationCoalescer,
+    RotatingBatchWriter,
+)
+
+
+def coalescer(window=300, min_interval=10):
+    sent = []
+
+    def notify(title, message):
+        sent.append(message)
+
+    return NotificationCoalescer(notify, window, min_interval), sent
+
+
+def test_repeats_are_counted_and_summarised_once():
+    c, sent = coalescer()
+    c.offer("site down", now=0)
+    for t in range(1, 42):
+        c.offer("site down", now=t)
+    assert sent == ["site down"]
+    c.tick(now=299)
+    assert sent == ["site down"]
+    c.tick(now=300)
+    assert sent == ["site down", "site down (x42 in 5 min)"]
+    c.tick(now=400)
+    assert len(sent) == 2
+
+
+def test_a_single_message_is_not_summarised_again():
+    c, sent = coalescer()
+    c.offer("site down", now=0)
+    c.tick(now=300)
+    assert sent == ["site down"]
+
+
+def test_min_interval_holds_back_and_sends_with_the_summary():
+    c, sent = coalescer(window=60, min_interval=10)
+    c.offer("site down", now=0)
+    c.offer("tunnel down", now=1)
+    assert sent == ["site down"]
+    c.tick(now=61)
+    assert sent == ["site down", "tunnel down"]
+
+
+def test_a_closed_window_starts_a_new_one():
+    c, sent = coalescer(window=60, min_interval=0)
+    c.offer("site down", now=0)
+    c.offer("site down", now=10)
+    c.offer("site down", now=70)
+    assert sent == ["site down", "site down (x2 in 1 min)", "site down"]
+
+
+def test_writer_rotates_whole_batches(tmp_path):
+    path = tmp_path / "watchdog.log"
+    writer = RotatingBatchWriter(path, max_bytes=100, backup_count=2)
+    for i in range(6):
+        writer.write(f"{i}" * 40 + "\n")
+    writer.close()
+
+    def lines(name):
+        return (tmp_path / name).read_text().split()
+
+    # 41-byte lines, so two fit under 100 bytes before the next rotation.
+    assert lines("watchdog.log") == ["4" * 40, "5" * 40]
+    assert lines("watchdog.log.1") == ["2" * 40, "3" * 40]
+    assert lines("watchdog.log.2") == ["0" * 40, "1" * 40]
+    assert not (tmp_path / "watchdog.log.3").exists()
+
+
+def test_pipeline_writes_fans_out_and_notifies(tmp_path):
+    c, sent = coalescer()
+    pipeline = LogPipeline(tmp_path / "watchdog.log", console=False, coalescer=c)
+    seen = []
+    pipeline.subscribe(seen.append)
+    pipeline.start()
+    pipeline.emit("probe ok")
+    pipeline.emit("site down", logging.ERROR, target="site")
+    pipeline.emit("quiet warning", logging.WARNING, notify=False)
+    assert pipeline.flush()
+    pipeline.close()
+    lines = (tmp_path / "watchdog.log").read_text().splitlines()
+    assert [line.split(" - ", 1)[1] for line in lines] == [
+        "probe ok",
+        "site down",
+        "quiet warning",
+    ]
+    assert "ERROR" in lines[1]
+    assert [e.message for e in seen] == ["probe ok", "site down", "quiet warning"]
+    assert seen[1].fields == {"target": "site"}
+    assert sent == ["site down"]
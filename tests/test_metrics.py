@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+
+from cloudflare_watchdog.core.health import HealthState, Transition
+from cloudflare_watchdog.core.metrics import Counter, Histogram, WatchdogMetrics
+from cloudflare_watchdog.core.probe import ProbeResult, ProbeTarget
+
+
+def series(text, name):
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("h", "Help.", ["target"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, target='a"b')
+    assert histogram.render() == [
+        "# HELP h Help.",
+        "# TYPE h histogram",
+        'h_bucket{target="a\\"b",le="0.1"} 1',
+        'h_bucket{target="a\\"b",le="1"} 3',
+        'h_bucket{target="a\\"b",le="+Inf"} 4',
+        'h_sum{target="a\\"b"} 6.05',
+        'h_count{target="a\\"b"} 4',
+    ]
+
+
+def test_counter_renders_sorted_label_sets():
+    counter = Counter("c_total", "Help.", ["label", "reason"])
+    counter.inc(label="b")
+    counter.inc(2, label="a", reason="exit")
+    assert counter.render()[2:] == [
+        'c_total{label="a",reason="exit"} 2',
+        'c_total{label="b",reason=""} 1',
+    ]
+
+
+def test_forget_targets_drops_every_series_of_removed_targets():
+    metrics = WatchdogMetrics()
+    for name in ("kept", "gone"):
+        result = ProbeResult(ProbeTarget(name, "http://x/"), True, "", latency=0.2)
+        metrics.record_probe(result)
+        metrics.record_transition(
+            Transition(name, HealthState.HEALTHY, HealthState.SUSPECT, None),
+            HealthState,
+        )
+    metrics.loop_duration.observe(0.01)
+    metrics.forget_targets({"kept"})
+    text = metrics.render()
+    assert 'target="gone"' not in text
+    assert 'watchdog_probes_total{target="kept",result="success"} 1' in text
+    assert series(text, "watchdog_target_state{")  # still exported for "kept"
+    assert "watchdog_loop_iteration_seconds_count 1" in text
+
+
+def test_loop_passes_are_timed_without_the_idle_wait(user_dir):
+    from cloudflare_watchdog.core.watchdog import WatchdogCore
+
+    config = user_dir / "config.json"
+    config.write_text(
+        json.dumps(
+            {
+                "targets": [{"name": "site", "url": "http://127.0.0.1:9/"}],
+                "check_interval": 0.2,
+                "network": {"source": "off"},
+            }
+        )
+    )
+    core = WatchdogCore(config)
+    thread = threading.Thread(target=core.start, daemon=True)
+    thread.start()
+    time.sleep(1.0)
+    core.stop()
+    thread.join(5)
+    _, total, count = core.metrics.loop_duration.snapshot()[()]
+    probes = sum(core.metrics.probes.snapshot().values())
+    assert count > probes  # idle passes are observed too
+    assert total < 0.5  # ...but not the time spent waiting in them
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cloudflare_watchdog.config.settings_loader import SettingsError, compile_settings
+from cloudflare_watchdog.core.health import HealthState
+from cloudflare_watchdog.core.network import NETWORK_TARGET, NetworkStatus, changes
+
+WIFI = NetworkStatus(True, "wlan0", "192.0.2.1", "home", True)
+
+
+def test_first_status_is_reported():
+    assert changes(None, WIFI) == ["network up: wlan0 (home) via 192.0.2.1"]
+    assert changes(None, NetworkStatus(False)) == ["network down: no route"]
+
+
+def test_changes():
+    down = NetworkStatus(False, "wlan0")
+    assert changes(WIFI, WIFI) == []
+    assert changes(WIFI, down) == ["network down: wlan0 link down"]
+    wired = NetworkStatus(True, "eth0", "192.0.2.254")
+    assert changes(WIFI, wired) == [
+        "default route wlan0 (home) via 192.0.2.1 → eth0 via 192.0.2.254",
+        "SSID home → -",
+    ]
+    roamed = NetworkStatus(True, "wlan0", "192.0.2.1", "guest", True)
+    assert changes(WIFI, roamed) == ["SSID home → guest"]
+
+
+def test_network_settings_are_validated():
+    settings = compile_settings({"network": {"source": "FAKE", "poll_interval": 1}})
+    assert (settings.network_source, settings.network_poll_interval) == ("fake", 1.0)
+    for network in ({"source": "carrier-pigeon"}, {"poll_interval": 0}, "poll"):
+        with pytest.raises(SettingsError):
+            compile_settings({"network": network})
+    reserved = {"targets": [{"name": NETWORK_TARGET, "url": "http://127.0.0.1/"}]}
+    with pytest.raises(SettingsError):
+        compile_settings(reserved)
+    compile_settings({**reserved, "network": {"source": "off"}})
+
+
+class Healthy(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def watchdog(user_dir, monkeypatch):
+    from cloudflare_watchdog.core.watchdog import WatchdogCore
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Healthy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = user_dir / "config.json"
+    url = f"http://127.0.0.1:{server.server_port}/"
+    config.write_text(
+        json.dumps(
+            {
+                "targets": [{"name": "site", "url": url}],
+                "check_interval": 60,
+                "wifi_network": "home",
+                "network": {"source": "fake"},
+                "on_wifi_fail": ["true"],
+                "on_site_fail": ["true"],
+                "restart_budget": 1,
+            }
+        )
+    )
+    core = WatchdogCore(config)
+    core.fired = fired = []
+
+    def run_commands(steps, label, context=None):
+        fired.append(label)
+        return True  # as a submitted run
+
+    monkeypatch.setattr(core, "run_commands", run_commands)
+    thread = threading.Thread(target=core.start, daemon=True)
+    thread.start()
+    wait_for(lambda: core.network is not None)
+    yield core
+    core.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+    server.shutdown()
+    server.server_close()
+
+
+def test_link_loss_and_return_drive_the_network_target(watchdog):
+    network = watchdog.network
+    network.set(up=False)
+    assert watchdog.health.state(NETWORK_TARGET) is HealthState.DOWN
+    assert watchdog.fired == ["on-wifi-fail"]
+    network.set(up=True)
+    assert watchdog.health.state(NETWORK_TARGET) is HealthState.HEALTHY
+    assert watchdog.fired == ["on-wifi-fail"]  # recovery only re-probes
+
+
+def test_wrong_ssid_counts_as_down(watchdog):
+    network = watchdog.network
+    network.set(ssid="home")
+    assert watchdog.health.state(NETWORK_TARGET) is HealthState.HEALTHY
+    network.set(ssid="guest")
+    assert watchdog.health.state(NETWORK_TARGET) is HealthState.DOWN
+    assert watchdog.fired == ["on-wifi-fail"]
+
+
+def test_link_flaps_do_not_use_up_the_site_budget(watchdog):
+    from cloudflare_watchdog.core.diagnosis import SITE, Diagnosis
+    from cloudflare_watchdog.core.health import Transition
+
+    for _ in range(2):
+        watchdog.network.set(up=False)
+        watchdog.network.set(up=True)
+    assert watchdog.fired == ["on-wifi-fail"]  # the second round was refused
+    down = Transition("site", HealthState.SUSPECT, HealthState.DOWN, "down")
+    watchdog.handle_transition(down, Diagnosis(SITE, ()))
+    assert watchdog.fired == ["on-wifi-fail", "on-site-fail"]
@@ -0,0 +1,72 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+import urllib3.util.connection
+
+from cloudflare_watchdog.core.probe import DNSCache, ProbeEngine, ProbeTarget
+
+
+class Healthy(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingCache(DNSCache):
+    def __init__(self, answers=None):
+        super().__init__()
+        self.answers = answers or {}
+        self.lookups = []
+
+    def resolve(self, host, port):
+        self.lookups.append(host)
+        if host in self.answers:
+            return self.answers[host]
+        return super().resolve(host, port)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Healthy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_probe_sessions_resolve_through_the_cache(server):
+    create_connection = urllib3.util.connection.create_connection
+    cache = CountingCache({"watched.test": ["127.0.0.1"]})
+    engine = ProbeEngine(dns_cache=cache)
+    try:
+        url = f"http://watched.test:{server.server_port}/"
+        for _ in range(2):
+            assert engine.probe(ProbeTarget("site", url)).success
+        assert cache.lookups == ["watched.test"] * 2
+        # other requests users in the process are left alone
+        assert urllib3.util.connection.create_connection is create_connection
+        with pytest.raises(requests.ConnectionError):
+            requests.get(url, timeout=2)
+        assert len(cache.lookups) == 2
+    finally:
+        engine.close()
+
+
+def test_unreachable_addresses_are_forgotten(server):
+    cache = DNSCache()
+    cache._entries[("watched.test", 9)] = (float("inf"), ["127.0.0.1"])
+    engine = ProbeEngine(dns_cache=cache)
+    try:
+        result = engine.probe(ProbeTarget("site", "http://watched.test:9/"))
+        assert not result.success and result.error
+        assert ("watched.test", 9) not in cache._entries
+    finally:
+        engine.close()
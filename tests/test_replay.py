@@ -0,0 +1,48 @@
+import json
+
+from cloudflare_watchdog.config.settings_loader import compile_settings
+from cloudflare_watchdog.core.replay import Recording, replay
+
+STEP = 10.0
+DAY = 86400.0
+OUTAGE = (30000.0, 30600.0)  # ten minutes down
+BLIP = (60000.0, 60030.0)  # shorter than the 60 s minimum outage
+
+
+def recording():
+    times = [i * STEP for i in range(int(DAY / STEP))]
+    oks = [not (OUTAGE[0] <= t < OUTAGE[1] or BLIP[0] <= t < BLIP[1]) for t in times]
+    return Recording({"site": (times, oks)})
+
+
+def test_outages_are_failure_runs_above_the_minimum():
+    assert recording().outages("site", min_duration=60) == [OUTAGE]
+    assert recording().outages("site", min_duration=1) == [OUTAGE, BLIP]
+
+
+def test_from_jsonl_sorts_and_windows(tmp_path):
+    path = tmp_path / "probes.jsonl"
+    rows = [(20, "a", True), (10, "a", False), (30, "b", True), (40, "a", True)]
+    path.write_text(
+        "\n".join(json.dumps({"ts": t, "target": n, "ok": ok}) for t, n, ok in rows)
+        + "\n\n"
+    )
+    loaded = Recording.from_jsonl(path, end=35)
+    assert loaded.series == {"a": ([10.0, 20.0], [False, True]), "b": ([30.0], [True])}
+    assert loaded.span == (10.0, 30.0)
+
+
+def test_outage_detected_and_blip_ridden_out():
+    settings = compile_settings(
+        {"check_interval": 30, "confirm_interval": 15, "failure_threshold": 3}
+    )
+    site = replay(recording(), settings).targets["site"]
+    assert (site.outages, site.detected, site.false_positives) == (1, 1, 0)
+    assert 0 < site.detection[0] < OUTAGE[1] - OUTAGE[0]
+
+
+def test_hair_trigger_counts_the_blip_as_a_false_positive():
+    settings = compile_settings({"check_interval": 30, "failure_threshold": 1})
+    site = replay(recording(), settings).targets["site"]
+    assert site.detected == 1
+    assert site.false_positives == 1
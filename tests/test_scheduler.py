@@ -0,0 +1,60 @@
+import random
+
+from cloudflare_watchdog.core.probe import ProbeTarget
+from cloudflare_watchdog.core.scheduler import ProbeScheduler
+
+
+def make(confirm=1.0, max_backoff=300.0, jitter=0.0):
+    scheduler = ProbeScheduler(confirm, max_backoff, jitter, rng=random.Random(1))
+    target = ProbeTarget("site", "http://example.invalid/", interval=30)
+    scheduler.set_targets([target], now=0.0)
+    return scheduler, target
+
+
+def test_down_backoff_doubles_up_to_the_cap():
+    scheduler, target = make()
+    delays = [scheduler.delay_for(target, "down") for _ in range(12)]
+    assert delays[:5] == [1, 2, 4, 8, 16]
+    assert max(delays) == 300.0
+    assert delays[-1] == 300.0
+
+
+def test_long_down_streak_does_not_overflow():
+    # 85 h of probes every 300 s is past the 1024th doubling.
+    scheduler, target = make()
+    for _ in range(5000):
+        delay = scheduler.delay_for(target, "down")
+    assert delay == 300.0
+    assert scheduler.reschedule(target, "down", now=0.0) == 300.0
+
+
+def test_healthy_resets_the_streak():
+    scheduler, target = make()
+    for _ in range(6):
+        scheduler.delay_for(target, "down")
+    assert scheduler.delay_for(target, "healthy") == 30
+    assert scheduler.delay_for(target, "down") == 1.0
+
+
+def test_suspect_and_recovering_confirm_quickly():
+    scheduler, target = make(confirm=2.0)
+    assert scheduler.delay_for(target, "suspect") == 2.0
+    assert scheduler.delay_for(target, "recovering") == 2.0
+
+
+def test_pop_due_and_expedite():
+    scheduler, target = make(jitter=0.0)
+    assert scheduler.pop_due(now=0.0) == [target]
+    assert scheduler.pop_due(now=1.0) == []
+    for _ in range(8):
+        scheduler.reschedule(target, "down", now=0.0)
+    assert scheduler.seconds_until_due(now=0.0) == 128.0
+    scheduler.expedite(["site"], now=0.0)
+    assert scheduler.seconds_until_due(now=0.0) == 1.0
+    assert scheduler.delay_for(target, "down") == 1.0  # backoff restarted
+
+
+def test_removed_targets_are_never_due():
+    scheduler, target = make()
+    scheduler.set_targets([], now=0.0)
+    assert scheduler.pop_due(now=1000.0) == []
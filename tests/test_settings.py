@@ -0,0 +1,156 @@
+import json
+
+import pytest
+
+from cloudflare_watchdog.config.settings_loader import (
+    DEFAULTS,
+    SettingsError,
+    SettingsStore,
+    compile_settings,
+    compile_steps,
+)
+
+
+def test_defaults_and_single_target_url():
+    settings = compile_settings(None)
+    assert settings.check_interval == DEFAULTS["check_interval"]
+    (target,) = settings.targets
+    assert (target.name, target.url) == ("site", DEFAULTS["target_url"])
+    assert target.interval == settings.check_interval
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [],
+        {"check_interval": "soon"},
+        {"check_interval": 0},
+        {"failure_threshold": 0},
+        {"target_url": "ftp://example.com"},
+        {"targets": {"url": "http://a/"}},
+        {"targets": [{"name": "a"}]},
+        {"targets": [{"url": "http://a/", "interval": -1}]},
+        {"targets": [{"url": "http://a/", "type": "ping"}]},
+        {"targets": [{"url": "http://a/", "method": "POST"}]},
+        {"targets": ["http://a/", {"name": "a", "url": "http://b/"}]},
+        {"diagnosis": {"timeout": 0}},
+        {"fleet": {"controller": "controller:9300"}},
+        {"on_site_fail": "true", "on_recovery": 42},
+    ],
+)
+def test_invalid_settings_are_rejected(data):
+    with pytest.raises(SettingsError):
+        compile_settings(data)
+
+
+def test_targets_inherit_global_interval_and_method():
+    settings = compile_settings(
+        {
+            "check_interval": 10,
+            "method": "head",
+            "targets": [
+                "http://a.test/",
+                {"name": "b", "url": "http://b/", "interval": 5},
+            ],
+        }
+    )
+    a, b = settings.targets
+    assert (a.name, a.interval, a.method) == ("a.test", 10.0, "HEAD")
+    assert (b.name, b.interval) == ("b", 5.0)
+
+
+def test_action_aliases_fill_missing_lists_only():
+    settings = compile_settings(
+        {
+            "actions": {"on_site_down": "pm2 restart all", "on_internet_down": "a"},
+            "on_wifi_fail": ["b"],
+        }
+    )
+    assert [s.command for s in settings.on_site_fail] == ["pm2 restart all"]
+    assert [s.command for s in settings.on_wifi_fail] == ["b"]
+
+
+def test_string_steps_split_and_chain():
+    steps = compile_steps(["a; b", "c\nd"], "on_site_fail")
+    assert [s.command for s in steps] == ["a", "b", "c", "d"]
+    assert [s.after for s in steps] == [
+        (),
+        ("on_site_fail[0]",),
+        ("on_site_fail[1]",),
+        ("on_site_fail[2]",),
+    ]
+
+
+def test_mapping_steps_only_wait_for_after():
+    steps = compile_steps(
+        [
+            {"name": "tunnel", "run": "cloudflared run", "supervise": True},
+            {"name": "app", "run": "pm2 restart app", "timeout": 5},
+            {"name": "check", "run": "curl x", "after": ["tunnel", "app"]},
+        ],
+        "on_site_fail",
+    )
+    tunnel, app, check = steps
+    assert (tunnel.after, tunnel.supervise) == ((), True)
+    assert (app.after, app.timeout, app.supervise) == ((), 5.0, None)
+    assert check.after == ("tunnel", "app")
+
+
+@pytest.mark.parametrize(
+    "entries",
+    [
+        [{"name": "a", "run": "x"}, {"name": "a", "run": "y"}],
+        [{"name": "a", "run": "x", "after": "missing"}],
+        [
+            {"name": "a", "run": "x", "after": "b"},
+            {"name": "b", "run": "y", "after": "a"},
+        ],
+        [{"name": "a", "run": "x", "timeout": "long"}],
+        [{"name": "a"}],
+    ],
+)
+def test_bad_steps_are_rejected(entries):
+    with pytest.raises(SettingsError):
+        compile_steps(entries, "on_site_fail")
+
+
+def write(path, data):
+    path.write_text(json.dumps(data))
+
+
+def test_store_reloads_only_when_the_file_changes(tmp_path):
+    path = tmp_path / "settings.json"
+    store = SettingsStore(path)
+    assert not store.check()  # no file yet: the defaults stand
+    write(path, {"check_interval": 5})
+    assert store.check()
+    assert store.current.check_interval == 5
+    assert not store.check()
+
+
+def test_invalid_file_keeps_the_previous_settings(tmp_path):
+    path = tmp_path / "settings.json"
+    write(path, {"check_interval": 5})
+    store = SettingsStore(path)
+    store.check()
+    before = store.current
+    write(path, {"check_interval": -100})
+    with pytest.raises(SettingsError):
+        store.check()
+    assert store.current is before
+    assert not store.check()  # the bad file is not parsed again and again
+
+
+def test_save_writes_and_swaps_in(tmp_path):
+    path = tmp_path / "config.yaml"
+    store = SettingsStore(path)
+    settings = store.save({"check_interval": 7, "on_recovery": ["echo up"]})
+    assert store.current is settings
+    assert not store.check()
+    assert SettingsStore(path).current.check_interval == DEFAULTS["check_interval"]
+    reloaded = SettingsStore(path)
+    reloaded.check()
+    assert reloaded.current.raw == settings.raw
+    with pytest.raises(SettingsError):
+        store.save({"check_interval": 0})
+    assert store.current is settings
@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cloudflare_watchdog.core.supervisor import (
+    ProcessSupervisor,
+    _pid_matches,
+    process_identity,
+)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def supervisors(tmp_path):
+    made = []
+
+    def make():
+        supervisor = ProcessSupervisor(lambda *a, **k: None, tmp_path / "state")
+        made.append(supervisor)
+        return supervisor
+
+    yield make
+    for supervisor in made:
+        supervisor.stop_all(timeout=2)
+
+
+def test_same_command_runs_once(supervisors):
+    supervisor = supervisors()
+    first = supervisor.ensure("sleep 30")
+    again = supervisor.ensure("  SLEEP   30 ")
+    assert again is first
+    assert [p["pid"] for p in supervisor.status()] == [first.pid]
+
+
+def test_failed_process_is_restarted_until_stopped(supervisors):
+    supervisor = supervisors()
+    managed = supervisor.ensure("sleep 0.2; exit 3")
+    managed.backoff = 0.05
+    wait_for(lambda: managed.restarts >= 1)
+    assert managed.last_exit == 3
+    supervisor.stop("sleep 0.2; exit 3")
+    restarts = managed.restarts
+    time.sleep(0.5)
+    assert managed.restarts == restarts
+    wait_for(lambda: not supervisor.status())
+
+
+def test_restarted_watchdog_adopts_its_children(supervisors):
+    first = supervisors().ensure("sleep 30")
+    second = supervisors()
+    adopted = second.ensure("sleep 30")
+    assert adopted.pid == first.pid
+    (status,) = second.status()
+    assert status["adopted"] and status["running"]
+    second.stop("sleep 30", timeout=2)
+    wait_for(lambda: first.proc.poll() is not None)
+
+
+def test_pid_of_another_program_is_not_adopted(supervisors):
+    other = subprocess.Popen(["tail", "-f", "/dev/null"])
+    try:
+        supervisor = supervisors()
+        supervisor._pid_file(process_identity("sleep 31")).write_text(str(other.pid))
+        managed = supervisor.ensure("sleep 31")
+        assert managed.pid != other.pid
+        assert managed.proc is not None
+    finally:
+        other.kill()
+        other.wait()
+
+
+def test_psutil_is_used_when_installed(monkeypatch):
+    def process(pid):
+        return SimpleNamespace(cmdline=lambda: ["cloudflared.exe", "tunnel", "run"])
+
+    psutil = SimpleNamespace(Error=OSError, Process=process)
+    monkeypatch.setitem(sys.modules, "psutil", psutil)
+    assert _pid_matches(4242, "cloudflared tunnel run")
+    assert not _pid_matches(4242, "sleep 30")
@@ -0,0 +1,109 @@
+import pytest
+
+from cloudflare_watchdog.core import timeseries
+from cloudflare_watchdog.core.probe import ProbeResult, ProbeTarget
+from cloudflare_watchdog.core.timeseries import SeriesRing, TimeSeriesStore
+
+
+@pytest.fixture
+def ring(tmp_path):
+    ring = SeriesRing(tmp_path / "site.ts", capacity=8)
+    yield ring
+    ring.close()
+
+
+def fill(ring, times, ok=lambda t: True):
+    for t in times:
+        ring.append(float(t), t / 100, 200, 0, ok(t))
+
+
+def test_ring_keeps_the_newest_samples_in_order(ring):
+    fill(ring, range(20))
+    assert len(ring) == 8
+    assert [s.timestamp for s in ring.window()] == list(range(12, 20))
+
+
+def test_window_bounds_across_the_wrap(ring):
+    fill(ring, range(13))  # head has wrapped past the end of the file
+    assert [s.timestamp for s in ring.window(7, 11)] == [7, 8, 9, 10]
+    assert [s.timestamp for s in ring.window(end=6)] == [5]
+    assert ring.window(100) == []
+    sample = ring.window(12)[0]
+    assert (sample.latency, sample.status, sample.ok) == (
+        pytest.approx(0.12),
+        200,
+        True,
+    )
+
+
+def test_missing_latency_round_trips_as_none(ring):
+    ring.append(1.0, None, None, 2, False)
+    (sample,) = ring.window()
+    assert (sample.latency, sample.status, sample.state, sample.ok) == (
+        None,
+        0,
+        2,
+        False,
+    )
+
+
+def test_clock_steps_back_are_clamped(ring):
+    fill(ring, (10, 20, 15, 30))
+    assert [s.timestamp for s in ring.window()] == [10, 20, 20, 30]
+    assert [s.timestamp for s in ring.window(20, 30)] == [20, 20]
+
+
+def test_reader_sees_new_samples_without_reopening(ring):
+    reader = SeriesRing(ring.path, readonly=True)
+    fill(ring, range(3))
+    assert [s.timestamp for s in reader.window()] == [0, 1, 2]
+    reader.close()
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_downsample(tmp_path, monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(timeseries, "numpy_or_none", lambda: None)
+    ring = SeriesRing(tmp_path / "site.ts", capacity=64)
+    fill(ring, range(40), ok=lambda t: t % 4)  # every 4th probe fails
+    ring.append(40.0, None, 0, 2, False)
+    buckets = ring.downsample(0, 50, 5)
+    ring.close()
+    assert [b.count for b in buckets] == [10, 10, 10, 10, 1]
+    assert [b.timestamp for b in buckets] == [5, 15, 25, 35, 45]
+    assert buckets[0].uptime == pytest.approx(0.7)
+    assert buckets[1].mean_latency == pytest.approx(0.145)
+    assert buckets[1].max_latency == pytest.approx(0.19)
+    assert (buckets[4].uptime, buckets[4].mean_latency) == (0.0, None)
+
+
+def test_store_records_results_per_target(tmp_path):
+    store = TimeSeriesStore(tmp_path / "history", capacity=16)
+    for name, ts in (("site", 1.0), ("api", 2.0), ("site", 3.0)):
+        target = ProbeTarget(name, "http://x/")
+        result = ProbeResult(target, True, "", 200, 0.1, timestamp=ts)
+        store.record(result, "down")
+    assert store.targets() == ["api", "site"]
+    assert [s.timestamp for s in store.window("site")] == [1.0, 3.0]
+    assert store.window("site")[0].state == 2
+    reader = TimeSeriesStore(tmp_path / "history", readonly=True)
+    assert reader.window("missing") == []
+    assert [b.count for b in reader.downsample("site", 10, 2, now=5.0)] == [2]
+    reader.close()
+    store.close()
+
+
+def test_similar_names_get_their_own_files(tmp_path):
+    store = TimeSeriesStore(tmp_path / "history", capacity=4)
+    names = ("a/b", "a_b", "Site", "site", "-x-")
+    for i, name in enumerate(names):
+        target = ProbeTarget(name, "http://x/")
+        store.record(ProbeResult(target, True, "", 200, 0.1, timestamp=i), "healthy")
+    store.close()
+    reader = TimeSeriesStore(tmp_path / "history", readonly=True)
+    assert reader.targets() == sorted(names)
+    for i, name in enumerate(names):
+        assert [s.timestamp for s in reader.window(name)] == [i]
+    reader.close()
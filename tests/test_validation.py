@@ -0,0 +1,125 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from cloudflare_watchdog.core.validation import (
+    CHUNK_SIZE,
+    DEFAULT_EXPECTATION,
+    Expectation,
+    parse_status,
+)
+
+
+class Response:
+    """Just enough of ``requests.Response`` for a streamed check."""
+
+    def __init__(self, body=b"ok", status=200, headers=None, method="GET", length=True):
+        self.body = body
+        self.status_code = status
+        self.headers = CaseInsensitiveDict(headers or {})
+        if length:
+            self.headers.setdefault("Content-Length", str(len(body)))
+        self.request = SimpleNamespace(method=method)
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, size):
+        while self.read < len(self.body):
+            chunk = self.body[self.read : self.read + size]
+            self.read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def expect(**config):
+    return Expectation.from_config(config)
+
+
+def test_parse_status():
+    assert parse_status(None) == {200}
+    assert parse_status([200, "204"]) == {200, 204}
+    assert parse_status("2xx") == set(range(200, 300))
+    assert parse_status("301-302") == {301, 302}
+    with pytest.raises(ValueError):
+        parse_status("ok")
+
+
+@pytest.mark.parametrize(
+    "config, method",
+    [
+        ({"contains": "x"}, "HEAD"),
+        ({"require_body": True}, "HEAD"),
+        ({"max_bytes": 0}, "GET"),
+        ({"headers": ["server"]}, "GET"),
+        ("200", "GET"),
+    ],
+)
+def test_invalid_expectations(config, method):
+    with pytest.raises(ValueError):
+        Expectation.from_config(config, method)
+
+
+def test_default_reads_one_chunk_of_a_large_page():
+    response = Response(b"x" * CHUNK_SIZE * 100)
+    assert DEFAULT_EXPECTATION.check(response) is None
+    assert response.read == CHUNK_SIZE
+    assert response.closed  # too much left to drain: drop the connection
+
+
+def test_small_remainder_is_drained_for_reuse():
+    response = Response(b"x" * CHUNK_SIZE * 2)
+    assert DEFAULT_EXPECTATION.check(response) is None
+    assert response.read == CHUNK_SIZE * 2 and not response.closed
+
+
+def test_status_headers_and_empty_body():
+    assert DEFAULT_EXPECTATION.check(Response(b"  \n")) == "empty body"
+    assert DEFAULT_EXPECTATION.check(Response(status=502)) == "unexpected status 502"
+    headers = expect(headers={"server": "cloudflare", "cf-ray": None})
+    good = Response(headers={"Server": "cloudflare", "CF-Ray": "1"})
+    assert headers.check(good) is None
+    assert headers.check(Response()) == "missing header server"
+
+
+def test_keyword_split_across_chunks_is_found():
+    body = b"a" * (CHUNK_SIZE - 3) + b"healthy" + b"b" * CHUNK_SIZE * 20
+    response = Response(body)
+    assert expect(contains="healthy").check(response) is None
+    assert response.read == CHUNK_SIZE * 2
+
+
+def test_absent_keyword_fails_at_once():
+    response = Response(b"<h1>Error 1033</h1>" + b"x" * CHUNK_SIZE * 10)
+    assert expect(absent="Error 1033").check(response) == "found 'Error 1033'"
+    assert response.read == CHUNK_SIZE
+
+
+def test_reading_stops_at_max_bytes():
+    body = b"x" * 2048 + b"healthy"
+    check = expect(contains="healthy", max_bytes=1024).check(Response(body))
+    assert check == "missing 'healthy' in first 1 KB"
+
+
+def test_regex_and_hash():
+    body = b'{"status": "up", "version": 7}'
+    assert expect(regex=r'"status":\s*"up"').check(Response(body)) is None
+    assert expect(regex="down").check(Response(body)).startswith("no match")
+    digest = hashlib.sha256(body).hexdigest()
+    assert expect(sha256=digest.upper()).check(Response(body)) is None
+    assert "hash changed" in expect(sha256="0" * 64).check(Response(body))
+
+
+def test_head_probes_skip_the_body():
+    check = Expectation.from_config({"status": "2xx"}, "HEAD")
+    response = Response(b"", method="HEAD", length=False)
+    assert check.check(response) is None
+    assert not check.reads_body and not response.closed
+
+
+def test_latency():
+    assert expect(max_latency=0.5).check_latency(0.4) is None
+    assert expect(max_latency=0.5).check_latency(0.6) == "slow response (0.60s > 0.5s)"